@@ -1,18 +1,39 @@
 import os
 import json
-import shutil
-import uuid
-import sqlite3
+import asyncio
+import base64
 from datetime import datetime
-from fastapi import FastAPI, HTTPException
+from typing import List, Literal, Optional
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
-from jsonschema import validate, ValidationError
 from fastapi import UploadFile, File, Form
-from backend.orchestrator.controlnet_adapter import save_upload
-from backend.model_clients.fibo_client import FIBOClient
-from backend.translator.translator import translate_prompt_to_json, params_to_enhanced_prompt
+from backend.orchestrator.controlnet_adapter import ingest_upload, upload_path_for
+from backend.orchestrator.controlnet_preprocess import ControlMapCache, control_map_url
+from backend.orchestrator.render_orchestrator import RenderOrchestrator
+from backend.orchestrator.sku_batch import SkuBatchRunner
+from backend.orchestrator.job_queue import RenderJobQueue, QueueFullError, JobCancelledError, FINISHED_STATES
+from backend.model_clients.pipeline_pool import get_pipeline_pool
+from backend.model_clients.batcher import get_batcher
+from backend.model_clients.embedding_cache import get_embedding_cache
+from backend.model_clients.previews import latents_to_preview_jpeg
+from backend.storage.render_cache import RenderCache
+from backend.storage.store import StorageManager
+from backend.storage.version_store import VersionStore
+from backend.storage.zip_stream import stream_zip
+from backend.utils.validate_json import validation_errors
+from backend.utils.validate_params import render_param_errors, validate_render_params_batch
+from backend.utils.batch_export import EXPORT_FORMATS, batch_export
+from backend.utils.export_exr import TiffCompression, check_tiff_options
+from backend.utils.tonemap import ToneMethod
+from backend.translator.batch import iter_ndjson, memo_stats, translated_line
+from backend.translator.translator import (
+    translate_prompt_to_json,
+    params_to_enhanced_prompt,
+    manifest_to_render_params,
+)
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -21,35 +42,34 @@ load_dotenv()
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-SCHEMA_PATH = os.path.join(os.path.dirname(BASE_DIR), "schemas", "fibo_schema.json")
 SAMPLES_DIR = os.path.join(BASE_DIR, "samples")
 OUTPUT_DIR = os.path.join(SAMPLES_DIR, "output")
 DB_PATH = os.path.join(BASE_DIR, "versions.sqlite")
+PREVIEW_EVERY = int(os.getenv("FIBO_PREVIEW_EVERY", "5"))
+BATCHES_DIR = os.path.join(BASE_DIR, "batches")
+BATCH_INPUT_DIR = os.path.join(os.path.dirname(BASE_DIR), "samples")
+EXPORTS_DIR = os.path.join(BASE_DIR, "exports")
 # Add static mount for uploads (if not already covered by /samples)
 UPLOADS_DIR = os.path.join(os.path.dirname(__file__), "uploads")
 os.makedirs(UPLOADS_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-with open(SCHEMA_PATH, 'r') as f:
-    FIBO_SCHEMA = json.load(f)
-
-# Initialize database
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS versions (
-        id TEXT PRIMARY KEY,
-        seed INTEGER,
-        timestamp TEXT,
-        image_url TEXT,
-        json TEXT
-    )
-    """)
-    conn.commit()
-    conn.close()
+render_cache = RenderCache(output_dir=OUTPUT_DIR)
+control_maps = ControlMapCache()
+
+# Initialize database (shared WAL connection pool used by every endpoint)
+version_store = VersionStore(DB_PATH)
 
-init_db()
+# Local files, or background S3 uploads when STORAGE_TYPE=s3
+storage = StorageManager()
+
+# One render pipeline (router, warm clients, caches) behind every render entry point
+orchestrator = RenderOrchestrator(
+    render_cache=render_cache,
+    control_maps=control_maps,
+    version_store=version_store,
+    storage=storage,
+)
 
 app = FastAPI(title = "StudioFlow - Phase 2 Backend")
 
@@ -64,6 +84,7 @@ app.add_middleware(
 # Serve static files
 app.mount("/samples", StaticFiles(directory=SAMPLES_DIR), name="samples")
 app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR), name="uploads")
+app.mount("/control_maps", StaticFiles(directory=control_maps.cache_dir), name="control_maps")
 
 class NLRequest(BaseModel):
     prompt: str
@@ -81,191 +102,461 @@ async def translate(request: NLRequest):
     
     return result
 
+@app.post("/translate/batch")
+async def translate_batch(request: Request):
+    """
+    Translate many prompts in one request.
+    Accepts a JSON list (or {"prompts": [...]}) of prompt strings or
+    {"prompt": ...} objects, or an application/x-ndjson stream of them.
+    Streams one NDJSON line per input, in input order, as {"index", "result"}
+    or {"index", "error"}. Repeated prompts are served from a memo.
+    """
+    # The body is read before streaming starts: StreamingResponse listens for
+    # client disconnect on the same receive channel, so the request stream
+    # can't be consumed from inside the response generator. Parsing is kept
+    # off the event loop: NDJSON lines are decoded lazily as the (sync)
+    # response generator is drained on the threadpool, and a JSON body is
+    # parsed in a worker thread.
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        items = iter_ndjson(body)
+    else:
+        try:
+            items = await asyncio.to_thread(json.loads, body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be JSON or NDJSON")
+        if isinstance(items, dict):
+            items = items.get("prompts")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail='Body must be a list of prompts or {"prompts": [...]}')
+    lines = (translated_line(index, item) for index, item in enumerate(items))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
 @app.post("/validate")
 async def validate_json(payload: dict):
     """
     Validate frontend RenderParameters format.
     Checks for required fields, correct types, and value ranges matching frontend sliders/selects.
     Returns validation status and an enhanced prompt for image generation.
+    "error" is the first problem found; "errors" lists all of them.
     """
+    errors = render_param_errors(payload)
+    if errors:
+        return {"valid": False, "error": errors[0], "errors": errors}
     try:
-        # Required fields validation
-        required_fields = ["prompt", "focalLength", "yaw", "pitch", "lighting", 
-                          "colorPalette", "controlNet", "seed", "resolution", "colorSpace"]
-        
-        for field in required_fields:
-            if field not in payload:
-                return {"valid": False, "error": f"Missing required field: {field}"}
-        
-        # Type validations
-        if not isinstance(payload["focalLength"], (int, float)):
-            return {"valid": False, "error": "focalLength must be a number"}
-        
-        if not isinstance(payload["seed"], int):
-            return {"valid": False, "error": "seed must be an integer"}
-        
-        # Range validations (matching frontend sliders)
-        if not (12 <= payload["focalLength"] <= 200):
-            return {"valid": False, "error": "focalLength must be between 12 and 200"}
-        
-        if not (-180 <= payload["yaw"] <= 180):
-            return {"valid": False, "error": "yaw must be between -180 and 180"}
-        
-        if not (-90 <= payload["pitch"] <= 90):
-            return {"valid": False, "error": "pitch must be between -90 and 90"}
-        
-        if not (0 <= payload["lighting"] <= 100):
-            return {"valid": False, "error": "lighting must be between 0 and 100"}
-        
-        # Color palette validation (matching frontend select options)
-        valid_palettes = ["warm", "cool", "neutral", "cinematic", "vibrant"]
-        if payload["colorPalette"] not in valid_palettes:
-            return {"valid": False, "error": f"colorPalette must be one of: {', '.join(valid_palettes)}"}
-        
-        # ControlNet validation
-        if "controlNet" in payload:
-            cn = payload["controlNet"]
-            valid_types = ["none", "sketch", "depth", "canny"]
-            if cn.get("type") not in valid_types:
-                return {"valid": False, "error": f"controlNet.type must be one of: {', '.join(valid_types)}"}
-            
-            if "strength" in cn and not (0.0 <= cn["strength"] <= 1.0):
-                return {"valid": False, "error": "controlNet.strength must be between 0.0 and 1.0"}
-        
-        # Color space validation
-        valid_color_spaces = ["sRGB", "Adobe RGB", "Display P3"]
-        if payload["colorSpace"] not in valid_color_spaces:
-            return {"valid": False, "error": f"colorSpace must be one of: {', '.join(valid_color_spaces)}"}
-        
         # Generate enhanced prompt from parameters
         enhanced_prompt = params_to_enhanced_prompt(payload)
-        
-        return {
-            "valid": True,
-            "enhancedPrompt": enhanced_prompt,
-            "message": "Parameters are valid and ready for rendering"
-        }
     except Exception as e:
-        return {"valid": False, "error": str(e)}
+        return {"valid": False, "error": str(e), "errors": [str(e)]}
+
+    return {
+        "valid": True,
+        "enhancedPrompt": enhanced_prompt,
+        "message": "Parameters are valid and ready for rendering"
+    }
 
-def render_with_fibo(scene_json):
+@app.post("/validate/batch")
+def validate_batch_json(payloads: List[dict]):
     """
-    Real image generation using Stable Diffusion XL via HuggingFace Diffusers.
-    Accepts frontend RenderParameters format and converts to enhanced prompt.
-    Falls back to mock rendering if SDXL fails to load.
+    Validate many RenderParameters sets in one request.
+    Returns every error per item, plus the enhanced prompt for valid items.
     """
-    try:
-        # Initialize FIBO client (now using SDXL)
-        client = FIBOClient()
-        
-        # Convert parameters to enhanced prompt for better image generation
-        enhanced_prompt = params_to_enhanced_prompt(scene_json)
-        seed = scene_json.get("seed", None)
-        
-        print(f"Original prompt: {scene_json.get('prompt', '')}")
-        print(f"Enhanced prompt: {enhanced_prompt}")
-        
-        # Prepare rendering arguments optimized for SDXL
-        render_args = {
-            "prompt": enhanced_prompt,  # Use enhanced prompt with all parameters
-            "seed": seed,
-            "num_inference_steps": 50,  # SDXL works well with 50 steps
-            "guidance_scale": 9.0,  # Higher guidance for better quality
-            "width": 1024,
-            "height": 1024
-        }
-        
-        # Generate image with SDXL
-        out_path = client.generate(render_args)
-        return out_path
-        
-    except Exception as e:
-        print(f"Warning: SDXL rendering failed: {e}")
-        print("Falling back to mock rendering...")
-        
-        # Fallback to mock rendering
-        src = os.path.join(SAMPLES_DIR, "example_render.jpg")
-        if not os.path.exists(src):
-            raise FileNotFoundError("Sample render image not found.")
-        out_name = f"render_{uuid.uuid4().hex[:12]}.jpg"
-        out_path = os.path.join(OUTPUT_DIR, out_name)
-        shutil.copyfile(src, out_path)
-        return out_path
-        print("Falling back to mock rendering...")
-        
-        # Fallback to mock rendering
-        src = os.path.join(SAMPLES_DIR, "example_render.jpg")
-        if not os.path.exists(src):
-            raise FileNotFoundError("Sample render image not found.")
-        out_name = f"render_{uuid.uuid4().hex[:12]}.jpg"
-        out_path = os.path.join(OUTPUT_DIR, out_name)
-        shutil.copyfile(src, out_path)
-        return out_path
-
-def render_with_controlnet(scene_json):
+    results = validate_render_params_batch(payloads)
+    for result, payload in zip(results, payloads):
+        if result["valid"]:
+            try:
+                result["enhancedPrompt"] = params_to_enhanced_prompt(payload)
+            except Exception as e:
+                result["valid"] = False
+                result["errors"] = [str(e)]
+    valid = sum(1 for r in results if r["valid"])
+    return {"valid": valid, "invalid": len(results) - valid, "results": results}
+
+def run_render_job(job):
     """
-    MVP stub for ControlNet rendering.
-    In production, this would call ComfyUI or FIBO pipeline with ControlNet.
+    Worker-side body of a /render job: render, then record the version.
+    Runs on a render queue thread, never on the event loop.
     """
-    src = os.path.join(SAMPLES_DIR, "example_render.jpg")
-    if not os.path.exists(src):
-        raise FileNotFoundError("Sample render image not found.")
-    out_name = f"render_cn_{uuid.uuid4().hex[:12]}.jpg"
-    out_path = os.path.join(OUTPUT_DIR, out_name)
-    shutil.copyfile(src, out_path)
-    return out_path
-
-@app.post("/render")
-async def render(scene_json: dict):
+    scene_json = job.payload["scene_json"]
+    seed = job.payload["seed"]
+    preview_every = job.payload.get("preview_every")
+
+    def on_step(step, total, latents):
+        # Stop between denoising steps if the job was cancelled
+        if job.cancel_requested.is_set():
+            raise JobCancelledError()
+        if preview_every and step % preview_every == 0 and step < total:
+            preview = latents_to_preview_jpeg(latents)
+            job.publish("preview", {
+                "step": step,
+                "total_steps": total,
+                "image": f"data:image/jpeg;base64,{base64.b64encode(preview).decode('ascii')}",
+            })
+
+    return orchestrator.run(scene_json, seed=seed, step_callback=on_step, cancelled=job.cancel_requested)
+
+def render_worker_count():
     """
-    Accepts frontend RenderParameters format and returns an image URL.
-    Converts frontend format to SDXL-compatible parameters.
-    Saves version metadata to sqlite.
+    Number of render worker threads: RENDER_WORKERS, defaulting to
+    FIBO_MAX_BATCH_SIZE. Micro-batches only form from renders running
+    concurrently, so fewer workers than the batch size caps every batch.
     """
+    batch_size = get_batcher().max_batch_size
+    workers = int(os.getenv("RENDER_WORKERS", str(batch_size)))
+    if workers < batch_size:
+        print(
+            f"Warning: RENDER_WORKERS={workers} is below FIBO_MAX_BATCH_SIZE={batch_size}; "
+            f"micro-batches will hold at most {workers} render(s)"
+        )
+    return workers
+
+render_queue = RenderJobQueue(run_render_job, max_workers=render_worker_count())
+
+def render_manifest(manifest):
+    """Render one FIBO manifest (e.g. an expanded SKU row) and record its version."""
+    params = manifest_to_render_params(manifest)
+    return orchestrator.run(params, seed=params["seed"], record=manifest)
+
+batch_runner = SkuBatchRunner(render_manifest, BATCHES_DIR)
+
+def run_export_job(job):
+    """Worker-side body of an /exports job; the files fan out over a process pool."""
+    payload = job.payload
+    return batch_export(
+        payload["sources"],
+        os.path.join(EXPORTS_DIR, job.id),
+        payload["formats"],
+        payload["options"],
+        names=payload["names"],
+    )
+
+# One batch export at a time; each already uses every core
+export_queue = RenderJobQueue(run_export_job, max_workers=1, max_queue=8)
+
+@app.on_event("shutdown")
+def stop_render_queue():
+    render_queue.shutdown(wait=False)
+    export_queue.shutdown(wait=False)
+    storage.shutdown()
+
+@app.post("/render", status_code=202)
+async def render(scene_json: dict, previews: bool = False, preview_every: int = Query(PREVIEW_EVERY, ge=1)):
+    """
+    Accepts frontend RenderParameters format and queues a render job.
+    Optional "quality" (draft/standard/final) picks size, steps and scheduler;
+    "render_settings" overrides them; "from_version" re-renders a previous
+    version with the same seed and parameters.
+    Returns a job ID immediately; poll GET /jobs/{job_id} for the image URL.
+    With previews=true, low-resolution previews are decoded every
+    preview_every steps and streamed from GET /jobs/{job_id}/events.
+    Responds 429 when the render queue is full.
+    """
+    # Re-render an earlier version (e.g. a draft at final quality): reuse its
+    # parameters and seed, applying only the fields sent with this request
+    if "from_version" in scene_json:
+        source = version_store.get(scene_json["from_version"])
+        if source is None:
+            raise HTTPException(status_code=404, detail=f"Unknown version: {scene_json['from_version']}")
+        overrides = {k: v for k, v in scene_json.items() if k != "from_version"}
+        scene_json = {**source["json"], **overrides, "seed": source["seed"]}
+
     # Validate required fields
     if "prompt" not in scene_json:
         raise HTTPException(status_code=400, detail="Missing 'prompt' field")
+    try:
+        # Bad quality/render_settings, or no backend able to render the job
+        orchestrator.check_supported(scene_json, streaming=previews)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Extract seed (use existing or generate new)
-    seed = scene_json.get("seed", int(datetime.utcnow().timestamp()) % 1000000)
+    # Pick a seed if none was sent and render with it, so the seed recorded on
+    # the version is the one actually used and from_version can replay it
+    if scene_json.get("seed") is None:
+        scene_json = {**scene_json, "seed": int(datetime.utcnow().timestamp()) % 1000000}
+    seed = scene_json["seed"]
 
-    # Call rendering function with frontend parameters
     try:
-        out_path = render_with_fibo(scene_json)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Rendering error: {str(e)}")
-    
-    # Form public URL path for frontend
-    rel_path = os.path.relpath(out_path, BASE_DIR)
-    image_url = f"/{rel_path.replace(os.path.sep, '/')}"
+        job = render_queue.submit({
+            "scene_json": scene_json,
+            "seed": seed,
+            "preview_every": preview_every if previews else None,
+        })
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Report a render job's status (queued/running/done/failed/cancelled) and result."""
+    job = render_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Server-Sent Events stream for a render job.
+    Emits "status" events on state changes, "preview" events with base64
+    JPEG previews while denoising, and closes after the final status (whose
+    result carries the full-quality image URL).
+    """
+    job = render_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+
+    async def stream():
+        seq = 0
+        while True:
+            events = await asyncio.to_thread(job.events_after, seq)
+            if not events:
+                yield ": keep-alive\n\n"
+            for e in events:
+                seq = e["seq"]
+                yield f"id: {e['seq']}\nevent: {e['event']}\ndata: {json.dumps(e['data'])}\n\n"
+                if e["event"] == "status" and e["data"]["status"] in FINISHED_STATES:
+                    return
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
 
-    # Save version metadata to sqlite
-    vid = uuid.uuid4().hex
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("INSERT INTO versions (id, seed, timestamp, image_url, json) VALUES (?, ?, ?, ?, ?)",
-              (vid, seed, datetime.utcnow().isoformat(), image_url, json.dumps(scene_json)))
-    conn.commit()
-    conn.close()
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running render job."""
+    job = render_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job.to_dict()
 
-    return {"version_id": vid, "image_url": image_url, "seed": seed}
+class BatchRequest(BaseModel):
+    template: str = "sku_batch_template.json"
+    csv: str = "sku_list.csv"
+
+def batch_input_path(name):
+    """Resolve a batch input file name inside the repo samples/ directory."""
+    path = os.path.realpath(os.path.join(BATCH_INPUT_DIR, name))
+    if not path.startswith(os.path.realpath(BATCH_INPUT_DIR) + os.path.sep) or not os.path.isfile(path):
+        raise HTTPException(status_code=400, detail=f"Batch input not found: {name}")
+    return path
+
+@app.post("/batches", status_code=202)
+async def start_batch(request: BatchRequest):
+    """
+    Start a catalog batch: every row of the SKU CSV is expanded through the
+    template and rendered in the background. Returns a batch ID for progress polling.
+    """
+    batch = batch_runner.start(batch_input_path(request.template), batch_input_path(request.csv))
+    return batch.to_dict()
+
+@app.get("/batches/{batch_id}")
+async def get_batch(batch_id: str):
+    """Report batch status and row counts (rows read, done, failed, skipped on resume)."""
+    batch = batch_runner.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail=f"Unknown batch: {batch_id}")
+    return batch.to_dict()
+
+@app.post("/batches/{batch_id}/resume", status_code=202)
+async def resume_batch(batch_id: str):
+    """Resume an interrupted batch; rows already rendered are skipped."""
+    batch = batch_runner.resume(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail=f"Unknown batch: {batch_id}")
+    return batch.to_dict()
+
+@app.get("/batches/{batch_id}/manifest")
+async def get_batch_manifest(batch_id: str):
+    """Download the batch's JSONL results manifest (one line per rendered row)."""
+    batch = batch_runner.get(batch_id)
+    if batch is None or not batch.manifest_path.exists():
+        raise HTTPException(status_code=404, detail=f"No manifest for batch: {batch_id}")
+    return FileResponse(batch.manifest_path, media_type="application/x-ndjson")
 
 @app.get("/versions")
-async def list_versions():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT id, seed, timestamp, image_url, json FROM versions ORDER BY timestamp DESC")
-    rows = c.fetchall()
-    conn.close()
-    results = []
-    for r in rows:
-        results.append({
-            "id": r[0],
-            "seed": r[1],
-            "timestamp": r[2],
-            "image_url": r[3]
-        })
-    return results
+def list_versions(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    seed: Optional[int] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+):
+    """
+    List past renders newest first, one page at a time.
+    Pass the returned next_cursor to fetch the following page.
+    Filter by seed and/or an ISO timestamp range [since, until).
+    """
+    try:
+        return version_store.list(limit=limit, cursor=cursor, seed=seed, since=since, until=until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def image_path_for(image_url):
+    """
+    Map a version's image_url (e.g. /samples/output/x.jpg, or an S3 URL) to
+    a local file, or None. S3 objects whose local copy is gone are downloaded.
+    """
+    return storage.local_path_for(image_url)
+
+def version_archive_entries(versions):
+    """
+    Yield (archive name, source) pairs for (name, version ID) pairs: the
+    render as stored, plus its version record as a JSON sidecar.
+    """
+    for name, vid in versions:
+        version = version_store.get(vid)
+        if version is None:
+            continue
+        path = image_path_for(version["image_url"])
+        if path is None:
+            print(f"Warning: image for version {vid} is missing, archiving its manifest only")
+        else:
+            yield f"{name}{os.path.splitext(path)[1]}", path
+        yield f"{name}.json", json.dumps(version, indent=2).encode("utf-8")
+
+def versions_in_range(seed=None, since=None, until=None, page_size=500):
+    """Yield IDs of every version matching the /versions filters, page by page."""
+    cursor = None
+    while True:
+        page = version_store.list(limit=page_size, cursor=cursor, seed=seed, since=since, until=until)
+        for item in page["items"]:
+            yield item["id"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return
+
+def batch_versions(batch):
+    """Yield (sku, version ID) for every rendered row in a batch manifest."""
+    with open(batch.manifest_path) as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry["status"] == "done":
+                yield entry.get("sku") or f"row{entry['row']}", entry["version_id"]
+
+@app.get("/versions/archive")
+def download_versions_archive(
+    ids: Optional[str] = None,
+    batch_id: Optional[str] = None,
+    seed: Optional[int] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+):
+    """
+    Stream a ZIP of renders with their version JSON as sidecars.
+    Select comma-separated version ids, a batch_id, or a seed/since/until range.
+    The archive is built while it is sent; JPEGs are stored, not recompressed.
+    """
+    if ids:
+        versions = ((vid, vid) for vid in ids.split(",") if vid)
+        filename = "versions"
+    elif batch_id:
+        batch = batch_runner.get(batch_id)
+        if batch is None or not batch.manifest_path.exists():
+            raise HTTPException(status_code=404, detail=f"No manifest for batch: {batch_id}")
+        versions = ((f"{sku}_{vid}", vid) for sku, vid in batch_versions(batch))
+        filename = f"batch_{batch_id}"
+    elif seed is not None or since or until:
+        versions = ((vid, vid) for vid in versions_in_range(seed, since, until))
+        filename = "versions"
+    else:
+        raise HTTPException(status_code=400, detail="Pass ids, batch_id, or a seed/since/until range")
+
+    return StreamingResponse(
+        stream_zip(version_archive_entries(versions)),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}.zip"'},
+    )
+
+class ExportRequest(BaseModel):
+    version_ids: Optional[List[str]] = None
+    batch_id: Optional[str] = None
+    formats: List[str] = list(EXPORT_FORMATS)
+    exr_bit_depth: Literal[16, 32] = 32
+    tiff_bit_depth: Literal[8, 16] = 16
+    tiff_compression: TiffCompression = "deflate"
+    tone_mapping: ToneMethod = "aces"
+    exposure: float = 0.0
+
+@app.post("/exports", status_code=202)
+async def start_export(request: ExportRequest):
+    """
+    Export versions (or every render of a SKU batch) to EXR, TIFF and
+    tone-mapped previews in the background. Poll status_url for per-file
+    outputs, timings and failures.
+    """
+    if request.version_ids:
+        version_ids = request.version_ids
+    elif request.batch_id:
+        batch = batch_runner.get(request.batch_id)
+        if batch is None or not batch.manifest_path.exists():
+            raise HTTPException(status_code=404, detail=f"No manifest for batch: {request.batch_id}")
+        version_ids = [vid for _, vid in batch_versions(batch)]
+    else:
+        raise HTTPException(status_code=400, detail="Pass version_ids or batch_id")
+    # Outputs are named by version id; a repeated id would write its files twice
+    version_ids = list(dict.fromkeys(version_ids))
+    if not request.formats or set(request.formats) - set(EXPORT_FORMATS):
+        raise HTTPException(status_code=400, detail=f"formats must be among: {', '.join(EXPORT_FORMATS)}")
+    if "tiff" in request.formats:
+        try:
+            check_tiff_options(request.tiff_bit_depth, request.tiff_compression)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    sources = []
+    for vid in version_ids:
+        version = version_store.get(vid)
+        # May download from S3, so off the event loop
+        path = version and await asyncio.to_thread(image_path_for, version["image_url"])
+        if not path:
+            raise HTTPException(status_code=404, detail=f"No image for version: {vid}")
+        sources.append(path)
+
+    options = request.model_dump(include={"exr_bit_depth", "tiff_bit_depth", "tiff_compression", "tone_mapping", "exposure"})
+    try:
+        job = export_queue.submit({"sources": sources, "names": version_ids, "formats": request.formats, "options": options})
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "files": len(sources),
+        "status_url": f"/exports/{job.id}",
+    }
+
+@app.get("/exports/{job_id}")
+async def get_export(job_id: str):
+    """Export job status; once done, result holds the per-file report."""
+    job = export_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown export: {job_id}")
+    return job.to_dict()
+
+@app.get("/pipelines/stats")
+async def pipeline_stats():
+    """Report resident pipelines, load/hit/eviction counters, micro-batching, prompt-embedding cache and render backend stats."""
+    return {
+        **get_pipeline_pool().stats(),
+        "batching": get_batcher().stats(),
+        "prompt_embeddings": get_embedding_cache().stats(),
+        "backends": orchestrator.router.stats(),
+    }
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Report render cache hit/miss counters and disk usage, plus the translation memo and control map cache."""
+    return {**render_cache.stats(), "translations": memo_stats(), "control_maps": control_maps.stats()}
+
+@app.get("/storage/stats")
+async def storage_stats():
+    """Report the storage backend and, for S3, upload/retry/failure counters and upload queue depth."""
+    return storage.stats()
 
 @app.post("/upload_controlnet")
 async def upload_controlnet(file: UploadFile = File(...), image_type: str = Form("sketch")):
@@ -273,47 +564,47 @@ async def upload_controlnet(file: UploadFile = File(...), image_type: str = Form
     Upload controlnet reference image (sketch/depth/canny).
     Returns path to uploaded image for frontend ControlNet panel.
     Validates type matches frontend options: none, sketch, depth, canny.
+    Files are stored by content hash; re-uploading the same image is a no-op.
     """
     # Validate image type matches frontend options
     valid_types = ["sketch", "depth", "canny"]
     if image_type not in valid_types:
         raise HTTPException(status_code=400, detail=f"image_type must be one of: {', '.join(valid_types)}")
     
-    # Save file
-    saved_rel = save_upload(file.file, file.filename)
+    # Hash, dedupe, resize and preprocess off the event loop
+    saved = await asyncio.to_thread(ingest_upload, file.file, file.filename)
+    try:
+        map_path = await asyncio.to_thread(control_maps.get, upload_path_for(saved["path"]), image_type)
+        control_map = control_map_url(map_path)
+    except Exception as e:
+        print(f"Warning: could not preprocess {file.filename} as {image_type}: {e}")
+        control_map = None
     
     # Return format matching frontend expectations
     return {
-        "path": saved_rel,
+        "path": saved["path"],
         "filename": file.filename,
-        "type": image_type
+        "type": image_type,
+        "sha256": saved["sha256"],
+        "deduplicated": saved["deduplicated"],
+        "control_map": control_map
     }
 
 @app.post("/render_controlnet")
 async def render_controlnet(scene_json: dict):
     # scene_json should include controlnet.* fields
-    # validate as usual
-    try:
-        validate(instance=scene_json, schema=FIBO_SCHEMA)
-    except ValidationError as e:
-        raise HTTPException(status_code=400, detail=f"JSON validation failed: {e}")
+    # validate against the compiled FIBO schema; report every error at once
+    errors = validation_errors(scene_json)
+    if errors:
+        raise HTTPException(status_code=400, detail={"message": "JSON validation failed", "errors": errors})
 
-    # Here we would translate scene_json.controlnet -> ComfyUI or FIBO pipeline args
-    # For Phase3 demo: we call render_with_controlnet which either calls ComfyUI API or emulates effect.
+    # Same pipeline as /render: the orchestrator maps scene_json.controlnet to
+    # backend args, reuses the cached control map and records the version.
+    # Rendering blocks, so it runs off the event loop.
     try:
-        out_path = render_with_controlnet(scene_json)
+        return await asyncio.to_thread(orchestrator.run, scene_json)
+    except ValueError as e:
+        # e.g. ControlNet requested but no backend renders ControlNet jobs
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"ControlNet render failed: {e}")
-    
-    rel_path = os.path.relpath(out_path, BASE_DIR)
-    image_url = f"/{rel_path.replace(os.path.sep, '/')}"
-    # Save version metadata to sqlite
-    vid = uuid.uuid4().hex
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    seed = scene_json.get("scene", {}).get("seed", int(datetime.utcnow().timestamp()) % 100000)
-    c.execute("INSERT INTO versions (id, seed, timestamp, image_url, json) VALUES (?, ?, ?, ?, ?);",
-              (vid, seed, datetime.utcnow().isoformat(), image_url, json.dumps(scene_json)))
-    conn.commit()
-    conn.close()
-    return {"version_id": vid, "image_url": image_url, "seed": seed}
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"ControlNet render failed: {e}")
\ No newline at end of file
@@ -0,0 +1,160 @@
+"""
+Micro-Batcher
+
+Groups concurrent, compatible render requests into a single diffusion call.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+# Arguments that must match for two renders to share one pipeline call;
+# prompt and seed vary per sample.
+BATCH_KEY_FIELDS = (
+    "width",
+    "height",
+    "num_inference_steps",
+    "guidance_scale",
+    "scheduler",
+    "noise_size",
+)
+
+
+class _Slot:
+    """One caller's request inside a batch."""
+
+    def __init__(self, args: Dict[str, Any]):
+        self.args = args
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+
+class _Batch:
+    """Requests collected under one compatibility key."""
+
+    def __init__(self):
+        self.slots: List[_Slot] = []
+        self.full = threading.Event()
+
+
+class MicroBatcher:
+    """
+    Leader/follower batcher for blocking render calls.
+
+    The first caller for a key becomes the leader: it waits up to
+    max_wait_ms (or until max_batch_size requests have joined), then runs
+    the whole batch on its own thread and hands each follower its result.
+    Callers must already be on separate threads (e.g. render queue workers).
+    """
+
+    def __init__(
+        self, max_batch_size: Optional[int] = None, max_wait_ms: Optional[float] = None
+    ):
+        self.max_batch_size = max(
+            1, max_batch_size or int(os.getenv("FIBO_MAX_BATCH_SIZE", "1"))
+        )
+        self.max_wait_ms = (
+            max_wait_ms
+            if max_wait_ms is not None
+            else float(os.getenv("FIBO_BATCH_WAIT_MS", "50"))
+        )
+        self._open: Dict[Hashable, _Batch] = {}
+        self._lock = threading.Lock()
+        self._stats = {"batches": 0, "requests": 0, "max_batch_size_seen": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_batch_size > 1
+
+    def submit(
+        self,
+        key: Hashable,
+        args: Dict[str, Any],
+        run_batch: Callable[[List[Dict[str, Any]]], List[Any]],
+    ) -> Any:
+        """
+        Add a request to the open batch for key and wait for its result.
+
+        Args:
+            key: Compatibility key; only requests with equal keys are batched
+            args: Per-request render arguments
+            run_batch: Runs a list of args in one call and returns one result
+                each; an exception instance in that list is raised to its
+                caller alone (e.g. one cancelled render in a batch)
+
+        Returns:
+            This request's entry from run_batch's result list
+        """
+        slot = _Slot(args)
+        with self._lock:
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = _Batch()
+                self._open[key] = batch
+            batch.slots.append(slot)
+            if len(batch.slots) >= self.max_batch_size:
+                # Close the batch so later requests start a new one
+                del self._open[key]
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.max_wait_ms / 1000.0)
+            with self._lock:
+                if self._open.get(key) is batch:
+                    del self._open[key]
+                size = len(batch.slots)
+                self._stats["batches"] += 1
+                self._stats["requests"] += size
+                self._stats["max_batch_size_seen"] = max(
+                    self._stats["max_batch_size_seen"], size
+                )
+            self._run(batch.slots, run_batch)
+
+        slot.done.wait()
+        if slot.error is not None:
+            raise slot.error
+        return slot.result
+
+    @staticmethod
+    def _run(slots: List[_Slot], run_batch: Callable) -> None:
+        try:
+            results = run_batch([s.args for s in slots])
+            for s, result in zip(slots, results):
+                if isinstance(result, BaseException):
+                    s.error = result
+                else:
+                    s.result = result
+        except BaseException as e:
+            for s in slots:
+                s.error = e
+        finally:
+            for s in slots:
+                s.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return batch counts and the average batch size."""
+        with self._lock:
+            batches = self._stats["batches"]
+            return {
+                **self._stats,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "avg_batch_size": (
+                    (self._stats["requests"] / batches) if batches else 0.0
+                ),
+            }
+
+
+_batcher: Optional[MicroBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher() -> MicroBatcher:
+    """Return the process-wide micro-batcher."""
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = MicroBatcher()
+        return _batcher
@@ -0,0 +1,356 @@
+"""
+ComfyUI Client
+
+Runs the workflows in comfyui-recipes/ on a ComfyUI server. Each recipe is
+parsed once into a RecipeTemplate whose placeholder slots
+("{scene.seed}", "{camera.lens.focal_length_mm / 10}", ...) are located up
+front, so a render only fills those slots. Prompts are submitted through one
+pooled keep-alive httpx client, and completion is tracked on ComfyUI's
+websocket instead of polling /history.
+"""
+
+import json
+import operator
+import os
+import re
+import threading
+import time
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+RECIPES_DIR = Path(__file__).parent.parent.parent / "comfyui-recipes"
+
+PLACEHOLDER = re.compile(r"\{([^{}]+)\}")
+# "path" or "path <op> number", e.g. "camera.lens.focal_length_mm / 10"
+EXPRESSION = re.compile(r"^\s*([A-Za-z_][\w.]*)\s*(?:([-+*/])\s*(-?\d+(?:\.\d+)?))?\s*$")
+OPERATORS = {"+": operator.add, "-": operator.sub, "*": operator.mul, "/": operator.truediv}
+
+# Node inputs that take an image name from ComfyUI's input folder
+IMAGE_INPUTS = {("LoadImage", "image")}
+
+Getter = Callable[[Dict[str, Any]], Any]
+
+
+class RecipeInputError(ValueError):
+    """Raised when a render request lacks a field the recipe needs."""
+
+
+def _lookup(context: Dict[str, Any], path: str) -> Any:
+    value: Any = context
+    for key in path.split("."):
+        if not isinstance(value, dict) or value.get(key) is None:
+            raise KeyError(path)
+        value = value[key]
+    return value
+
+
+def compile_expression(expression: str) -> Tuple[str, Getter]:
+    """
+    Compile the text inside one {...} placeholder into a getter.
+
+    Returns:
+        (field path, getter(context) -> value)
+
+    Raises:
+        ValueError: If the expression is not "path" or "path <op> number"
+    """
+    match = EXPRESSION.match(expression)
+    if not match:
+        raise ValueError(f"Unsupported placeholder expression: {{{expression}}}")
+    path, op, operand = match.groups()
+    if op is None:
+        return path, lambda context: _lookup(context, path)
+    apply, number = OPERATORS[op], float(operand)
+    return path, lambda context: apply(_lookup(context, path), number)
+
+
+def compile_value(text: str) -> Optional[Tuple[Tuple[str, ...], Getter]]:
+    """
+    Compile a string node input into a getter, or None if it has no placeholders.
+
+    A string that is exactly one placeholder keeps the value's own type (a
+    seed stays an int); placeholders embedded in text are formatted into it.
+    """
+    matches = list(PLACEHOLDER.finditer(text))
+    if not matches:
+        return None
+    if len(matches) == 1 and matches[0].span() == (0, len(text)):
+        path, getter = compile_expression(matches[0].group(1))
+        return (path,), getter
+
+    parts: List[Any] = []
+    paths = []
+    position = 0
+    for match in matches:
+        parts.append(text[position:match.start()])
+        path, getter = compile_expression(match.group(1))
+        paths.append(path)
+        parts.append(getter)
+        position = match.end()
+    parts.append(text[position:])
+    return tuple(paths), lambda context: "".join(
+        part if isinstance(part, str) else str(part(context)) for part in parts
+    )
+
+
+class RecipeTemplate:
+    """
+    A recipe compiled to ComfyUI's API prompt format plus placeholder slots.
+
+    The base graph is shared between renders; instantiate() copies only the
+    nodes that have slots.
+    """
+
+    def __init__(self, recipe: Dict[str, Any]):
+        self.name = recipe.get("name", "recipe")
+        self.graph: Dict[str, Dict[str, Any]] = {}
+        # node id -> [(input name, getter, is image input)]
+        self.slots: Dict[str, List[Tuple[str, Getter, bool]]] = {}
+        self.fields: List[str] = []
+
+        for title, node in recipe["nodes"].items():
+            node_id = str(node["id"])
+            inputs = node.get("inputs", {})
+            self.graph[node_id] = {
+                "class_type": node["class_type"],
+                "inputs": inputs,
+                "_meta": {"title": title},
+            }
+            for name, value in inputs.items():
+                compiled = isinstance(value, str) and compile_value(value)
+                if compiled:
+                    paths, getter = compiled
+                    is_image = (node["class_type"], name) in IMAGE_INPUTS
+                    self.slots.setdefault(node_id, []).append((name, getter, is_image))
+                    self.fields.extend(p for p in paths if p not in self.fields)
+
+    def instantiate(
+        self,
+        context: Dict[str, Any],
+        resolve_image: Optional[Callable[[Any], str]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Fill the placeholder slots from a FIBO-style context.
+
+        Args:
+            context: Nested dict the placeholder paths are looked up in
+            resolve_image: Maps LoadImage values to ComfyUI image names,
+                e.g. by uploading local files
+
+        Returns:
+            ComfyUI API prompt graph
+
+        Raises:
+            RecipeInputError: If a field the recipe needs is missing from context
+        """
+        graph = dict(self.graph)
+        for node_id, slots in self.slots.items():
+            node = graph[node_id]
+            inputs = dict(node["inputs"])
+            for name, getter, is_image in slots:
+                try:
+                    value = getter(context)
+                except KeyError as e:
+                    raise RecipeInputError(f"Recipe {self.name} needs {e.args[0]}") from None
+                inputs[name] = resolve_image(value) if is_image and resolve_image else value
+            graph[node_id] = {**node, "inputs": inputs}
+        return graph
+
+
+@lru_cache(maxsize=None)
+def load_recipe(name: str) -> RecipeTemplate:
+    """Parse and compile comfyui-recipes/<name>.json (once per process)."""
+    with open(RECIPES_DIR / f"{name}.json", "r") as f:
+        return RecipeTemplate(json.load(f))
+
+
+def default_ws_connect(url: str, timeout: float):
+    """Open a ComfyUI websocket (websockets ships with uvicorn[standard])."""
+    from websockets.sync.client import connect
+
+    return connect(url, open_timeout=timeout, max_size=None)
+
+
+class ComfyUIClient:
+    """
+    Submits compiled recipes to a ComfyUI server.
+
+    One httpx.Client is shared by every call, so prompt submission, image
+    uploads and output downloads reuse keep-alive connections. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        http: Optional[httpx.Client] = None,
+        ws_connect: Optional[Callable[[str, float], Any]] = None,
+        output_dir: Optional[Path] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.base_url = (base_url or os.getenv("COMFYUI_URL", "http://localhost:8188")).rstrip("/")
+        self.timeout = timeout or float(os.getenv("COMFYUI_TIMEOUT", "600"))
+        self.http = http or httpx.Client(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(30.0),
+            limits=httpx.Limits(max_connections=16, max_keepalive_connections=8),
+        )
+        self.ws_connect = ws_connect or default_ws_connect
+        self.output_dir = Path(output_dir or Path(__file__).parent.parent / "samples" / "output")
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._uploaded: Dict[Tuple[str, int], str] = {}
+        self._lock = threading.Lock()
+
+    def ws_url(self, client_id: str) -> str:
+        return re.sub(r"^http", "ws", self.base_url) + f"/ws?clientId={client_id}"
+
+    def upload_image(self, value: Any) -> str:
+        """
+        Upload a local image to ComfyUI's input folder, once per file version.
+
+        Values that are not local files are passed through as ComfyUI
+        image names.
+        """
+        path = str(value)
+        if not os.path.isfile(path):
+            return path
+        key = (path, os.stat(path).st_mtime_ns)
+        with self._lock:
+            name = self._uploaded.get(key)
+        if name:
+            return name
+        with open(path, "rb") as f:
+            response = self.http.post(
+                "/upload/image",
+                files={"image": (os.path.basename(path), f)},
+                data={"overwrite": "true"},
+            )
+        response.raise_for_status()
+        uploaded = response.json()
+        name = f"{uploaded['subfolder']}/{uploaded['name']}" if uploaded.get("subfolder") else uploaded["name"]
+        with self._lock:
+            self._uploaded[key] = name
+        return name
+
+    def submit(self, graph: Dict[str, Any], client_id: str) -> str:
+        """Queue a prompt graph and return its prompt_id."""
+        response = self.http.post("/prompt", json={"prompt": graph, "client_id": client_id})
+        if response.status_code >= 400:
+            raise RuntimeError(f"ComfyUI rejected prompt: {response.text}")
+        return response.json()["prompt_id"]
+
+    def wait(self, ws, prompt_id: str, submitted: float) -> float:
+        """
+        Follow websocket events until prompt_id finishes.
+
+        Returns:
+            perf_counter time execution started (the end of the queue wait)
+        """
+        deadline = submitted + self.timeout
+        started = None
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise TimeoutError(f"ComfyUI prompt {prompt_id} did not finish within {self.timeout}s")
+            try:
+                message = ws.recv(timeout=remaining)
+            except TimeoutError:
+                continue
+            if isinstance(message, bytes):
+                continue  # binary latent previews
+            event = json.loads(message)
+            data = event.get("data") or {}
+            if data.get("prompt_id") != prompt_id:
+                continue
+            kind = event.get("type")
+            if kind == "execution_start":
+                started = time.perf_counter()
+            elif kind == "execution_error":
+                raise RuntimeError(
+                    f"ComfyUI execution failed in node {data.get('node_id')}: {data.get('exception_message')}"
+                )
+            elif kind == "execution_success" or (kind == "executing" and data.get("node") is None):
+                return started or time.perf_counter()
+
+    def fetch_outputs(self, prompt_id: str) -> List[str]:
+        """Download every output image of a finished prompt into output_dir."""
+        response = self.http.get(f"/history/{prompt_id}")
+        response.raise_for_status()
+        outputs = response.json().get(prompt_id, {}).get("outputs", {})
+        paths = []
+        for node_output in outputs.values():
+            for image in node_output.get("images", []):
+                if image.get("type", "output") != "output":
+                    continue
+                view = self.http.get("/view", params={
+                    "filename": image["filename"],
+                    "subfolder": image.get("subfolder", ""),
+                    "type": "output",
+                })
+                view.raise_for_status()
+                ext = os.path.splitext(image["filename"])[1] or ".png"
+                out_path = self.output_dir / f"render_comfy_{uuid.uuid4().hex[:12]}{ext}"
+                out_path.write_bytes(view.content)
+                paths.append(str(out_path))
+        return paths
+
+    def render(self, recipe: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run a recipe end to end.
+
+        Args:
+            recipe: Recipe name in comfyui-recipes/
+            context: FIBO-style fields the recipe placeholders read
+
+        Returns:
+            {"path", "paths", "prompt_id", "timings"}; timings (seconds) cover
+            upload, queue_wait, execution, fetch and total
+        """
+        template = load_recipe(recipe)
+        start = time.perf_counter()
+        graph = template.instantiate(context, resolve_image=self.upload_image)
+        uploaded = time.perf_counter()
+
+        client_id = uuid.uuid4().hex
+        # Connect before submitting so no event for the prompt is missed
+        with self.ws_connect(self.ws_url(client_id), self.timeout) as ws:
+            submitted = time.perf_counter()
+            prompt_id = self.submit(graph, client_id)
+            started = self.wait(ws, prompt_id, submitted)
+        finished = time.perf_counter()
+
+        paths = self.fetch_outputs(prompt_id)
+        if not paths:
+            raise RuntimeError(f"ComfyUI prompt {prompt_id} produced no images")
+        fetched = time.perf_counter()
+        return {
+            "path": paths[0],
+            "paths": paths,
+            "prompt_id": prompt_id,
+            "timings": {
+                "upload": uploaded - start,
+                "queue_wait": started - submitted,
+                "execution": finished - started,
+                "fetch": fetched - finished,
+                "total": fetched - start,
+            },
+        }
+
+    def close(self) -> None:
+        self.http.close()
+
+
+_client: Optional[ComfyUIClient] = None
+_client_lock = threading.Lock()
+
+
+def get_comfyui_client() -> ComfyUIClient:
+    """Return the process-wide ComfyUI client (one connection pool)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ComfyUIClient()
+        return _client
@@ -0,0 +1,108 @@
+"""
+Prompt Embedding Cache
+
+Memory-bounded LRU of SDXL text-encoder outputs so repeated enhanced
+prompts skip both CLIP encoders.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# Order of the tensors returned by StableDiffusionXLPipeline.encode_prompt,
+# named as the pipeline's keyword arguments
+EMBEDDING_NAMES = (
+    "prompt_embeds",
+    "negative_prompt_embeds",
+    "pooled_prompt_embeds",
+    "negative_pooled_prompt_embeds",
+)
+
+
+def tensor_nbytes(value: Any) -> int:
+    """Size of a tensor/array in bytes (0 for None)."""
+    if value is None:
+        return 0
+    if hasattr(value, "element_size"):
+        return value.element_size() * value.nelement()
+    return int(getattr(value, "nbytes", 0))
+
+
+class PromptEmbeddingCache:
+    """LRU of encode_prompt results bounded by total tensor bytes."""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes or int(
+            os.getenv("FIBO_EMBED_CACHE_MAX_BYTES", str(256 * 1024**2))
+        )
+        self._entries: "OrderedDict[Hashable, Tuple[Tuple[Any, ...], int]]" = (
+            OrderedDict()
+        )
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get_or_compute(
+        self, key: Hashable, compute: Callable[[], Tuple[Any, ...]]
+    ) -> Tuple[Any, ...]:
+        """
+        Return cached embeddings for key, computing and storing them on a miss.
+
+        Args:
+            key: Cache key (model, dtype, device, prompt, CFG flag)
+            compute: Produces the embedding tuple on a miss
+
+        Returns:
+            Tuple of embeddings in EMBEDDING_NAMES order
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[0]
+            self._stats["misses"] += 1
+
+        value = tuple(compute())
+        size = sum(tensor_nbytes(t) for t in value)
+        with self._lock:
+            if key not in self._entries and size <= self.max_bytes:
+                self._entries[key] = (value, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self._bytes -= evicted_size
+                    self._stats["evictions"] += 1
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit rate, entry count and memory use."""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": (self._stats["hits"] / lookups) if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        """Drop all cached embeddings."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_cache: Optional[PromptEmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> PromptEmbeddingCache:
+    """Return the process-wide prompt embedding cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PromptEmbeddingCache()
+        return _cache
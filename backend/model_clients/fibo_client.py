@@ -5,90 +5,255 @@ Handles direct inference with Stable Diffusion XL model for image generation.
 """
 
 import os
+import threading
 import uuid
-from typing import Dict, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from pathlib import Path
 
+from backend.model_clients.batcher import BATCH_KEY_FIELDS, MicroBatcher, get_batcher
+from backend.model_clients.embedding_cache import (
+    EMBEDDING_NAMES,
+    PromptEmbeddingCache,
+    get_embedding_cache,
+)
+from backend.model_clients.pipeline_pool import PipelinePool, get_pipeline_pool
+from backend.model_clients.quality import SCHEDULERS
+from backend.storage.blob_store import BlobStore, get_blob_store
+
+# (step, total_steps, latents) hook invoked after each denoising step
+StepCallback = Callable[[int, int, Any], None]
+
 
 class FIBOClient:
     """Client for Stable Diffusion XL model inference via HuggingFace Diffusers."""
     
-    def __init__(self):
+    def __init__(
+        self,
+        pool: Optional[PipelinePool] = None,
+        batcher: Optional[MicroBatcher] = None,
+        embed_cache: Optional[PromptEmbeddingCache] = None,
+        blobs: Optional[BlobStore] = None,
+    ):
         # Use Stable Diffusion XL instead of BRIA
         self.model_id = os.getenv("FIBO_MODEL_ID", "stabilityai/stable-diffusion-xl-base-1.0")
+        self.dtype = os.getenv("FIBO_TORCH_DTYPE", "float16")
         self.hf_token = os.getenv("HF_API_TOKEN")
-        self.pipeline = None
+        self.pool = pool or get_pipeline_pool()
+        self.batcher = batcher or get_batcher()
+        self.embed_cache = embed_cache or get_embedding_cache()
+        self.blobs = blobs or get_blob_store()
         self.output_dir = Path(__file__).parent.parent / "samples" / "output"
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
-    def _load_pipeline(self):
-        """Lazy load the diffusion pipeline."""
-        if self.pipeline is not None:
-            return
-            
-        try:
-            from diffusers import StableDiffusionXLPipeline
-            import torch
-            
-            print(f"Loading Stable Diffusion XL model: {self.model_id}")
-            self.pipeline = StableDiffusionXLPipeline.from_pretrained(
-                self.model_id,
-                torch_dtype=torch.float16,
-                use_auth_token=self.hf_token if self.hf_token else None
-            )
-            
-            # Enable optimizations
-            if torch.cuda.is_available():
-                print("Using CUDA GPU for inference")
-                self.pipeline = self.pipeline.to("cuda")
-                self.pipeline.enable_attention_slicing()
-            else:
-                # CPU fallback
-                print("Using CPU for inference (this will be slow)")
-                self.pipeline = self.pipeline.to("cpu")
-                
-            print("Model loaded successfully!")
-                
-        except Exception as e:
-            print(f"Warning: Could not load Stable Diffusion XL pipeline: {e}")
-            print("Falling back to mock rendering")
-            self.pipeline = None
-    
-    def generate(self, args: Dict[str, Any]) -> str:
+    def generate(self, args: Dict[str, Any], step_callback: Optional[StepCallback] = None) -> str:
         """
         Generate image using Stable Diffusion XL model.
         
+        When micro-batching is enabled (FIBO_MAX_BATCH_SIZE > 1), concurrent
+        requests with matching size/steps/guidance share one pipeline call.
+        Each keeps its own step_callback, called with its own latents.
+        
         Args:
             args: Rendering arguments (prompt, seed, steps, etc.)
+            step_callback: Called as (step, total_steps, latents) after each
+                denoising step; may raise (e.g. JobCancelledError) to abort
+                the render. In a batch, only this render is dropped; the
+                pipeline call stops once every render in it has aborted.
             
         Returns:
             Path to generated image file
         """
-        self._load_pipeline()
-        
-        if self.pipeline is None:
-            # Fallback: copy example image
-            return self._mock_generate(args)
-        
-        print(f"Generating image with prompt: {args['prompt'][:50]}...")
-        
-        # Run inference with SDXL parameters
-        image = self.pipeline(
-            prompt=args["prompt"],
-            num_inference_steps=args.get("num_inference_steps", 50),  # SDXL works well with 50 steps
-            guidance_scale=args.get("guidance_scale", 9.0),  # Higher guidance for better quality
-            width=args.get("width", 1024),
-            height=args.get("height", 1024),
-            generator=self._get_generator(args.get("seed")),
-        ).images[0]
-        
-        # Save output
-        output_name = f"render_{uuid.uuid4().hex[:12]}.jpg"
-        output_path = self.output_dir / output_name
-        image.save(output_path, "JPEG", quality=95)
-        
-        print(f"Image saved to: {output_path}")
-        return str(output_path)
+        if self.batcher.enabled:
+            return self.batcher.submit(self._batch_key(args), (args, step_callback), self._render_requests)
+        return self.generate_batch([args], step_callback)[0]
+    
+    def generate_batch(
+        self, batch: List[Dict[str, Any]], step_callback: Optional[StepCallback] = None
+    ) -> List[str]:
+        """
+        Generate one image per args dict in a single pipeline call.
+        
+        All entries must share width, height, steps and guidance scale. Each
+        entry gets its own seeded generator, so its initial latents are the
+        same as a standalone render with that seed.
+        
+        Args:
+            batch: List of rendering arguments
+            step_callback: Optional per-step hook for every entry, see generate()
+            
+        Returns:
+            Output image paths in the same order as batch
+        
+        Raises:
+            The first error a step_callback raised
+        """
+        results = self._render_requests([(args, step_callback) for args in batch])
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results
+    
+    def _render_requests(
+        self, requests: List[Tuple[Dict[str, Any], Optional[StepCallback]]]
+    ) -> List[Union[str, BaseException]]:
+        """
+        Run (args, step_callback) requests as one pipeline call (see generate_batch).
+        
+        Returns:
+            Per request, the output path or the error its step_callback raised
+        """
+        batch = [args for args, _ in requests]
+        callbacks = [callback for _, callback in requests]
+        first = batch[0]
+        
+        # Borrow the resident pipeline; it is loaded once per process
+        with self.pool.lease(self.model_id, self.dtype, hf_token=self.hf_token) as pipeline:
+            if pipeline is None:
+                # Fallback: copy example image
+                print("Falling back to mock rendering")
+                return [self._mock_generate(args) for args in batch]
+            
+            print(f"Generating {len(batch)} image(s) with prompt: {first['prompt'][:50]}...")
+            
+            steps = first.get("num_inference_steps", 50)  # SDXL works well with 50 steps
+            self._use_scheduler(pipeline, first.get("scheduler", "default"))
+            generators = self._get_generators(batch)
+            extra = {}
+            if first.get("noise_size") and generators is not None:
+                extra["latents"] = self._downsampled_noise(pipeline, first, generators)
+            failed: Dict[int, BaseException] = {}
+            if any(callbacks):
+                def on_step_end(pipe, step, timestep, callback_kwargs):
+                    latents = callback_kwargs["latents"]
+                    for i, callback in enumerate(callbacks):
+                        if callback is None or i in failed:
+                            continue
+                        try:
+                            callback(step + 1, steps, latents[i:i + 1])
+                        except Exception as e:
+                            failed[i] = e
+                    if len(failed) == len(batch):
+                        raise failed[0]  # nothing left worth denoising
+                    return callback_kwargs
+                
+                extra["callback_on_step_end"] = on_step_end
+                extra["callback_on_step_end_tensor_inputs"] = ["latents"]
+            
+            guidance_scale = first.get("guidance_scale", 9.0)  # Higher guidance for better quality
+            prompts = [args["prompt"] for args in batch]
+            if hasattr(pipeline, "encode_prompt"):
+                # Reuse text-encoder outputs for prompts seen before
+                extra.update(self._prompt_embeds(pipeline, prompts, guidance_scale > 1.0))
+            else:
+                extra["prompt"] = prompts
+            
+            # Run inference with SDXL parameters
+            images = pipeline(
+                num_inference_steps=steps,
+                guidance_scale=guidance_scale,
+                width=first.get("width", 1024),
+                height=first.get("height", 1024),
+                generator=generators,
+                **extra,
+            ).images
+        
+        # Save outputs; renders aborted mid-batch get their error instead
+        paths: List[Union[str, BaseException]] = []
+        for i, image in enumerate(images):
+            if i in failed:
+                paths.append(failed[i])
+                continue
+            output_name = f"render_{uuid.uuid4().hex[:12]}.jpg"
+            output_path = self.output_dir / output_name
+            image.save(output_path, "JPEG", quality=95)
+            print(f"Image saved to: {output_path}")
+            paths.append(str(output_path))
+        return paths
+    
+    def _prompt_embeds(self, pipeline, prompts: List[str], do_cfg: bool) -> Dict[str, Any]:
+        """
+        Encode each prompt through the shared embedding cache and stack them.
+        
+        Returns:
+            prompt_embeds/pooled_prompt_embeds (and negatives under CFG) for the pipeline call
+        """
+        import torch
+        
+        def encode(prompt):
+            with torch.no_grad():
+                return pipeline.encode_prompt(
+                    prompt=prompt,
+                    device=pipeline.device,
+                    num_images_per_prompt=1,
+                    do_classifier_free_guidance=do_cfg,
+                )
+        
+        per_prompt = [
+            self.embed_cache.get_or_compute(
+                (self.model_id, self.dtype, str(pipeline.device), prompt, do_cfg),
+                lambda prompt=prompt: encode(prompt),
+            )
+            for prompt in prompts
+        ]
+        embeds = {}
+        for i, name in enumerate(EMBEDDING_NAMES):
+            parts = [p[i] for p in per_prompt]
+            if parts[0] is not None:
+                embeds[name] = torch.cat(parts)
+        return embeds
+    
+    def has_pipeline(self) -> bool:
+        """True if a real pipeline is loaded (renders are not mock fallbacks)."""
+        return self.pool.is_resident(self.model_id, self.dtype)
+    
+    def _batch_key(self, args: Dict[str, Any]) -> Tuple:
+        """Key under which renders can share a pipeline call."""
+        values = (args.get(f) for f in BATCH_KEY_FIELDS)
+        return (self.model_id, self.dtype) + tuple(tuple(v) if isinstance(v, list) else v for v in values)
+    
+    @staticmethod
+    def _use_scheduler(pipeline, name: str) -> None:
+        """Swap the pipeline's scheduler; instances are built once per pipeline."""
+        cache = pipeline.__dict__.get("_studioflow_schedulers")
+        if cache is None:
+            if name == "default":
+                return
+            cache = pipeline.__dict__.setdefault("_studioflow_schedulers", {"default": pipeline.scheduler})
+        if name not in cache:
+            import diffusers
+            
+            class_name, overrides = SCHEDULERS[name]
+            scheduler_cls = getattr(diffusers, class_name)
+            cache[name] = scheduler_cls.from_config(cache["default"].config, **overrides)
+        pipeline.scheduler = cache[name]
+    
+    @staticmethod
+    def _downsampled_noise(pipeline, args: Dict[str, Any], generators: List[Any]):
+        """
+        Draw each seed's noise at noise_size and average-pool it to the render size.
+        
+        Pooling k x k unit-variance samples divides the std by k, so the result
+        is scaled back by k to stay a valid initial latent.
+        """
+        import torch
+        import torch.nn.functional as F
+        
+        ref_w, ref_h = args["noise_size"]
+        factor = ref_w // args.get("width", 1024)
+        scale = pipeline.vae_scale_factor
+        shape = (1, pipeline.unet.config.in_channels, ref_h // scale, ref_w // scale)
+        noise = [
+            F.avg_pool2d(torch.randn(shape, generator=g, device=g.device), factor) * factor
+            for g in generators
+        ]
+        return torch.cat(noise).to(pipeline.device, dtype=pipeline.unet.dtype)
+    
+    def _get_generators(self, batch: List[Dict[str, Any]]):
+        """One seeded generator per batch entry (None if torch is unavailable)."""
+        generators = [self._get_generator(args.get("seed")) for args in batch]
+        if any(g is None for g in generators):
+            return None
+        return generators
     
     def _get_generator(self, seed: int = None):
         """Create torch Generator with seed."""
@@ -102,19 +267,28 @@ class FIBOClient:
             return None
     
     def _mock_generate(self, args: Dict[str, Any]) -> str:
-        """Fallback mock rendering (copies example image)."""
-        import shutil
-        
+        """Fallback mock rendering (the example image, stored once as a blob)."""
         example_path = self.output_dir.parent / "example_render.jpg"
-        output_name = f"render_{uuid.uuid4().hex[:12]}.jpg"
-        output_path = self.output_dir / output_name
         
         if example_path.exists():
-            shutil.copy(example_path, output_path)
-        else:
-            # Create placeholder
-            from PIL import Image
-            img = Image.new('RGB', (1024, 1024), color='#4a5568')
-            img.save(output_path, 'JPEG')
-        
-        return str(output_path)
+            return self.blobs.put(str(example_path))
+        
+        # Create placeholder
+        from PIL import Image
+        output_path = self.output_dir / f"render_{uuid.uuid4().hex[:12]}.jpg"
+        img = Image.new('RGB', (1024, 1024), color='#4a5568')
+        img.save(output_path, 'JPEG')
+        return self.blobs.put(str(output_path), move=True)
+
+
+_client: Optional[FIBOClient] = None
+_client_lock = threading.Lock()
+
+
+def get_fibo_client() -> FIBOClient:
+    """Return the process-wide FIBO client shared by every render path."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = FIBOClient()
+        return _client
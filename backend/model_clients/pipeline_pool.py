@@ -0,0 +1,281 @@
+"""
+Pipeline Pool - Resident Diffusers Pipelines
+
+Keeps loaded Stable Diffusion XL pipelines in memory so renders reuse them
+instead of calling from_pretrained on every request.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+PipelineKey = Tuple[str, str, str]
+
+
+def default_device() -> str:
+    """Return the device pipelines should run on ("cuda" when available)."""
+    try:
+        import torch
+
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    except ImportError:
+        return "cpu"
+
+
+def load_sdxl_pipeline(
+    model_id: str, dtype: str, device: str, hf_token: Optional[str] = None
+):
+    """
+    Load a Stable Diffusion XL pipeline and move it to the target device.
+
+    Args:
+        model_id: HuggingFace model ID or local path
+        dtype: torch dtype name (e.g. "float16")
+        device: Target device ("cuda" or "cpu")
+        hf_token: Optional HuggingFace token
+
+    Returns:
+        Loaded pipeline
+    """
+    from diffusers import StableDiffusionXLPipeline
+    import torch
+
+    print(f"Loading Stable Diffusion XL model: {model_id} ({dtype} on {device})")
+    pipeline = StableDiffusionXLPipeline.from_pretrained(
+        model_id,
+        torch_dtype=getattr(torch, dtype),
+        use_auth_token=hf_token if hf_token else None,
+    )
+    pipeline = pipeline.to(device)
+    if device == "cuda":
+        pipeline.enable_attention_slicing()
+    print("Model loaded successfully!")
+    return pipeline
+
+
+class _PoolEntry:
+    """A resident pipeline plus the lock that serializes inference on it."""
+
+    def __init__(self, pipeline: Any):
+        self.pipeline = pipeline
+        self.run_lock = threading.Lock()
+
+
+class _LoadLock:
+    """Per-key load lock, dropped from the pool once nobody holds or awaits it."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+
+
+class PipelinePool:
+    """
+    Process-wide LRU registry of loaded pipelines.
+
+    Each (model_id, dtype, device) combination is loaded once and kept
+    resident until it is evicted to make room for another model. A failed
+    load is remembered: the model is not retried until its backoff expires
+    (FIBO_PIPELINE_RETRY_S, doubling per consecutive failure up to
+    FIBO_PIPELINE_RETRY_MAX_S).
+    """
+
+    def __init__(
+        self,
+        capacity: Optional[int] = None,
+        loader: Optional[Callable[..., Any]] = None,
+        retry_s: Optional[float] = None,
+        retry_max_s: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.capacity = max(
+            1, capacity or int(os.getenv("FIBO_PIPELINE_POOL_SIZE", "1"))
+        )
+        self.retry_s = (
+            retry_s if retry_s is not None else float(os.getenv("FIBO_PIPELINE_RETRY_S", "30"))
+        )
+        self.retry_max_s = (
+            retry_max_s
+            if retry_max_s is not None
+            else float(os.getenv("FIBO_PIPELINE_RETRY_MAX_S", "600"))
+        )
+        self._loader = loader or load_sdxl_pipeline
+        self._clock = clock
+        self._entries: "OrderedDict[PipelineKey, _PoolEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[PipelineKey, _LoadLock] = {}
+        # key -> (consecutive failures, clock time the next load may be tried)
+        self._failures: Dict[PipelineKey, Tuple[int, float]] = {}
+        self._stats = {
+            "loads": 0,
+            "hits": 0,
+            "evictions": 0,
+            "load_failures": 0,
+            "load_backoffs": 0,
+        }
+
+    def _in_backoff(self, key: PipelineKey) -> bool:
+        """Return True (and count it) if key failed recently. Caller holds _lock."""
+        failure = self._failures.get(key)
+        if failure is None or self._clock() >= failure[1]:
+            return False
+        self._stats["load_backoffs"] += 1
+        return True
+
+    def _entry(
+        self, model_id: str, dtype: str, device: Optional[str], hf_token: Optional[str]
+    ) -> Optional[_PoolEntry]:
+        key = (model_id, dtype, device or default_device())
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry
+            if self._in_backoff(key):
+                return None
+            load_lock = self._load_locks.setdefault(key, _LoadLock())
+            load_lock.users += 1
+
+        # Load outside the registry lock so other models stay available;
+        # the per-key lock stops concurrent requests loading the same model twice.
+        evicted = []
+        try:
+            with load_lock.lock:
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if entry is not None:
+                        self._entries.move_to_end(key)
+                        self._stats["hits"] += 1
+                        return entry
+                    # A load that failed while we waited is not retried here
+                    if self._in_backoff(key):
+                        return None
+
+                try:
+                    pipeline = self._loader(key[0], key[1], key[2], hf_token)
+                except Exception as e:
+                    with self._lock:
+                        self._stats["load_failures"] += 1
+                        count = self._failures.get(key, (0, 0.0))[0] + 1
+                        delay = min(self.retry_s * 2 ** (count - 1), self.retry_max_s)
+                        self._failures[key] = (count, self._clock() + delay)
+                    print(
+                        f"Warning: Could not load pipeline {key[0]}: {e} "
+                        f"(retrying in {delay:.0f}s)"
+                    )
+                    return None
+
+                entry = _PoolEntry(pipeline)
+                with self._lock:
+                    self._failures.pop(key, None)
+                    self._entries[key] = entry
+                    self._stats["loads"] += 1
+                    while len(self._entries) > self.capacity:
+                        evicted.append(self._entries.popitem(last=False))
+                        self._stats["evictions"] += 1
+        finally:
+            with self._lock:
+                load_lock.users -= 1
+                if load_lock.users == 0:
+                    del self._load_locks[key]
+
+        for evicted_key, _ in evicted:
+            print(
+                f"Evicted pipeline {evicted_key[0]} ({evicted_key[1]} on {evicted_key[2]})"
+            )
+        if evicted:
+            self._release_device_memory()
+        return entry
+
+    def get(
+        self,
+        model_id: str,
+        dtype: str = "float16",
+        device: Optional[str] = None,
+        hf_token: Optional[str] = None,
+    ):
+        """
+        Return the resident pipeline for a model, loading it on first use.
+
+        Returns:
+            The pipeline, or None if it could not be loaded or its
+            last load failed within the retry backoff
+        """
+        entry = self._entry(model_id, dtype, device, hf_token)
+        return entry.pipeline if entry is not None else None
+
+    @contextmanager
+    def lease(
+        self,
+        model_id: str,
+        dtype: str = "float16",
+        device: Optional[str] = None,
+        hf_token: Optional[str] = None,
+    ) -> Iterator[Any]:
+        """
+        Borrow a pipeline for exclusive use during one inference call.
+
+        Diffusers pipelines keep scheduler state per call, so concurrent
+        requests for the same model wait on the entry's run lock.
+        Yields None if the pipeline could not be loaded.
+        """
+        entry = self._entry(model_id, dtype, device, hf_token)
+        if entry is None:
+            yield None
+            return
+        with entry.run_lock:
+            yield entry.pipeline
+
+    def is_resident(
+        self, model_id: str, dtype: str = "float16", device: Optional[str] = None
+    ) -> bool:
+        """Return True if the pipeline is loaded, without loading it."""
+        with self._lock:
+            return (model_id, dtype, device or default_device()) in self._entries
+
+    def stats(self) -> Dict[str, Any]:
+        """Return load/hit/eviction counters and the resident models."""
+        with self._lock:
+            return {
+                **self._stats,
+                "capacity": self.capacity,
+                "resident": [
+                    {"model_id": k[0], "dtype": k[1], "device": k[2]}
+                    for k in self._entries
+                ],
+            }
+
+    def clear(self) -> None:
+        """Drop every resident pipeline and forget load failures."""
+        with self._lock:
+            self._entries.clear()
+            self._failures.clear()
+        self._release_device_memory()
+
+    @staticmethod
+    def _release_device_memory() -> None:
+        try:
+            import torch
+
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+
+_pool: Optional[PipelinePool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pipeline_pool() -> PipelinePool:
+    """Return the process-wide pipeline pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PipelinePool()
+        return _pool
@@ -0,0 +1,57 @@
+"""
+Latent Previews
+
+Cheap RGB approximations of in-progress SDXL latents for progressive
+render previews. Skips the VAE entirely: a 4x3 linear map turns each latent
+pixel into a colour, giving a 1/8-resolution preview in well under a
+millisecond.
+"""
+
+import io
+from typing import Any
+
+import numpy as np
+from PIL import Image
+
+# Approximate SDXL latent channel -> RGB contribution
+SDXL_LATENT_RGB_FACTORS = np.array(
+    [
+        [0.3651, 0.4232, 0.4341],
+        [-0.2533, -0.0042, 0.1068],
+        [0.1076, 0.1111, -0.0362],
+        [-0.3165, -0.2492, -0.2188],
+    ],
+    dtype=np.float32,
+)
+SDXL_LATENT_RGB_BIAS = np.array([0.1084, -0.0175, -0.0011], dtype=np.float32)
+
+
+def latents_to_preview(latents: Any, index: int = 0) -> Image.Image:
+    """
+    Approximate the image for one sample of a latent batch.
+
+    Args:
+        latents: Tensor or array shaped (batch, 4, h, w)
+        index: Sample in the batch to preview
+
+    Returns:
+        RGB image at latent resolution (1/8 of the output size)
+    """
+    sample = latents[index]
+    if hasattr(sample, "detach"):
+        sample = sample.detach().float().cpu().numpy()
+    sample = np.asarray(sample, dtype=np.float32)
+
+    rgb = np.tensordot(sample, SDXL_LATENT_RGB_FACTORS, axes=([0], [0]))
+    rgb += SDXL_LATENT_RGB_BIAS
+    rgb += 1.0
+    rgb *= 127.5
+    np.clip(rgb, 0, 255, out=rgb)
+    return Image.fromarray(rgb.astype(np.uint8), "RGB")
+
+
+def latents_to_preview_jpeg(latents: Any, index: int = 0, quality: int = 70) -> bytes:
+    """Encode a latent preview as JPEG bytes."""
+    buf = io.BytesIO()
+    latents_to_preview(latents, index).save(buf, "JPEG", quality=quality)
+    return buf.getvalue()
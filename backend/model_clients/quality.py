@@ -0,0 +1,125 @@
+"""
+Render Quality Tiers
+
+Maps draft/standard/final quality levels to resolution, step count and
+scheduler for the resident SDXL pipeline.
+"""
+
+import os
+from typing import Any, Dict, Optional
+
+QUALITY_TIERS: Dict[str, Dict[str, Any]] = {
+    # Exploratory renders: quarter the pixels, a third of the steps
+    "draft": {
+        "width": 512,
+        "height": 512,
+        "num_inference_steps": 15,
+        "scheduler": "dpmpp_2m_karras",
+    },
+    "standard": {
+        "width": 1024,
+        "height": 1024,
+        "num_inference_steps": 30,
+        "scheduler": "dpmpp_2m_karras",
+    },
+    # Matches the original hardcoded render settings
+    "final": {
+        "width": 1024,
+        "height": 1024,
+        "num_inference_steps": 50,
+        "scheduler": "default",
+    },
+}
+
+# Scheduler name -> (diffusers class, from_config overrides); "default" keeps
+# the scheduler the model shipped with
+SCHEDULERS: Dict[str, Any] = {
+    "default": None,
+    "euler_a": ("EulerAncestralDiscreteScheduler", {}),
+    "dpmpp_2m": ("DPMSolverMultistepScheduler", {}),
+    "dpmpp_2m_karras": ("DPMSolverMultistepScheduler", {"use_karras_sigmas": True}),
+}
+
+# render_settings keys a request may override on top of its tier
+OVERRIDABLE_SETTINGS = (
+    "width",
+    "height",
+    "num_inference_steps",
+    "guidance_scale",
+    "scheduler",
+)
+
+# Bounds for overridden settings; SDXL latents are 1/8 of the image size
+MAX_DIMENSION = 2048
+MAX_STEPS = 150
+MAX_GUIDANCE_SCALE = 30.0
+
+
+def _check_int(name: str, value: Any, maximum: int, multiple: int = 1) -> None:
+    # bool is an int subclass; "512" is a str, not a size
+    if isinstance(value, bool) or not isinstance(value, int) or not 0 < value <= maximum:
+        raise ValueError(f"{name} must be an integer between 1 and {maximum} (got {value!r})")
+    if value % multiple:
+        raise ValueError(f"{name} must be a multiple of {multiple} (got {value})")
+
+
+def resolve_quality(quality: Optional[str]) -> str:
+    """
+    Return a valid tier name, defaulting to FIBO_DEFAULT_QUALITY.
+
+    Raises:
+        ValueError: If quality names an unknown tier
+    """
+    quality = quality or os.getenv("FIBO_DEFAULT_QUALITY", "final")
+    if quality not in QUALITY_TIERS:
+        raise ValueError(
+            f"quality must be one of: {', '.join(QUALITY_TIERS)} (got {quality!r})"
+        )
+    return quality
+
+
+def tier_render_args(
+    quality: Optional[str], render_settings: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Build size/steps/scheduler args for a tier plus explicit overrides.
+
+    Renders whose size evenly divides the final tier's size also get
+    noise_size, so the client draws the seed's noise at final resolution
+    and downsamples it. A draft then shares its composition with the final
+    render of the same seed and prompt.
+
+    Args:
+        quality: draft, standard or final
+        render_settings: Optional per-request overrides (e.g. num_inference_steps)
+
+    Returns:
+        Dict of width, height, num_inference_steps, scheduler and maybe noise_size
+
+    Raises:
+        ValueError: If the tier, scheduler or an overridden setting is invalid
+    """
+    args = dict(QUALITY_TIERS[resolve_quality(quality)])
+    for key in OVERRIDABLE_SETTINGS:
+        if render_settings and render_settings.get(key) is not None:
+            args[key] = render_settings[key]
+
+    if args["scheduler"] not in SCHEDULERS:
+        raise ValueError(f"scheduler must be one of: {', '.join(SCHEDULERS)}")
+    _check_int("width", args["width"], MAX_DIMENSION, multiple=8)
+    _check_int("height", args["height"], MAX_DIMENSION, multiple=8)
+    _check_int("num_inference_steps", args["num_inference_steps"], MAX_STEPS)
+    guidance = args.get("guidance_scale")
+    if guidance is not None and (
+        isinstance(guidance, bool)
+        or not isinstance(guidance, (int, float))
+        or not 0 <= guidance <= MAX_GUIDANCE_SCALE
+    ):
+        raise ValueError(f"guidance_scale must be a number between 0 and {MAX_GUIDANCE_SCALE} (got {guidance!r})")
+
+    final = QUALITY_TIERS["final"]
+    scale_w, rem_w = divmod(final["width"], args["width"])
+    scale_h, rem_h = divmod(final["height"], args["height"])
+    if rem_w == rem_h == 0 and scale_w == scale_h and scale_w > 1:
+        args["noise_size"] = [final["width"], final["height"]]
+    return args
@@ -1,35 +1,107 @@
-import os , uuid ,shutil
+import os , uuid
+import hashlib
 from PIL import Image
 
 # Get the backend directory (parent of orchestrator)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 UPLOAD_DIR = os.path.join(BASE_DIR, 'uploads')
 
+# ControlNet references are normalized to fit in this box
+CONTROLNET_SIZE = (512, 512)
+CHUNK_SIZE = 1024 * 1024
+
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-def save_upload(fileobj, filename):
+
+def upload_url(path):
+    """API path (relative to the backend dir) for a file under UPLOAD_DIR."""
+    rel = os.path.relpath(path, BASE_DIR)
+    return f"/{rel.replace(os.path.sep,'/')}"
+
+
+def upload_path_for(image_ref):
+    """
+    Map an API path like /uploads/upload_<hash>.png back to the file on disk.
+
+    Only the file name is used, so a reference can never point outside
+    UPLOAD_DIR. Returns None if no such upload exists.
+    """
+    if not image_ref:
+        return None
+    path = os.path.join(UPLOAD_DIR, os.path.basename(str(image_ref)))
+    return path if os.path.isfile(path) else None
+
+
+def spool_and_hash(fileobj, out_path):
     """
+    Copy an upload to out_path in chunks, hashing it on the way through.
+
     fileobj: starlette UploadFile.file-like object or path
-    returns relative path from repo root to saved file (for API use)
+    returns hex SHA-256 of the content
     """
-    ext = os.path.splitext(filename)[1].lower() or ".png"
-    out_name = f"upload_{uuid.uuid4().hex[:12]}{ext}"
-    out_path = os.path.join(UPLOAD_DIR, out_name)
-    # fileobj may be SpooledTemporaryFile or a path
-    if hasattr(fileobj,"read"):
-        with open(out_path,"wb") as out_file:
-            shutil.copyfileobj(fileobj,out_file)
-    else:
-        # it is a path
-        shutil.copyfile(fileobj,out_path)
-    # Optically  normalize size for ControlNet models
+    digest = hashlib.sha256()
+    src = fileobj if hasattr(fileobj, "read") else open(fileobj, "rb")
     try:
-        im = Image.open(out_path)
+        with open(out_path, "wb") as out_file:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                out_file.write(chunk)
+    finally:
+        if src is not fileobj:
+            src.close()
+    return digest.hexdigest()
+
+
+def normalize_image(src_path, out_path, size=CONTROLNET_SIZE):
+    """
+    Downscale an image to fit size and save it as RGB to out_path.
+
+    JPEGs are decoded at a reduced scale via draft(), so a large photo is
+    never fully decoded just to be thumbnailed.
+    """
+    with Image.open(src_path) as im:
+        im.draft("RGB", size)
         im = im.convert("RGB")
-        im.thumbnail((512,512),Image.LANCZOS)
+        im.thumbnail(size, Image.LANCZOS)
         im.save(out_path)
-    except Exception as e:
-        print(f"Warning: could not process image {out_path}: {e}")
 
-    rel = os.path.relpath(out_path,BASE_DIR)
-    return f"/{rel.replace(os.path.sep,'/')}"
\ No newline at end of file
+
+def ingest_upload(fileobj, filename):
+    """
+    Store a ControlNet reference image under a content-addressed name.
+
+    The upload is hashed while it is spooled to a temp file; content seen
+    before is dropped and the existing normalized file reused, so repeated
+    uploads of the same sketch skip decoding and resizing entirely.
+    Blocking; call it from a worker thread in async handlers.
+
+    Returns:
+        {"path", "sha256", "deduplicated"}; path is the API path of the normalized image
+    """
+    ext = os.path.splitext(filename or "")[1].lower() or ".png"
+    tmp_path = os.path.join(UPLOAD_DIR, f".spool_{uuid.uuid4().hex[:12]}{ext}")
+    try:
+        sha256 = spool_and_hash(fileobj, tmp_path)
+        out_path = os.path.join(UPLOAD_DIR, f"upload_{sha256[:24]}{ext}")
+        if os.path.exists(out_path):
+            return {"path": upload_url(out_path), "sha256": sha256, "deduplicated": True}
+
+        # Optically  normalize size for ControlNet models
+        try:
+            normalize_image(tmp_path, tmp_path)
+        except Exception as e:
+            print(f"Warning: could not process image {filename}: {e}")
+        # Atomic, so a concurrent identical upload never sees a partial file
+        os.replace(tmp_path, out_path)
+        return {"path": upload_url(out_path), "sha256": sha256, "deduplicated": False}
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def save_upload(fileobj, filename):
+    """
+    fileobj: starlette UploadFile.file-like object or path
+    returns relative path from repo root to saved file (for API use)
+    """
+    return ingest_upload(fileobj, filename)["path"]
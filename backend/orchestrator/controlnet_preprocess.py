@@ -0,0 +1,202 @@
+"""
+ControlNet Preprocessing
+
+Turns an uploaded reference image into the control map a ControlNet model
+conditions on (canny edges, sketch lineart, depth). Maps are computed once
+per (upload, preprocessor, parameters) and stored on disk under a
+content-derived name, so every later render with the same reference reuses
+the file instead of recomputing it.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import cv2
+import numpy as np
+
+CONTROL_MAP_DIR = Path(__file__).parent.parent / "cache" / "controlnet"
+
+# Takes a BGR uint8 image plus keyword params, returns a uint8 control map
+Preprocessor = Callable[..., np.ndarray]
+
+
+def canny_map(image: np.ndarray, low_threshold: int = 100, high_threshold: int = 200) -> np.ndarray:
+    """White-on-black Canny edges of the image."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return cv2.Canny(gray, low_threshold, high_threshold)
+
+
+def sketch_map(image: np.ndarray, blur: int = 21, threshold: int = 240) -> np.ndarray:
+    """
+    White-on-black lineart via a color-dodge pencil sketch.
+
+    Dividing the gray image by its blurred inverse leaves flat regions near
+    white and strokes dark; those are thresholded and inverted into lines.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    blur |= 1  # kernel size must be odd
+    blurred = cv2.GaussianBlur(255 - gray, (blur, blur), 0)
+    dodged = cv2.divide(gray, 255 - blurred, scale=256)
+    _, lines = cv2.threshold(dodged, threshold, 255, cv2.THRESH_BINARY_INV)
+    return lines
+
+
+def luminance_depth_map(image: np.ndarray, blur: int = 31, ground_weight: float = 0.5) -> np.ndarray:
+    """
+    Lightweight depth estimate (near = bright) without a model.
+
+    Blends smoothed luminance with a vertical ramp, assuming the lower part
+    of a product/studio shot is closer to the camera. Register a model-based
+    estimator under "depth" (see register_preprocessor) for real depth.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY).astype(np.float32)
+    blur |= 1
+    smooth = cv2.GaussianBlur(gray, (blur, blur), 0)
+    ramp = np.linspace(0.0, 255.0, image.shape[0], dtype=np.float32)[:, None]
+    depth = smooth * (1.0 - ground_weight) + ramp * ground_weight
+    return cv2.normalize(depth, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+
+
+# ControlNet type -> (preprocessor, default params)
+PREPROCESSORS: Dict[str, Any] = {}
+
+
+def register_preprocessor(name: str, fn: Preprocessor, **defaults: Any) -> None:
+    """
+    Register (or replace) the preprocessor for a ControlNet type.
+
+    Args:
+        name: ControlNet type, e.g. "depth"
+        fn: Callable taking a BGR uint8 image and keyword params, returning a uint8 map
+        defaults: Parameter defaults; only these keys are accepted from requests
+    """
+    PREPROCESSORS[name] = (fn, defaults)
+
+
+register_preprocessor("canny", canny_map, low_threshold=100, high_threshold=200)
+register_preprocessor("sketch", sketch_map, blur=21, threshold=240)
+register_preprocessor("depth", luminance_depth_map, blur=31, ground_weight=0.5)
+
+
+def resolve_params(kind: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Defaults for kind overridden by any known keys in params.
+
+    Raises:
+        ValueError: If kind has no registered preprocessor
+    """
+    if kind not in PREPROCESSORS:
+        raise ValueError(f"No preprocessor for ControlNet type {kind!r}; expected one of: {', '.join(PREPROCESSORS)}")
+    _, defaults = PREPROCESSORS[kind]
+    params = params or {}
+    return {key: params.get(key, default) for key, default in defaults.items()}
+
+
+def control_map_url(path: str) -> str:
+    """Public URL of a cached control map."""
+    return f"/control_maps/{os.path.basename(path)}"
+
+
+def control_map_path_for(url: Optional[str], cache_dir: Optional[Path] = None) -> Optional[str]:
+    """Map a /control_maps/<name>.png URL back to the cached file, if it exists."""
+    if not url:
+        return None
+    path = Path(cache_dir or CONTROL_MAP_DIR) / os.path.basename(str(url))
+    return str(path) if path.is_file() else None
+
+
+class _KeyLock:
+    """Per-key compute lock, dropped once nobody holds or awaits it."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+
+
+class ControlMapCache:
+    """
+    On-disk control maps named <kind>_<upload>_<params digest>.png.
+
+    Uploads are content-addressed (see controlnet_adapter.ingest_upload), so
+    the upload's file name identifies its content. Concurrent requests for
+    the same map compute it once.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = Path(cache_dir or CONTROL_MAP_DIR)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, _KeyLock] = {}
+        self._stats = {"hits": 0, "misses": 0}
+
+    def key(self, image_path: str, kind: str, params: Dict[str, Any]) -> str:
+        """Cache key for resolved params (see resolve_params)."""
+        fn, _ = PREPROCESSORS[kind]
+        # The function identity is part of the key: swapping the depth
+        # estimator must not serve maps made by the old one
+        spec = json.dumps(
+            {"fn": f"{fn.__module__}.{fn.__qualname__}", "params": params},
+            sort_keys=True, default=str,
+        )
+        digest = hashlib.sha256(spec.encode("utf-8")).hexdigest()[:16]
+        return f"{kind}_{Path(image_path).stem}_{digest}"
+
+    def get(self, image_path: str, kind: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Path of the control map for an uploaded image, computing it on a miss.
+
+        Args:
+            image_path: Uploaded reference image on disk
+            kind: ControlNet type (canny/sketch/depth or a registered one)
+            params: Preprocessor parameters; unknown keys are ignored
+
+        Returns:
+            Path of the cached PNG map
+        """
+        params = resolve_params(kind, params)
+        key = self.key(image_path, kind, params)
+        path = self.cache_dir / f"{key}.png"
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, _KeyLock())
+            key_lock.users += 1
+        try:
+            with key_lock.lock:
+                hit = path.exists()
+                if not hit:
+                    self._compute(image_path, kind, params, path)
+        finally:
+            # Waiters still hold a reference, so the lock outlives the first caller
+            with self._lock:
+                key_lock.users -= 1
+                if key_lock.users == 0:
+                    del self._key_locks[key]
+        with self._lock:
+            self._stats["hits" if hit else "misses"] += 1
+        return str(path)
+
+    def _compute(self, image_path: str, kind: str, params: Dict[str, Any], path: Path) -> None:
+        image = cv2.imread(str(image_path), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Could not read image {image_path}")
+        fn, _ = PREPROCESSORS[kind]
+        control = fn(image, **params)
+        # Written aside and renamed, so readers never see a partial PNG
+        tmp = path.with_name(f".{path.stem}_{uuid.uuid4().hex[:8]}.png")
+        if not cv2.imwrite(str(tmp), control):
+            raise OSError(f"Could not write control map {path}")
+        os.replace(tmp, path)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters."""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": (self._stats["hits"] / lookups) if lookups else 0.0,
+            }
@@ -0,0 +1,245 @@
+"""
+Render Job Queue
+
+Runs blocking renders on a bounded pool of worker threads so API handlers
+can return a job ID immediately instead of stalling the event loop.
+"""
+
+import os
+import threading
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class JobCancelledError(Exception):
+    """Raised by a handler that stopped early because its job was cancelled."""
+
+
+class RenderJob:
+    """A single queued render and its lifecycle state."""
+
+    def __init__(self, payload: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.status = QUEUED
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.cancel_requested = threading.Event()
+        self.done = threading.Event()
+        self._events: List[Dict[str, Any]] = []
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    def publish(self, event: str, data: Dict[str, Any]) -> None:
+        """
+        Append an event for streaming subscribers.
+
+        Only the latest "preview" event is buffered, so memory stays bounded
+        however many previews a render emits.
+        """
+        with self._cond:
+            if event == "preview":
+                self._events = [e for e in self._events if e["event"] != "preview"]
+            self._seq += 1
+            self._events.append({"seq": self._seq, "event": event, "data": data})
+            self._cond.notify_all()
+
+    def events_after(self, seq: int, timeout: float = 15.0) -> List[Dict[str, Any]]:
+        """
+        Return buffered events newer than seq, waiting up to timeout for one.
+
+        Returns an empty list on timeout (callers can send a keep-alive).
+        """
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._seq > seq or self.done.is_set(), timeout=timeout
+            )
+            return [e for e in self._events if e["seq"] > seq]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize job status for API responses."""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class RenderJobQueue:
+    """
+    Bounded FIFO of render jobs drained by a fixed pool of worker threads.
+
+    Workers share the process-wide pipeline pool, so threads (not processes)
+    keep a single resident copy of each model.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[RenderJob], Dict[str, Any]],
+        max_workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        history: Optional[int] = None,
+    ):
+        """
+        Args:
+            handler: Called on a worker thread with the job; returns the job result
+            max_workers: Number of worker threads (RENDER_WORKERS)
+            max_queue: Maximum queued jobs before submissions are rejected (RENDER_QUEUE_SIZE)
+            history: Finished jobs kept for status polling (RENDER_JOB_HISTORY)
+        """
+        self.handler = handler
+        self.max_workers = max_workers or int(os.getenv("RENDER_WORKERS", "1"))
+        self.max_queue = max_queue or int(os.getenv("RENDER_QUEUE_SIZE", "32"))
+        self.history = history or int(os.getenv("RENDER_JOB_HISTORY", "1000"))
+        # Jobs waiting for a worker; cancelling one removes it, freeing its slot
+        self._pending: "deque[RenderJob]" = deque()
+        self._jobs: "OrderedDict[str, RenderJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._workers: List[threading.Thread] = []
+        self._stop = threading.Event()
+
+    def _ensure_workers(self) -> None:
+        if self._workers:
+            return
+        # Each generation of workers gets its own stop flag, so a restart
+        # after shutdown() isn't stopped by the previous one
+        self._stop = threading.Event()
+        for i in range(self.max_workers):
+            worker = threading.Thread(
+                target=self._work, args=(self._stop,), name=f"render-worker-{i}", daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, payload: Dict[str, Any]) -> RenderJob:
+        """
+        Enqueue a render.
+
+        Raises:
+            QueueFullError: If max_queue jobs are already waiting
+        """
+        job = RenderJob(payload)
+        with self._lock:
+            if len(self._pending) >= self.max_queue:
+                raise QueueFullError(
+                    f"Render queue is full ({self.max_queue} jobs waiting)"
+                )
+            self._ensure_workers()
+            self._pending.append(job)
+            self._ready.notify()
+            self._jobs[job.id] = job
+            self._trim_history()
+        return job
+
+    def get(self, job_id: str) -> Optional[RenderJob]:
+        """Look up a job by ID."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[RenderJob]:
+        """
+        Cancel a job.
+
+        Queued jobs are cancelled immediately and leave the queue, freeing
+        their slot; running jobs are flagged so the handler can raise
+        JobCancelledError at its next checkpoint. Finished jobs are unchanged.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return job
+            job.cancel_requested.set()
+            if job.status == QUEUED:
+                self._pending.remove(job)
+                self._finish(job, CANCELLED)
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and per-status job counts."""
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queued": len(self._pending),
+                "jobs": counts,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop workers after the jobs already queued have drained.
+
+        Never blocks unless wait is set, however full the queue is.
+        """
+        with self._lock:
+            workers, self._workers = self._workers, []
+            self._stop.set()
+            self._ready.notify_all()
+        if wait:
+            for worker in workers:
+                worker.join()
+
+    def _work(self, stop: threading.Event) -> None:
+        while True:
+            with self._lock:
+                self._ready.wait_for(lambda: self._pending or stop.is_set())
+                if not self._pending:
+                    return
+                job = self._pending.popleft()
+                job.status = RUNNING
+                job.started_at = datetime.utcnow().isoformat()
+                job.publish("status", job.to_dict())
+            try:
+                result = self.handler(job)
+            except JobCancelledError:
+                with self._lock:
+                    self._finish(job, CANCELLED)
+                continue
+            except Exception as e:
+                with self._lock:
+                    job.error = str(e)
+                    self._finish(job, FAILED)
+                continue
+            with self._lock:
+                job.result = result
+                self._finish(job, DONE)
+
+    def _finish(self, job: RenderJob, status: str) -> None:
+        job.status = status
+        job.finished_at = datetime.utcnow().isoformat()
+        job.publish("status", job.to_dict())
+        job.done.set()
+
+    def _trim_history(self) -> None:
+        # Forget the oldest finished jobs; queued and running jobs are never dropped
+        excess = len(self._jobs) - self.history
+        if excess <= 0:
+            return
+        for job_id in [
+            j.id for j in self._jobs.values() if j.status in FINISHED_STATES
+        ][:excess]:
+            del self._jobs[job_id]
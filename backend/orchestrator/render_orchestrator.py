@@ -1,20 +1,69 @@
 """
 Render Orchestrator
 
-Builds pipeline arguments and invokes FIBO model or ComfyUI.
+The one render pipeline behind /render, /render_controlnet and SKU batch
+jobs: build pipeline arguments, prepare the control map, check the render
+cache, dispatch to a backend (FIBO/Diffusers or ComfyUI), hand the image to
+storage, and record the version.
 """
 
 import os
-from typing import Dict, Any, Optional
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
 from datetime import datetime
 
+from backend.model_clients.quality import tier_render_args
+from backend.orchestrator.job_queue import JobCancelledError
+from backend.orchestrator.controlnet_adapter import upload_path_for
+from backend.orchestrator.controlnet_preprocess import ControlMapCache, control_map_url
+from backend.orchestrator.render_router import (
+    PASSTHROUGH_ERRORS,
+    ComfyUIBackend,
+    RenderRouter,
+    UnsupportedRenderError,
+    get_render_router,
+)
+from backend.storage.blob_store import BlobStore, get_blob_store
+from backend.storage.render_cache import RenderCache, render_cache_key
+from backend.storage.store import StorageManager
+from backend.storage.version_store import VersionStore
+from backend.translator.translator import params_to_enhanced_prompt
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_RENDER = os.path.join(BASE_DIR, "samples", "example_render.jpg")
+
 
 class RenderOrchestrator:
-    """Coordinates rendering pipeline execution."""
+    """
+    Coordinates rendering pipeline execution.
+    
+    One long-lived instance is shared by every entry point, so they all use
+    the same router (and through it the shared FIBO and ComfyUI clients),
+    render cache, control map cache, storage and version store.
+    """
     
-    def __init__(self, use_comfyui: bool = False):
-        self.use_comfyui = use_comfyui
+    def __init__(
+        self,
+        use_comfyui: bool = False,
+        router: Optional[RenderRouter] = None,
+        render_cache: Optional[RenderCache] = None,
+        control_maps: Optional[ControlMapCache] = None,
+        version_store: Optional[VersionStore] = None,
+        storage: Optional[StorageManager] = None,
+        blobs: Optional[BlobStore] = None,
+    ):
+        if router is None:
+            router = RenderRouter([ComfyUIBackend()]) if use_comfyui else get_render_router()
+        self.router = router
+        self.render_cache = render_cache
+        self.control_maps = control_maps
+        self.version_store = version_store
+        # Publishes finished renders (e.g. queues the S3 upload); local URLs otherwise
+        self.storage = storage
+        self.blobs = blobs or get_blob_store()
         
+    
     def prepare_render_args(self, scene_json: Dict[str, Any]) -> Dict[str, Any]:
         """
         Convert FIBO JSON manifest to rendering pipeline arguments.
@@ -39,6 +88,7 @@ class RenderOrchestrator:
             focal = scene_json["camera"].get("lens", {}).get("focal_length_mm", 50)
             # Adjust CFG based on focal length
             args["guidance_scale"] = self._focal_to_cfg(focal)
+            args["focal_length_mm"] = focal
             
         # Map lighting to prompt modifiers
         if "lighting" in scene_json:
@@ -53,6 +103,8 @@ class RenderOrchestrator:
             args["controlnet_image"] = scene_json["controlnet"]["image_ref"]
             args["controlnet_strength"] = scene_json["controlnet"].get("strength", 0.8)
             args["controlnet_type"] = scene_json["controlnet"].get("type", "sketch")
+            if scene_json["controlnet"].get("control_map"):
+                args["controlnet_map"] = scene_json["controlnet"]["control_map"]
             
         return args
     
@@ -70,7 +122,7 @@ class RenderOrchestrator:
     
     def invoke_render(self, render_args: Dict[str, Any]) -> str:
         """
-        Execute the render using configured backend.
+        Execute the render on the least-loaded healthy backend.
         
         Args:
             render_args: Prepared rendering arguments
@@ -78,22 +130,187 @@ class RenderOrchestrator:
         Returns:
             Path to rendered output image
         """
-        if self.use_comfyui:
-            return self._render_with_comfyui(render_args)
-        else:
-            return self._render_with_fibo(render_args)
+        return self.router.dispatch(render_args)
+    
+    def render_args_for(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Rendering arguments for either input format.
+        
+        FIBO manifests (with a "scene" block) go through prepare_render_args;
+        frontend RenderParameters are translated to an enhanced prompt and
+        sized by their quality tier (draft/standard/final).
+        """
+        if "scene" in payload:
+            return self.prepare_render_args(payload)
+        return {
+            "prompt": params_to_enhanced_prompt(payload),
+            "seed": payload.get("seed"),
+            "guidance_scale": 9.0,  # Higher guidance for better quality
+            **tier_render_args(payload.get("quality"), payload.get("render_settings")),
+        }
     
-    def _render_with_fibo(self, args: Dict[str, Any]) -> str:
-        """Render using direct FIBO/Diffusers pipeline."""
-        from model_clients.fibo_client import FIBOClient
+    def check_supported(self, payload: Dict[str, Any], streaming: bool = False) -> None:
+        """
+        Reject a job no configured backend can render, before it is queued.
         
-        client = FIBOClient()
-        return client.generate(args)
+        Raises:
+            ValueError: If the quality tier or render settings are invalid
+            UnsupportedRenderError: If no backend supports the job
+        """
+        self.router.check(self.render_args_for(payload), streaming)
+    
+    def prepare_control_map(self, payload: Dict[str, Any]) -> None:
+        """
+        Resolve the control map for a manifest's controlnet block, computing it
+        only the first time an upload/type/params combination is seen, and
+        record its URL in controlnet["control_map"] for the backend and the
+        version. Preprocessor params (e.g. low_threshold) are read from the
+        block itself.
+        """
+        controlnet = payload.get("controlnet")
+        if self.control_maps is None or not isinstance(controlnet, dict):
+            return
+        kind = controlnet.get("type", "none")
+        image_path = upload_path_for(controlnet.get("image_ref") or controlnet.get("image"))
+        if kind == "none" or not image_path:
+            return
+        try:
+            map_path = self.control_maps.get(image_path, kind, controlnet)
+        except Exception as e:
+            print(f"Warning: could not preprocess {image_path} as {kind}: {e}")
+            return
+        controlnet["control_map"] = control_map_url(map_path)
     
-    def _render_with_comfyui(self, args: Dict[str, Any]) -> str:
-        """Render using ComfyUI workflow."""
-        import requests
+    def render(
+        self,
+        payload: Dict[str, Any],
+        step_callback: Optional[Callable] = None,
+        cancelled: Optional[threading.Event] = None,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Render a manifest or RenderParameters payload to an image file.
+        
+        Seeded renders are looked up in the render cache first, under each
+        backend able to render them, and stored under the backend that did
+        when its output is reproducible. Falls back to mock rendering if
+        every backend fails.
         
-        comfyui_url = os.getenv("COMFYUI_URL", "http://localhost:8188")
-        # TODO: Load recipe, map args, submit to ComfyUI API
-        raise NotImplementedError("ComfyUI integration pending")
+        Args:
+            payload: FIBO manifest or frontend RenderParameters
+            step_callback: (step, total, latents) hook forwarded to the backend
+            cancelled: Set when the job was cancelled; checked before dispatch
+            
+        Returns:
+            (image path, rendering arguments used)
+        
+        Raises:
+            JobCancelledError: If cancelled is set before dispatch
+        """
+        self.prepare_control_map(payload)
+        args = self.render_args_for(payload)
+        print(f"Render prompt: {args['prompt']}")
+        
+        # Identical prompt/seed/settings on the same backend model: reuse the earlier image
+        seeded = self.render_cache is not None and args.get("seed") is not None
+        if seeded:
+            namespaces = dict.fromkeys(state.backend.cache_namespace() for state in self.router.check(args))
+            for namespace in filter(None, namespaces):
+                cache_key = render_cache_key(args, namespace)
+                cached_path = self.render_cache.fetch(cache_key)
+                if cached_path:
+                    print(f"Render cache hit: {cache_key[:12]}")
+                    return cached_path, args
+        
+        if cancelled is not None and cancelled.is_set():
+            raise JobCancelledError()
+        try:
+            out_path, backend = self.router.dispatch_with_backend(args, step_callback)
+        except PASSTHROUGH_ERRORS + (UnsupportedRenderError,):
+            raise
+        except Exception as e:
+            print(f"Warning: rendering failed: {e}")
+            print("Falling back to mock rendering...")
+            return self._mock_render(), args
+        
+        # Only seeded renders from the real model are reproducible enough to cache.
+        # The render moves into its blob here, so storage doesn't hash it again.
+        namespace = backend.cache_namespace()
+        if seeded and namespace and backend.cacheable():
+            out_path = self.render_cache.store(render_cache_key(args, namespace), out_path, move=True)
+        return out_path, args
+    
+    def run(
+        self,
+        payload: Dict[str, Any],
+        seed: Optional[int] = None,
+        record: Optional[Dict[str, Any]] = None,
+        step_callback: Optional[Callable] = None,
+        cancelled: Optional[threading.Event] = None,
+    ) -> Dict[str, Any]:
+        """
+        Render a payload and record it in the version store.
+        
+        Args:
+            payload: FIBO manifest or frontend RenderParameters
+            seed: Seed recorded with the version (defaults to the render's)
+            record: JSON stored with the version (defaults to payload)
+            step_callback: Forwarded to render()
+            cancelled: Set when the job was cancelled; checked before
+                dispatch and again before the version is recorded
+            
+        Returns:
+            {"version_id", "image_url", "seed"}
+        
+        Raises:
+            JobCancelledError: If cancelled is set before the version is recorded
+        """
+        out_path, args = self.render(payload, step_callback, cancelled)
+        if cancelled is not None and cancelled.is_set():
+            self._discard(out_path)
+            raise JobCancelledError()
+        if seed is None:
+            seed = args["seed"]
+        record = payload if record is None else record
+        if self.storage is None:
+            image_url = self.public_url(out_path)
+            vid = self.version_store.insert(seed, image_url, record)
+            return {"version_id": vid, "image_url": image_url, "seed": seed}
+
+        # The version keeps the local URL until a background S3 upload has
+        # succeeded, so it never points at an object that isn't there. The
+        # upload may finish before the version row exists, hence the lock.
+        lock = threading.Lock()
+        recorded: Dict[str, str] = {}
+
+        def on_uploaded(url: str) -> None:
+            with lock:
+                if "version_id" in recorded:
+                    self.version_store.update_image_url(recorded["version_id"], url)
+                else:
+                    recorded["image_url"] = url
+
+        image_url = self.storage.save_file(out_path, move=True, on_uploaded=on_uploaded)
+        with lock:
+            image_url = recorded.get("image_url", image_url)
+            vid = recorded["version_id"] = self.version_store.insert(seed, image_url, record)
+        return {"version_id": vid, "image_url": image_url, "seed": seed}
+    
+    def public_url(self, path: str) -> str:
+        """URL path the app serves a file under BASE_DIR at."""
+        rel_path = os.path.relpath(path, BASE_DIR)
+        return f"/{rel_path.replace(os.path.sep, '/')}"
+    
+    def _discard(self, out_path: str) -> None:
+        """Delete an unrecorded render; shared blobs (the mock sample) are left alone."""
+        if Path(out_path).resolve().parent.parent == self.blobs.root.resolve():
+            return
+        try:
+            os.remove(out_path)
+        except OSError as e:
+            print(f"Warning: could not remove cancelled render {out_path}: {e}")
+    
+    def _mock_render(self) -> str:
+        """The sample render, stored once as a blob and shared by every fallback."""
+        if not os.path.exists(SAMPLE_RENDER):
+            raise FileNotFoundError("Sample render image not found.")
+        return self.blobs.put(SAMPLE_RENDER)
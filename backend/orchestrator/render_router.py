@@ -0,0 +1,380 @@
+"""
+Render Router
+
+Spreads renders across several inference backends: the in-process
+diffusers pipeline and any number of ComfyUI hosts. Each job goes to the
+healthy backend with the lowest expected completion time, estimated from
+its in-flight count and rolling latency. Backends that keep failing are
+ejected by a circuit breaker and retried after a cool-down.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from backend.model_clients.comfyui_client import RecipeInputError
+from backend.orchestrator.controlnet_adapter import upload_path_for
+from backend.orchestrator.controlnet_preprocess import control_map_path_for
+from backend.orchestrator.job_queue import JobCancelledError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# ComfyUI recipe used for each ControlNet type (COMFYUI_RECIPE otherwise)
+RECIPE_FOR_CONTROLNET = {
+    "sketch": "product_with_sketch",
+    "canny": "product_with_sketch",
+    "depth": "portrait_controlnet",
+}
+
+# Quality-tier scheduler (see quality.SCHEDULERS) -> ComfyUI (sampler_name,
+# scheduler); "default" is the Euler scheduler SDXL ships with
+COMFYUI_SAMPLERS = {
+    "default": ("euler", "normal"),
+    "euler_a": ("euler_ancestral", "normal"),
+    "dpmpp_2m": ("dpmpp_2m", "normal"),
+    "dpmpp_2m_karras": ("dpmpp_2m", "karras"),
+}
+
+# Caller errors: propagated as-is, never retried or counted against a backend.
+# Anything else (including ValueErrors such as a JSONDecodeError from a bad
+# response) counts as a backend failure.
+PASSTHROUGH_ERRORS = (JobCancelledError, RecipeInputError)
+
+
+class NoBackendAvailableError(Exception):
+    """Raised when every backend is ejected or has already failed the job."""
+
+
+class UnsupportedRenderError(ValueError):
+    """Raised when no configured backend can render a job at all (a caller error)."""
+
+
+def has_control_image(args: Dict[str, Any]) -> bool:
+    return bool(args.get("controlnet_image") or args.get("controlnet_map"))
+
+
+class DiffusersBackend:
+    """Renders in-process through the shared FIBOClient and pipeline pool."""
+
+    def __init__(self, name: str = "local", client: Any = None, controlnet_fallback: bool = False):
+        """
+        Args:
+            name: Backend name in logs and stats
+            client: FIBOClient (default: get_fibo_client(), resolved on first use)
+            controlnet_fallback: Also take ControlNet jobs, rendering them from
+                the prompt alone, for setups with no ComfyUI host
+        """
+        self.name = name
+        self._client = client
+        self.controlnet_fallback = controlnet_fallback
+
+    @property
+    def client(self):
+        # Resolved lazily so building a router never loads model code
+        if self._client is None:
+            from backend.model_clients.fibo_client import get_fibo_client
+
+            self._client = get_fibo_client()
+        return self._client
+
+    def render(self, args: Dict[str, Any], step_callback: Optional[Callable] = None) -> str:
+        if has_control_image(args):
+            print(f"Warning: {self.name} has no ControlNet conditioning; rendering from the prompt only")
+        return self.client.generate(args, step_callback=step_callback)
+
+    def supports(self, args: Dict[str, Any], streaming: bool = False) -> bool:
+        """
+        Text-to-image; ControlNet jobs only as a fallback, since FIBOClient
+        has no ControlNet conditioning.
+        """
+        return self.controlnet_fallback or not has_control_image(args)
+
+    def cache_namespace(self) -> Optional[str]:
+        """Render cache keys name the diffusers model this backend runs."""
+        return f"diffusers:{self.client.model_id}"
+
+    def cacheable(self) -> bool:
+        """Only real pipeline output (not the mock fallback) is reproducible."""
+        return self.client.has_pipeline()
+
+
+class ComfyUIBackend:
+    """Renders a recipe on one ComfyUI host (see comfyui_client)."""
+
+    def __init__(self, base_url: Optional[str] = None, client: Any = None, name: Optional[str] = None):
+        from backend.model_clients.comfyui_client import ComfyUIClient, get_comfyui_client
+
+        if client is None:
+            client = ComfyUIClient(base_url=base_url) if base_url else get_comfyui_client()
+        self.client = client
+        self.name = name or f"comfyui:{client.base_url}"
+
+    def render(self, args: Dict[str, Any], step_callback: Optional[Callable] = None) -> str:
+        recipe = args.get("recipe")
+        if recipe is None and has_control_image(args):
+            recipe = RECIPE_FOR_CONTROLNET.get(
+                args.get("controlnet_type"), os.getenv("COMFYUI_RECIPE", "product_with_sketch")
+            )
+        elif recipe is None:
+            recipe = os.getenv("COMFYUI_TEXT_RECIPE", "text_to_image")
+        result = self.client.render(recipe, comfyui_context(args))
+        timings = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in result["timings"].items())
+        print(f"ComfyUI {recipe} on {self.name} ({result['prompt_id']}): {timings}")
+        return result["path"]
+
+    def supports(self, args: Dict[str, Any], streaming: bool = False) -> bool:
+        """
+        Text-to-image jobs, quality tiers included (the text recipe takes its
+        size, steps, CFG and sampler from the job), and un-tiered ControlNet
+        manifest jobs (ControlNet recipes fix their own size and sampler).
+        Recipes report no per-step progress, so jobs streaming previews stay
+        on diffusers; cancellation is only checked before and after a render.
+        """
+        if streaming:
+            return False
+        if has_control_image(args):
+            return "scheduler" not in args
+        return args.get("scheduler", "default") in COMFYUI_SAMPLERS
+
+    def cache_namespace(self) -> Optional[str]:
+        """None: a recipe's output depends on whatever checkpoints the host has loaded."""
+        return None
+
+    def cacheable(self) -> bool:
+        return False
+
+
+def comfyui_context(args: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    FIBO-shaped fields the recipe placeholders read, built from render args.
+
+    The control image is the preprocessed map when there is one, else the
+    uploaded reference, as a local file the client uploads to ComfyUI.
+    """
+    control_ref = args.get("controlnet_image")
+    control_image = (
+        control_map_path_for(args.get("controlnet_map"))
+        or upload_path_for(control_ref)
+        or control_ref
+    )
+    sampler, scheduler = COMFYUI_SAMPLERS.get(args.get("scheduler", "default"), COMFYUI_SAMPLERS["default"])
+    return {
+        "scene": {"description": args["prompt"], "seed": args["seed"]},
+        "render": {
+            "width": args.get("width", 1024),
+            "height": args.get("height", 1024),
+            "steps": args.get("num_inference_steps", 30),
+            "cfg": args.get("guidance_scale", 7.5),
+            "sampler": sampler,
+            "scheduler": scheduler,
+        },
+        "camera": {"lens": {"focal_length_mm": args.get("focal_length_mm", 50)}},
+        "controlnet": {
+            "image_ref": control_image,
+            "strength": args.get("controlnet_strength", 0.8),
+            "type": args.get("controlnet_type"),
+        },
+    }
+
+
+class BackendState:
+    """Load, latency and circuit-breaker bookkeeping for one backend."""
+
+    def __init__(self, backend: Any):
+        self.backend = backend
+        self.in_flight = 0
+        self.latency: Optional[float] = None  # EWMA of successful renders, seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.dispatched = 0
+        self.failures = 0
+
+
+class RenderRouter:
+    """
+    Least-loaded dispatch over a registry of render backends.
+
+    A backend's expected completion time is (in_flight + 1) x its rolling
+    latency; backends with no latency sample yet are assumed average. After
+    failure_threshold consecutive failures a backend's circuit opens and it
+    gets no jobs for reset_timeout seconds, then a single trial job decides
+    whether it closes again. A failed job is retried on the next-best
+    backend it has not tried yet.
+    """
+
+    def __init__(
+        self,
+        backends: Sequence[Any],
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None,
+        latency_alpha: float = 0.2,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not backends:
+            raise ValueError("RenderRouter needs at least one backend")
+        self.failure_threshold = failure_threshold or int(os.getenv("RENDER_BREAKER_FAILURES", "3"))
+        self.reset_timeout = reset_timeout if reset_timeout is not None else float(
+            os.getenv("RENDER_BREAKER_RESET_S", "30")
+        )
+        self.latency_alpha = latency_alpha
+        self.clock = clock
+        self._states: List[BackendState] = [BackendState(b) for b in backends]
+        self._lock = threading.Lock()
+
+    def _available(self, state: BackendState, now: float) -> bool:
+        if state.state == OPEN and now - state.opened_at >= self.reset_timeout:
+            state.state = HALF_OPEN
+        if state.state == HALF_OPEN:
+            return state.in_flight == 0  # one trial job at a time
+        return state.state == CLOSED
+
+    def _acquire(self, tried: List[BackendState], capable: List[BackendState]) -> Optional[BackendState]:
+        with self._lock:
+            now = self.clock()
+            candidates = [s for s in capable if s not in tried and self._available(s, now)]
+            if not candidates:
+                return None
+            known = [s.latency for s in self._states if s.latency is not None]
+            default_latency = sum(known) / len(known) if known else 0.0
+
+            def expected(s: BackendState):
+                # Ties go to backends without a latency sample, so they get probed
+                latency = default_latency if s.latency is None else s.latency
+                return ((s.in_flight + 1) * latency, s.in_flight, s.latency is not None)
+
+            chosen = min(candidates, key=expected)
+            chosen.in_flight += 1
+            chosen.dispatched += 1
+            return chosen
+
+    def _release(self, state: BackendState, elapsed: Optional[float] = None, failed: bool = False) -> None:
+        with self._lock:
+            state.in_flight -= 1
+            if failed:
+                state.failures += 1
+                state.consecutive_failures += 1
+                if state.state == HALF_OPEN or state.consecutive_failures >= self.failure_threshold:
+                    state.state = OPEN
+                    state.opened_at = self.clock()
+            elif elapsed is not None:
+                state.consecutive_failures = 0
+                state.state = CLOSED
+                state.latency = elapsed if state.latency is None else (
+                    self.latency_alpha * elapsed + (1 - self.latency_alpha) * state.latency
+                )
+
+    def check(self, args: Dict[str, Any], streaming: bool = False) -> List[BackendState]:
+        """
+        Return the backends able to render a job, healthy or not.
+
+        Raises:
+            UnsupportedRenderError: If no configured backend supports the job
+        """
+        capable = [s for s in self._states if s.backend.supports(args, streaming)]
+        if not capable:
+            kind = "ControlNet" if has_control_image(args) else "text-to-image"
+            if streaming:
+                kind += " with step previews/cancellation"
+            elif "scheduler" in args:
+                kind += " with a quality tier"
+            names = ", ".join(s.backend.name for s in self._states)
+            raise UnsupportedRenderError(f"No configured render backend ({names}) supports {kind} jobs")
+        return capable
+
+    def dispatch(self, args: Dict[str, Any], step_callback: Optional[Callable] = None) -> str:
+        """
+        Render on the least-loaded healthy backend, failing over on errors.
+
+        Args:
+            args: Rendering arguments (see RenderOrchestrator.prepare_render_args)
+            step_callback: Forwarded to backends that support it
+
+        Returns:
+            Path to the rendered image
+
+        Raises:
+            UnsupportedRenderError: If no configured backend supports the job
+            NoBackendAvailableError: If no untried healthy backend is left
+        """
+        return self.dispatch_with_backend(args, step_callback)[0]
+
+    def dispatch_with_backend(
+        self, args: Dict[str, Any], step_callback: Optional[Callable] = None
+    ) -> Tuple[str, Any]:
+        """Like dispatch(), but also return the backend that rendered the job."""
+        capable = self.check(args, streaming=step_callback is not None)
+        tried: List[BackendState] = []
+        last_error: Optional[Exception] = None
+        while True:
+            state = self._acquire(tried, capable)
+            if state is None:
+                raise NoBackendAvailableError(
+                    f"No healthy render backend left (tried {len(tried)}): {last_error}"
+                ) from last_error
+            tried.append(state)
+            start = self.clock()
+            try:
+                result = state.backend.render(args, step_callback=step_callback)
+            except PASSTHROUGH_ERRORS:
+                self._release(state)
+                raise
+            except Exception as e:
+                self._release(state, failed=True)
+                print(f"Warning: render backend {state.backend.name} failed: {e}")
+                last_error = e
+                continue
+            self._release(state, elapsed=self.clock() - start)
+            return result, state.backend
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-backend load, latency and circuit state."""
+        with self._lock:
+            return [
+                {
+                    "name": s.backend.name,
+                    "state": s.state,
+                    "in_flight": s.in_flight,
+                    "latency_s": s.latency,
+                    "dispatched": s.dispatched,
+                    "failures": s.failures,
+                    "consecutive_failures": s.consecutive_failures,
+                }
+                for s in self._states
+            ]
+
+
+def backends_from_env(spec: Optional[str] = None) -> List[Any]:
+    """
+    Build backends from RENDER_BACKENDS, e.g. "local,http://gpu1:8188,http://gpu2:8188".
+
+    "local" is the in-process diffusers pipeline; any URL is a ComfyUI host.
+    Without a ComfyUI host, "local" also takes ControlNet jobs (rendering
+    them from the prompt alone) rather than rejecting them.
+    """
+    spec = spec if spec is not None else os.getenv("RENDER_BACKENDS", "local")
+    entries = [e.strip() for e in spec.split(",") if e.strip()]
+    for entry in entries:
+        if entry != "local" and not entry.startswith(("http://", "https://")):
+            raise ValueError(f"Unknown render backend {entry!r} in RENDER_BACKENDS")
+    has_comfyui = any(entry != "local" for entry in entries)
+    return [
+        DiffusersBackend(controlnet_fallback=not has_comfyui) if entry == "local" else ComfyUIBackend(base_url=entry)
+        for entry in entries
+    ]
+
+
+_router: Optional[RenderRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_render_router() -> RenderRouter:
+    """Return the process-wide render router built from RENDER_BACKENDS."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = RenderRouter(backends_from_env())
+        return _router
@@ -0,0 +1,272 @@
+"""
+SKU Batch Renderer
+
+Expands a catalog template (samples/sku_batch_template.json) for every row
+of a SKU CSV and renders the results on a bounded worker pool. Rows are
+streamed from the CSV and results are appended to a JSONL manifest that
+doubles as the resume checkpoint, so batch size never affects memory.
+"""
+
+import copy
+import csv
+import json
+import os
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Set, Tuple
+
+PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+# Template keys that describe the batch itself rather than the render
+TEMPLATE_META_KEYS = ("batch_config", "scene_template", "variable_mappings", "notes")
+
+RenderFn = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+def resolve_variables(
+    template: Dict[str, Any], row: Dict[str, str]
+) -> Dict[str, Any]:
+    """
+    Resolve variable_mappings ("csv:<column>" / "config:<key>") for one row.
+
+    Returns:
+        Dict of variable name -> value
+    """
+    config = template.get("batch_config", {})
+    values: Dict[str, Any] = {}
+    for name, source in template.get("variable_mappings", {}).items():
+        kind, _, field = source.partition(":")
+        if kind == "csv":
+            values[name] = row.get(field)
+        elif kind == "config":
+            values[name] = config.get(field)
+    return values
+
+
+def _substitute(node: Any, values: Dict[str, Any]) -> Any:
+    if isinstance(node, dict):
+        return {k: _substitute(v, values) for k, v in node.items()}
+    if isinstance(node, list):
+        return [_substitute(v, values) for v in node]
+    if isinstance(node, str):
+        return PLACEHOLDER.sub(
+            lambda m: str(values.get(m.group(1), m.group(0))), node
+        )
+    return node
+
+
+def expand_template(template: Dict[str, Any], row: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Build the FIBO manifest for one CSV row.
+
+    {var} placeholders are substituted everywhere, and null scene fields
+    with a mapped variable of the same name (e.g. seed) are filled in.
+
+    Args:
+        template: Parsed batch template
+        row: One CSV row
+
+    Returns:
+        FIBO manifest with scene/camera/lighting/post_process
+    """
+    values = resolve_variables(template, row)
+    manifest = {k: v for k, v in template.items() if k not in TEMPLATE_META_KEYS}
+    manifest["scene"] = template.get("scene_template", {})
+    manifest = _substitute(copy.deepcopy(manifest), values)
+
+    for key, value in manifest["scene"].items():
+        if value is None and values.get(key) not in (None, ""):
+            manifest["scene"][key] = values[key]
+    if isinstance(manifest["scene"].get("seed"), str):
+        manifest["scene"]["seed"] = int(manifest["scene"]["seed"])
+    return manifest
+
+
+class SkuBatch:
+    """Progress of one batch; persisted as batch.json next to its manifest."""
+
+    def __init__(self, batch_id: str, batch_dir: Path, template_path: str, csv_path: str):
+        self.id = batch_id
+        self.dir = batch_dir
+        self.template_path = template_path
+        self.csv_path = csv_path
+        self.status = "queued"
+        self.created_at = datetime.utcnow().isoformat()
+        self.finished_at: Optional[str] = None
+        self.error: Optional[str] = None
+        self.counts = {"rows": 0, "done": 0, "failed": 0, "skipped": 0}
+        self.lock = threading.Lock()
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.dir / "manifest.jsonl"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize batch progress for API responses and batch.json."""
+        return {
+            "batch_id": self.id,
+            "status": self.status,
+            "template": self.template_path,
+            "csv": self.csv_path,
+            "counts": dict(self.counts),
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+    def save(self) -> None:
+        tmp = self.dir / "batch.json.tmp"
+        tmp.write_text(json.dumps(self.to_dict(), indent=2))
+        os.replace(tmp, self.dir / "batch.json")
+
+    @classmethod
+    def load(cls, batch_dir: Path) -> "SkuBatch":
+        data = json.loads((batch_dir / "batch.json").read_text())
+        batch = cls(data["batch_id"], batch_dir, data["template"], data["csv"])
+        batch.status = data["status"]
+        batch.created_at = data["created_at"]
+        batch.finished_at = data.get("finished_at")
+        batch.error = data.get("error")
+        batch.counts.update(data["counts"])
+        return batch
+
+
+class SkuBatchRunner:
+    """Runs SKU batches in the background on a bounded render pool."""
+
+    def __init__(
+        self,
+        render_fn: RenderFn,
+        batches_dir: Path,
+        max_workers: Optional[int] = None,
+    ):
+        """
+        Args:
+            render_fn: Renders one FIBO manifest; returns version_id/image_url/seed
+            batches_dir: Where batch.json and manifest.jsonl are written
+            max_workers: Concurrent renders per batch (SKU_BATCH_WORKERS)
+        """
+        self.render_fn = render_fn
+        self.batches_dir = Path(batches_dir)
+        self.max_workers = max_workers or int(os.getenv("SKU_BATCH_WORKERS", "2"))
+        self.batches_dir.mkdir(parents=True, exist_ok=True)
+        self._batches: Dict[str, SkuBatch] = {}
+        self._lock = threading.Lock()
+
+    def start(self, template_path: str, csv_path: str) -> SkuBatch:
+        """Create a batch and start rendering it in the background."""
+        batch_id = uuid.uuid4().hex
+        batch_dir = self.batches_dir / batch_id
+        batch_dir.mkdir(parents=True)
+        batch = SkuBatch(batch_id, batch_dir, str(template_path), str(csv_path))
+        batch.save()
+        return self._launch(batch)
+
+    def resume(self, batch_id: str) -> Optional[SkuBatch]:
+        """Restart an interrupted or partly failed batch, skipping rendered rows."""
+        batch = self.get(batch_id)
+        if batch is None or batch.status == "running":
+            return batch
+        return self._launch(batch)
+
+    def get(self, batch_id: str) -> Optional[SkuBatch]:
+        """Look up a batch in memory, falling back to its batch.json on disk."""
+        with self._lock:
+            if batch_id in self._batches:
+                return self._batches[batch_id]
+        batch_dir = self.batches_dir / batch_id
+        if not re.fullmatch(r"[0-9a-f]{32}", batch_id) or not (batch_dir / "batch.json").exists():
+            return None
+        batch = SkuBatch.load(batch_dir)
+        if batch.status == "running":
+            # The process that ran it is gone; it can be resumed
+            batch.status = "interrupted"
+        with self._lock:
+            return self._batches.setdefault(batch_id, batch)
+
+    def _launch(self, batch: SkuBatch) -> SkuBatch:
+        with self._lock:
+            self._batches[batch.id] = batch
+        batch.status = "running"
+        batch.save()
+        threading.Thread(
+            target=self._run, args=(batch,), name=f"sku-batch-{batch.id[:8]}", daemon=True
+        ).start()
+        return batch
+
+    def _run(self, batch: SkuBatch) -> None:
+        try:
+            with open(batch.template_path) as f:
+                template = json.load(f)
+            completed = self._completed_rows(batch)
+            with batch.lock:
+                batch.counts = {"rows": 0, "done": 0, "failed": 0, "skipped": 0}
+
+            # At most 2x workers rows are in flight, so memory is bounded
+            # regardless of how long the CSV is. The pool is entered last so
+            # it drains before the manifest is closed.
+            slots = threading.BoundedSemaphore(self.max_workers * 2)
+            with open(batch.manifest_path, "a") as manifest, ThreadPoolExecutor(
+                self.max_workers
+            ) as pool:
+                for index, row in self._rows(batch.csv_path):
+                    # Render callbacks update the same counts from pool threads
+                    skip = index in completed
+                    with batch.lock:
+                        batch.counts["rows"] += 1
+                        if skip:
+                            batch.counts["skipped"] += 1
+                    if skip:
+                        continue
+                    slots.acquire()
+                    future = pool.submit(self._render_row, template, index, row)
+                    future.add_done_callback(
+                        lambda f, b=batch, m=manifest: self._record(b, m, f.result(), slots)
+                    )
+            batch.status = "completed_with_errors" if batch.counts["failed"] else "completed"
+        except Exception as e:
+            batch.status = "failed"
+            batch.error = str(e)
+        batch.finished_at = datetime.utcnow().isoformat()
+        batch.save()
+
+    @staticmethod
+    def _rows(csv_path: str) -> Iterator[Tuple[int, Dict[str, str]]]:
+        with open(csv_path, newline="") as f:
+            for index, row in enumerate(csv.DictReader(f)):
+                yield index, row
+
+    @staticmethod
+    def _completed_rows(batch: SkuBatch) -> Set[int]:
+        """Row indexes already rendered successfully (the resume checkpoint)."""
+        completed: Set[int] = set()
+        if batch.manifest_path.exists():
+            with open(batch.manifest_path) as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if entry["status"] == "done":
+                        completed.add(entry["row"])
+        return completed
+
+    def _render_row(self, template: Dict[str, Any], index: int, row: Dict[str, str]) -> Dict[str, Any]:
+        entry: Dict[str, Any] = {"row": index, "sku": row.get("sku")}
+        try:
+            result = self.render_fn(expand_template(template, row))
+            entry.update(status="done", **result)
+        except Exception as e:
+            entry.update(status="failed", error=str(e))
+        entry["timestamp"] = datetime.utcnow().isoformat()
+        return entry
+
+    @staticmethod
+    def _record(batch: SkuBatch, manifest, entry: Dict[str, Any], slots) -> None:
+        with batch.lock:
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+            batch.counts["done" if entry["status"] == "done" else "failed"] += 1
+            batch.save()
+        slots.release()
@@ -0,0 +1,172 @@
+"""
+Blob Store
+
+Content-addressed local storage for rendered images. Each distinct image
+is stored once as blobs/<sha[:2]>/<sha256><ext> under the output folder, and
+version rows reference that path. New renders are renamed into place;
+shared files (e.g. the mock-render sample) are reflinked or hardlinked.
+Either way, disk usage and write I/O grow with unique images, not with
+render count.
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no reflinks, hardlinks still work
+    fcntl = None
+
+CHUNK_SIZE = 1024 * 1024
+
+# Digests remembered for shared (not moved) source files
+DIGEST_MEMO_SIZE = 1024
+
+# Linux FICLONE ioctl: copy-on-write clone on btrfs, XFS, bcachefs, ...
+FICLONE = 0x40049409
+
+
+def file_sha256(path: str) -> str:
+    """Hex SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def reflink(source: Path, dest: Path) -> bool:
+    """Clone source to dest sharing its extents; False if the filesystem can't."""
+    if fcntl is None:
+        return False
+    try:
+        with open(source, "rb") as src, open(dest, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return True
+    except OSError:
+        dest.unlink(missing_ok=True)
+        return False
+
+
+def clone_file(source: Path, dest: Path) -> str:
+    """
+    Make dest a copy of source without copying bytes when possible.
+
+    Returns:
+        "reflink", "hardlink" or "copy", whichever worked first
+    """
+    if reflink(source, dest):
+        return "reflink"
+    try:
+        os.link(source, dest)
+        return "hardlink"
+    except OSError:
+        shutil.copyfile(source, dest)
+        return "copy"
+
+
+class BlobStore:
+    """Stores files once per content hash. Thread-safe."""
+
+    def __init__(self, root: Optional[Path] = None, digest_memo_size: int = DIGEST_MEMO_SIZE):
+        self.root = Path(root or Path(__file__).parent.parent / "samples" / "output" / "blobs")
+        self.root.mkdir(parents=True, exist_ok=True)
+        # LRU of (path, size, mtime) -> digest, so unchanged shared files aren't re-read
+        self._digests: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self.digest_memo_size = digest_memo_size
+        self._lock = threading.Lock()
+        self._stats = {"puts": 0, "deduplicated": 0, "bytes_written": 0, "reflink": 0, "hardlink": 0, "copy": 0}
+
+    def path_for(self, sha256: str, ext: str) -> Path:
+        return self.root / sha256[:2] / f"{sha256}{ext.lower()}"
+
+    def _digest(self, path: str, remember: bool) -> str:
+        """SHA-256 of path; remember=False forgets it (the file is being consumed)."""
+        st = os.stat(path)
+        key = (os.path.realpath(path), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            if remember:
+                digest = self._digests.get(key)
+                if digest is not None:
+                    self._digests.move_to_end(key)
+            else:
+                digest = self._digests.pop(key, None)
+        if digest is not None:
+            return digest
+        digest = file_sha256(path)
+        if not remember:
+            return digest
+        with self._lock:
+            self._digests[key] = digest
+            while len(self._digests) > self.digest_memo_size:
+                self._digests.popitem(last=False)
+        return digest
+
+    def put(self, source_path: str, move: bool = False) -> str:
+        """
+        Store a file by content and return the blob path.
+
+        Args:
+            source_path: File to store
+            move: The caller is done with source_path (a fresh render): it is
+                renamed into the store, or deleted if the content is already
+                there. Otherwise source_path is left untouched and the blob
+                is a reflink/hardlink of it.
+
+        Returns:
+            Path of the blob holding the content
+        """
+        source = Path(source_path).resolve()
+        if source.parent.parent == self.root.resolve():
+            return str(source)  # already a blob
+        blob = self.path_for(self._digest(str(source), remember=not move), source.suffix)
+        with self._lock:
+            self._stats["puts"] += 1
+        if blob.exists():
+            with self._lock:
+                self._stats["deduplicated"] += 1
+            if move:
+                source.unlink()  # may be a hardlink of the blob (a render cache hit)
+            return str(blob)
+
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        if move:
+            try:
+                os.replace(source, blob)  # same filesystem: no bytes move
+                return str(blob)
+            except OSError:
+                pass  # another device: clone/copy below, then drop the source
+        tmp = blob.with_name(f".{uuid.uuid4().hex}.tmp")
+        method = clone_file(source, tmp)
+        os.replace(tmp, blob)
+        with self._lock:
+            self._stats[method] += 1
+            if method == "copy":
+                self._stats["bytes_written"] += blob.stat().st_size
+        if move:
+            source.unlink()
+        return str(blob)
+
+    def stats(self) -> Dict[str, Any]:
+        """Put/dedup counters and how shared blobs were materialized."""
+        with self._lock:
+            return dict(self._stats)
+
+
+_store: Optional[BlobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store() -> BlobStore:
+    """Return the process-wide blob store under samples/output/blobs."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = BlobStore()
+        return _store
@@ -0,0 +1,182 @@
+"""
+Render Cache
+
+Content-addressed, size-bounded on-disk cache of finished renders keyed on
+everything that determines the output image, including the backend and
+model that rendered it. Entries are hardlinks of blob store files, so a
+cached render shares its bytes with the versions that show it.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from backend.storage.blob_store import BlobStore, get_blob_store
+
+
+def render_cache_key(render_args: Dict[str, Any], model_id: str) -> str:
+    """
+    Hash the enhanced prompt, seed, model ID and sampler settings.
+
+    Args:
+        render_args: Arguments passed to the model client (prompt, seed, steps, ...)
+        model_id: Backend and model the render runs on (see cache_namespace()
+            on render_router backends)
+
+    Returns:
+        Hex digest identifying the render
+    """
+    payload = json.dumps(
+        {"model_id": model_id, **render_args}, sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def link_or_copy(source: Path, dest: Path) -> None:
+    """Hardlink source to dest, copying only if linking is not possible."""
+    try:
+        os.link(source, dest)
+    except OSError:
+        shutil.copyfile(source, dest)
+
+
+class RenderCache:
+    """
+    LRU cache of rendered images stored as <key>.jpg files.
+
+    Each entry is a hardlink of the render's blob (see blob_store), and hits
+    are materialized into the output directory as hardlinks too, so a repeat
+    render costs no inference and no image bytes. Cached renders are also
+    the images of recorded versions, so the cache adds no disk usage of its
+    own; max_bytes bounds the blob bytes it keeps reachable, each blob
+    counted once however many keys share it. Evicting an entry drops the
+    cache's link and never breaks a recorded version.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        output_dir: Optional[Path] = None,
+        max_bytes: Optional[int] = None,
+        blobs: Optional[BlobStore] = None,
+    ):
+        backend_dir = Path(__file__).parent.parent
+        self.cache_dir = Path(cache_dir or backend_dir / "cache" / "renders")
+        self.output_dir = Path(output_dir or backend_dir / "samples" / "output")
+        self.max_bytes = max_bytes or int(
+            os.getenv("RENDER_CACHE_MAX_BYTES", str(2 * 1024**3))
+        )
+        self.blobs = blobs or get_blob_store()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # key -> (blob identity, size); identity is (st_dev, st_ino)
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], int]]" = OrderedDict()
+        # blob identity -> number of keys linking it
+        self._blob_refs: Dict[Tuple[int, int], int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._load_index()
+
+    def _load_index(self) -> None:
+        # Rebuild LRU order from modification times (touched on every hit)
+        files = sorted(self.cache_dir.glob("*.jpg"), key=lambda p: p.stat().st_mtime)
+        for path in files:
+            self._add(path.stem, path.stat())
+        self._evict()
+
+    def _add(self, key: str, st: os.stat_result) -> None:
+        blob_id = (st.st_dev, st.st_ino)
+        self._entries[key] = (blob_id, st.st_size)
+        refs = self._blob_refs.get(blob_id, 0)
+        if refs == 0:
+            self._bytes += st.st_size
+        self._blob_refs[blob_id] = refs + 1
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.jpg"
+
+    def fetch(self, key: str) -> Optional[str]:
+        """
+        Look up a render and, on a hit, link it to a fresh output file.
+
+        Returns:
+            Path of the new output file, or None on a miss
+        """
+        with self._lock:
+            if key not in self._entries:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            cached = self._path(key)
+            out_path = self.output_dir / f"render_{uuid.uuid4().hex[:12]}.jpg"
+            link_or_copy(cached, out_path)
+        os.utime(cached)
+        return str(out_path)
+
+    def store(self, key: str, image_path: str, move: bool = False) -> str:
+        """
+        Add a finished render to the cache.
+
+        The render is put in the blob store and the entry hardlinks that
+        blob, so it shares the inode of every version that stores the same
+        image.
+
+        Args:
+            key: Render cache key
+            image_path: Finished render
+            move: The caller is done with image_path: it is moved into the
+                blob store instead of linked
+
+        Returns:
+            Where the render now lives: its blob, or image_path if the key
+            was already cached (then nothing is stored or moved)
+        """
+        with self._lock:
+            if key in self._entries:
+                return image_path
+        blob = Path(self.blobs.put(image_path, move=move))
+        with self._lock:
+            if key in self._entries:
+                return str(blob)
+            dest = self._path(key)
+            tmp = dest.with_name(f".{uuid.uuid4().hex}.tmp")
+            link_or_copy(blob, tmp)
+            os.replace(tmp, dest)
+            self._add(key, dest.stat())
+            self._stats["stores"] += 1
+            self._evict()
+        return str(blob)
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            key, (blob_id, size) = self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+            refs = self._blob_refs.pop(blob_id) - 1
+            if refs:
+                self._blob_refs[blob_id] = refs
+            else:
+                self._bytes -= size
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the blob bytes the cache references."""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": (self._stats["hits"] / lookups) if lookups else 0.0,
+            }
@@ -1,74 +1,409 @@
 """
 Storage Manager
 
-Handles local and S3 storage for rendered images.
+Handles local and S3 storage for rendered images. Local files go into the
+content-addressed blob store (see blob_store). S3 uploads share one
+boto3 client (and its connection pool) and run on background worker
+threads, so a render is done as soon as its file is on local disk; the
+local copy is kept, and served, until its upload has succeeded. Large
+files such as EXR/TIFF exports go up as concurrent multipart uploads.
 """
 
+import mimetypes
 import os
-import shutil
+import re
+import threading
+import time
+import uuid
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.orchestrator.job_queue import QueueFullError, RenderJob, RenderJobQueue
+from backend.storage.blob_store import BlobStore, clone_file, get_blob_store
+
+MB = 1024 * 1024
+
+# Object names the blob store gives renders: <sha256><ext>
+BLOB_NAME = re.compile(r"^([0-9a-f]{64})(\.[A-Za-z0-9]+)$")
+
+# Types mimetypes doesn't know (or guesses inconsistently across platforms)
+CONTENT_TYPES = {".exr": "image/x-exr", ".tif": "image/tiff", ".tiff": "image/tiff"}
+
+
+def content_type_for(path: str) -> str:
+    """Content-Type stored with an uploaded object."""
+    ext = Path(path).suffix.lower()
+    return CONTENT_TYPES.get(ext) or mimetypes.guess_type(str(path))[0] or "application/octet-stream"
+
+
+def create_s3_client(max_pool_connections: Optional[int] = None, max_attempts: Optional[int] = None):
+    """
+    Build a boto3 S3 client with a sized connection pool and bounded retries.
+
+    botocore's "standard" retry mode retries throttling and transient errors
+    per request (each multipart part separately), up to max_attempts.
+    S3_ENDPOINT_URL points it at MinIO or another S3-compatible store.
+    """
+    import boto3
+    from botocore.config import Config
+
+    config = Config(
+        max_pool_connections=max_pool_connections or int(os.getenv("S3_MAX_POOL_CONNECTIONS", "32")),
+        retries={"max_attempts": max_attempts or int(os.getenv("S3_MAX_ATTEMPTS", "5")), "mode": "standard"},
+    )
+    return boto3.client(
+        "s3",
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        region_name=os.getenv("AWS_REGION", "us-east-1"),
+        endpoint_url=os.getenv("S3_ENDPOINT_URL") or None,
+        config=config,
+    )
+
+
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """Return the process-wide S3 client (boto3 clients are thread-safe)."""
+    global _s3_client
+    with _s3_client_lock:
+        if _s3_client is None:
+            _s3_client = create_s3_client()
+        return _s3_client
+
+
+class S3Uploader:
+    """
+    Uploads files to one bucket through a shared client.
+
+    upload() blocks until the object is stored; enqueue() hands the file to
+    background workers and returns at once. Files above multipart_threshold
+    are split into multipart_chunksize parts sent max_concurrency at a time.
+    A failed upload is retried up to `attempts` times with exponential
+    backoff, on top of botocore's per-request retries.
+    """
+
+    def __init__(
+        self,
+        bucket: Optional[str] = None,
+        client: Any = None,
+        prefix: Optional[str] = None,
+        endpoint_url: Optional[str] = None,
+        workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        attempts: Optional[int] = None,
+        backoff: float = 0.5,
+        multipart_threshold: Optional[int] = None,
+        multipart_chunksize: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        from boto3.s3.transfer import TransferConfig
+
+        self.bucket = bucket or os.getenv("S3_BUCKET")
+        if not self.bucket:
+            raise ValueError("S3_BUCKET is not set")
+        self.client = client or get_s3_client()
+        self.prefix = (prefix if prefix is not None else os.getenv("S3_PREFIX", "renders")).strip("/")
+        self.endpoint_url = endpoint_url or os.getenv("S3_ENDPOINT_URL")
+        self.attempts = attempts or int(os.getenv("S3_UPLOAD_ATTEMPTS", "3"))
+        self.backoff = backoff
+        self.sleep = sleep
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold or int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "16")) * MB,
+            multipart_chunksize=multipart_chunksize or int(os.getenv("S3_MULTIPART_CHUNK_MB", "8")) * MB,
+            max_concurrency=max_concurrency or int(os.getenv("S3_MULTIPART_CONCURRENCY", "8")),
+            use_threads=True,
+        )
+        self.queue = RenderJobQueue(
+            self._run_upload_job,
+            max_workers=workers or int(os.getenv("S3_UPLOAD_WORKERS", "2")),
+            max_queue=max_queue or int(os.getenv("S3_UPLOAD_QUEUE_SIZE", "256")),
+        )
+        self._pending: List[RenderJob] = []
+        self._lock = threading.Lock()
+        self._stats = {"uploaded": 0, "failed": 0, "retries": 0, "bytes": 0}
+
+    def key_for(self, name: str) -> str:
+        return f"{self.prefix}/{name}" if self.prefix else name
+
+    def url_for(self, key: str) -> str:
+        """Public URL of an object in the bucket."""
+        if self.endpoint_url:
+            return f"{self.endpoint_url.rstrip('/')}/{self.bucket}/{key}"
+        return f"https://{self.bucket}.s3.amazonaws.com/{key}"
+
+    def key_from_url(self, url: str) -> Optional[str]:
+        """Object key of a url_for() URL, or None for URLs outside the bucket."""
+        base = self.url_for("")
+        if not url.startswith(base) or len(url) == len(base):
+            return None
+        return url[len(base):]
+
+    def download(self, key: str, dest_path: str) -> None:
+        """Download an object to dest_path (written aside, then renamed into place)."""
+        dest = Path(dest_path)
+        tmp = dest.with_name(f".{uuid.uuid4().hex}.tmp")
+        try:
+            self.client.download_file(self.bucket, key, str(tmp), Config=self.transfer_config)
+            os.replace(tmp, dest)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def upload(self, source_path: str, key: str) -> str:
+        """
+        Upload a file now, retrying failed attempts.
+
+        Args:
+            source_path: Local file to upload
+            key: Object key in the bucket
+
+        Returns:
+            Public URL of the object
+
+        Raises:
+            The last upload error once every attempt has failed
+        """
+        size = os.path.getsize(source_path)
+        extra = {"ContentType": content_type_for(source_path)}
+        for attempt in range(1, self.attempts + 1):
+            try:
+                self.client.upload_file(
+                    str(source_path), self.bucket, key, ExtraArgs=extra, Config=self.transfer_config
+                )
+                break
+            except Exception as e:
+                if attempt == self.attempts:
+                    with self._lock:
+                        self._stats["failed"] += 1
+                    print(f"Warning: S3 upload of {key} failed after {attempt} attempts: {e}")
+                    raise
+                with self._lock:
+                    self._stats["retries"] += 1
+                print(f"Warning: S3 upload of {key} failed (attempt {attempt}/{self.attempts}): {e}")
+                self.sleep(self.backoff * 2 ** (attempt - 1))
+        with self._lock:
+            self._stats["uploaded"] += 1
+            self._stats["bytes"] += size
+        return self.url_for(key)
+
+    def enqueue(
+        self,
+        source_path: str,
+        key: str,
+        on_uploaded: Optional[Callable[[str], None]] = None,
+    ) -> RenderJob:
+        """
+        Upload a file on a background worker.
+
+        The file must stay in place until the job finishes; its status and
+        error are on the returned job.
+
+        Args:
+            source_path: Local file to upload
+            key: Object key in the bucket
+            on_uploaded: Called on the worker with the object URL once the
+                upload has succeeded (never on failure)
+
+        Raises:
+            QueueFullError: If S3_UPLOAD_QUEUE_SIZE uploads are already waiting
+        """
+        job = self.queue.submit({"source_path": str(source_path), "key": key, "on_uploaded": on_uploaded})
+        with self._lock:
+            self._pending = [j for j in self._pending if not j.done.is_set()]
+            self._pending.append(job)
+        return job
+
+    def _run_upload_job(self, job: RenderJob) -> Dict[str, Any]:
+        url = self.upload(job.payload["source_path"], job.payload["key"])
+        on_uploaded = job.payload["on_uploaded"]
+        if on_uploaded is not None:
+            try:
+                on_uploaded(url)
+            except Exception as e:
+                # The object is stored; only whoever wanted to hear about it missed out
+                print(f"Warning: S3 upload callback for {job.payload['key']} failed: {e}")
+        return {"url": url}
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for every queued upload to finish; False if the timeout expired."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            pending = list(self._pending)
+        for job in pending:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not job.done.wait(remaining):
+                return False
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Upload counters plus background queue depth."""
+        with self._lock:
+            return {**self._stats, "queue": self.queue.stats()}
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the workers once queued uploads have drained."""
+        self.queue.shutdown(wait=wait)
+
+
+_uploader: Optional[S3Uploader] = None
+_uploader_lock = threading.Lock()
+
+
+def get_s3_uploader() -> S3Uploader:
+    """Return the process-wide S3 uploader built from S3_* settings."""
+    global _uploader
+    with _uploader_lock:
+        if _uploader is None:
+            _uploader = S3Uploader()
+        return _uploader
 
 
 class StorageManager:
     """Manages file storage for renders."""
-    
-    def __init__(self):
+
+    def __init__(
+        self,
+        uploader: Optional[S3Uploader] = None,
+        blobs: Optional[BlobStore] = None,
+        base_dir: Optional[Path] = None,
+    ):
+        """
+        Args:
+            uploader: S3 uploader (default: get_s3_uploader(), built on first use)
+            blobs: Local blob store (default: get_blob_store())
+            base_dir: Directory local URLs are relative to (default: backend/)
+        """
         self.storage_type = os.getenv("STORAGE_TYPE", "local")
-        self.local_base = Path(__file__).parent.parent / "samples" / "output"
+        self.base_dir = Path(base_dir or Path(__file__).parent.parent)
+        self.local_base = self.base_dir / "samples" / "output"
         self.local_base.mkdir(parents=True, exist_ok=True)
-        
-    def save_file(self, source_path: str, destination_name: Optional[str] = None) -> str:
+        self.blobs = blobs or get_blob_store()
+        self._uploader = uploader
+
+    @property
+    def uploader(self) -> S3Uploader:
+        if self._uploader is None:
+            self._uploader = get_s3_uploader()
+        return self._uploader
+
+    def save_file(
+        self,
+        source_path: str,
+        destination_name: Optional[str] = None,
+        wait: bool = False,
+        move: bool = False,
+        on_uploaded: Optional[Callable[[str], None]] = None,
+    ) -> str:
         """
         Save file to configured storage backend.
-        
+
+        Files are always stored locally first. S3 uploads of that local copy
+        run in the background unless wait is set: the local URL is returned
+        straight away and stays valid, and on_uploaded receives the S3 URL
+        once (and only if) the upload succeeds.
+
         Args:
             source_path: Path to source file
             destination_name: Optional custom filename
-            
+            wait: Block until an S3 upload has finished (and raise if it failed)
+            move: Local storage may take over source_path instead of linking it
+            on_uploaded: Called with the S3 URL after a background upload
+                succeeds, possibly before save_file returns
+
         Returns:
             Public URL or path to saved file
         """
+        local_url = self._save_local(source_path, destination_name, move)
         if self.storage_type == "s3":
-            return self._save_to_s3(source_path, destination_name)
-        else:
-            return self._save_local(source_path, destination_name)
-    
-    def _save_local(self, source_path: str, destination_name: Optional[str]) -> str:
-        """Save to local filesystem."""
-        source = Path(source_path)
-        
+            return self._save_to_s3(local_url, wait, on_uploaded)
+        return local_url
+
+    def _save_local(self, source_path: str, destination_name: Optional[str], move: bool = False) -> str:
+        """
+        Save to local filesystem as a content-addressed blob.
+
+        Identical content is stored once; a custom destination_name becomes a
+        reflink/hardlink of the blob rather than another copy.
+        """
+        dest = Path(self.blobs.put(source_path, move=move))
+
         if destination_name:
-            dest = self.local_base / destination_name
-        else:
-            dest = self.local_base / source.name
-            
-        shutil.copy(source, dest)
-        
+            alias = self.local_base / destination_name
+            if not (alias.exists() and os.path.samefile(alias, dest)):
+                alias.unlink(missing_ok=True)
+                clone_file(dest, alias)
+            dest = alias
+
         # Return relative path from backend root
-        rel_path = dest.relative_to(Path(__file__).parent.parent)
+        rel_path = dest.relative_to(self.base_dir)
         return f"/{rel_path.as_posix()}"
-    
-    def _save_to_s3(self, source_path: str, destination_name: Optional[str]) -> str:
-        """Save to S3 bucket."""
+
+    def _save_to_s3(
+        self, local_url: str, wait: bool, on_uploaded: Optional[Callable[[str], None]]
+    ) -> str:
+        """Upload a locally saved file to S3, in the background unless wait is set."""
+        uploader = self.uploader
+        path = self.local_path_for(local_url)
+        key = uploader.key_for(Path(path).name)
+        if wait:
+            return uploader.upload(path, key)
         try:
-            import boto3
-            
-            s3_client = boto3.client(
-                's3',
-                aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-                aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-                region_name=os.getenv("AWS_REGION", "us-east-1")
-            )
-            
-            bucket = os.getenv("S3_BUCKET")
-            key = destination_name or Path(source_path).name
-            
-            s3_client.upload_file(source_path, bucket, f"renders/{key}")
-            
-            # Return public URL
-            return f"https://{bucket}.s3.amazonaws.com/renders/{key}"
-            
+            uploader.enqueue(path, key, on_uploaded)
+        except QueueFullError:
+            # Backpressure: upload on the caller's thread rather than skip the file
+            try:
+                url = uploader.upload(path, key)
+            except Exception:
+                return local_url  # logged and counted by upload()
+            if on_uploaded is not None:
+                on_uploaded(url)
+        return local_url
+
+    def local_path_for(self, url: str) -> Optional[str]:
+        """
+        Local file holding a saved file's content, or None.
+
+        Local URLs map into base_dir. S3 URLs map to the blob the object was
+        uploaded from, downloading it back into the blob store if the local
+        copy is gone.
+        """
+        if url.startswith("/"):
+            base = os.path.realpath(self.base_dir)
+            path = os.path.realpath(os.path.join(base, url.lstrip("/")))
+            if not path.startswith(base + os.path.sep) or not os.path.isfile(path):
+                return None
+            return path
+
+        if self.storage_type != "s3":
+            return None
+        key = self.uploader.key_from_url(url)
+        if key is None:
+            return None
+        name = Path(key).name
+        match = BLOB_NAME.match(name)
+        if match:
+            blob = self.blobs.path_for(*match.groups())
+            if blob.is_file():
+                return str(blob)
+        download = self.local_base / f".{uuid.uuid4().hex}{Path(name).suffix}"
+        try:
+            self.uploader.download(key, str(download))
         except Exception as e:
-            print(f"S3 upload failed: {e}. Falling back to local storage.")
-            return self._save_local(source_path, destination_name)
+            print(f"Warning: could not fetch {url} from S3: {e}")
+            return None
+        return self.blobs.put(str(download), move=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Storage backend, blob store counters and, for S3, upload counters."""
+        stats = {"storage_type": self.storage_type, "blobs": self.blobs.stats()}
+        if self._uploader is not None:
+            stats.update(self._uploader.stats())
+        return stats
+
+    def shutdown(self) -> None:
+        """Finish queued S3 uploads before the process exits."""
+        if self._uploader is not None:
+            self._uploader.shutdown(wait=True)
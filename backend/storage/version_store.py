@@ -0,0 +1,202 @@
+"""
+Version Store
+
+SQLite-backed render history with a shared connection pool and keyset
+pagination.
+"""
+
+import base64
+import json
+import os
+import queue
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Columns returned by listings; the json manifest is only read by get()
+LIST_COLUMNS = "id, seed, timestamp, image_url"
+
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections in WAL mode."""
+
+    def __init__(self, db_path: str, size: Optional[int] = None):
+        self.db_path = db_path
+        self.size = size or int(os.getenv("SQLITE_POOL_SIZE", "4"))
+        self._idle: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(self.size):
+            self._idle.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        # WAL lets readers (/versions) proceed while a render writes its row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection; commits on success and rolls back on error."""
+        conn = self._idle.get()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        """Close every idle connection."""
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+def encode_cursor(timestamp: str, version_id: str) -> str:
+    """Encode the last row of a page as an opaque cursor."""
+    raw = f"{timestamp}|{version_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        timestamp, version_id = (
+            base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        )
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return timestamp, version_id
+
+
+class VersionStore:
+    """Reads and writes render versions through a connection pool."""
+
+    def __init__(self, db_path: str, pool_size: Optional[int] = None):
+        self.pool = ConnectionPool(db_path, pool_size)
+        self.init_schema()
+
+    def init_schema(self) -> None:
+        """Create the versions table and its listing indexes."""
+        with self.pool.connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS versions (
+                    id TEXT PRIMARY KEY,
+                    seed INTEGER,
+                    timestamp TEXT,
+                    image_url TEXT,
+                    json TEXT
+                )
+                """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_versions_timestamp "
+                "ON versions (timestamp DESC, id DESC)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_versions_seed_timestamp "
+                "ON versions (seed, timestamp DESC, id DESC)"
+            )
+
+    def insert(
+        self, seed: Optional[int], image_url: str, scene_json: Dict[str, Any]
+    ) -> str:
+        """Record a render and return its version ID."""
+        vid = uuid.uuid4().hex
+        with self.pool.connection() as conn:
+            conn.execute(
+                "INSERT INTO versions (id, seed, timestamp, image_url, json) VALUES (?, ?, ?, ?, ?)",
+                (
+                    vid,
+                    seed,
+                    datetime.utcnow().isoformat(),
+                    image_url,
+                    json.dumps(scene_json),
+                ),
+            )
+        return vid
+
+    def update_image_url(self, version_id: str, image_url: str) -> bool:
+        """Point a version at a new copy of its image (e.g. once uploaded); False if it doesn't exist."""
+        with self.pool.connection() as conn:
+            cur = conn.execute(
+                "UPDATE versions SET image_url = ? WHERE id = ?", (image_url, version_id)
+            )
+        return cur.rowcount > 0
+
+    def get(self, version_id: str) -> Optional[Dict[str, Any]]:
+        """Return one version including its JSON manifest."""
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                f"SELECT {LIST_COLUMNS}, json FROM versions WHERE id = ?",
+                (version_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {**self._row_to_dict(row), "json": json.loads(row[4])}
+
+    def list(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        seed: Optional[int] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        List versions newest first, one page at a time.
+
+        Args:
+            limit: Page size
+            cursor: next_cursor from the previous page
+            seed: Only versions rendered with this seed
+            since: Only versions at or after this ISO timestamp
+            until: Only versions before this ISO timestamp
+
+        Returns:
+            Dict with "items" and "next_cursor" (None on the last page)
+        """
+        clauses: List[str] = []
+        params: List[Any] = []
+        if seed is not None:
+            clauses.append("seed = ?")
+            params.append(seed)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        if cursor:
+            timestamp, version_id = decode_cursor(cursor)
+            clauses.append("(timestamp < ? OR (timestamp = ? AND id < ?))")
+            params.extend([timestamp, timestamp, version_id])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (
+            f"SELECT {LIST_COLUMNS} FROM versions {where} "
+            "ORDER BY timestamp DESC, id DESC LIMIT ?"
+        )
+        # Fetch one extra row to know whether another page exists
+        params.append(limit + 1)
+
+        with self.pool.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        items = [self._row_to_dict(r) for r in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = items[-1]
+            next_cursor = encode_cursor(last["timestamp"], last["id"])
+        return {"items": items, "next_cursor": next_cursor}
+
+    @staticmethod
+    def _row_to_dict(row: tuple) -> Dict[str, Any]:
+        return {"id": row[0], "seed": row[1], "timestamp": row[2], "image_url": row[3]}
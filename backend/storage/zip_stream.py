@@ -0,0 +1,78 @@
+"""
+Streaming ZIP Writer
+
+Builds a ZIP archive on the fly and yields it in chunks, so bulk downloads
+never stage the archive on disk or in memory. Entries are stored
+(ZIP_STORED): renders are already compressed JPEGs.
+"""
+
+import os
+import time
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple, Union
+
+CHUNK_SIZE = 1024 * 1024
+
+# (name inside the archive, file path or in-memory bytes)
+ZipSource = Tuple[str, Union[str, Path, bytes]]
+
+
+class _ChunkBuffer:
+    """Write-only, non-seekable sink that hands written bytes back to the generator."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries: Iterable[ZipSource], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield a ZIP archive of entries piece by piece.
+
+    Files are copied in chunk_size reads, so memory stays bounded by one
+    chunk regardless of archive size. Entries are consumed lazily, so the
+    caller can resolve them while the response is being sent.
+
+    Args:
+        entries: (archive name, path or bytes) pairs
+        chunk_size: Read size for file entries
+
+    Returns:
+        Iterator of archive bytes
+    """
+    sink = _ChunkBuffer()
+    # zipfile falls back to data descriptors on a non-seekable sink
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for name, source in entries:
+            if isinstance(source, bytes):
+                info = zipfile.ZipInfo(name, time.localtime()[:6])
+                info.file_size = len(source)
+                with archive.open(info, mode="w") as dest:
+                    dest.write(source)
+            else:
+                stat = os.stat(source)
+                info = zipfile.ZipInfo(name, time.localtime(stat.st_mtime)[:6])
+                # Declaring the size up front lets zipfile pick zip64 for huge files
+                info.file_size = stat.st_size
+                with archive.open(info, mode="w") as dest, open(source, "rb") as src:
+                    while True:
+                        block = src.read(chunk_size)
+                        if not block:
+                            break
+                        dest.write(block)
+                        yield sink.drain()
+            yield sink.drain()
+    # Central directory
+    yield sink.drain()
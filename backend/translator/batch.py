@@ -0,0 +1,79 @@
+"""
+Batch Translation
+
+Memoized NL -> RenderParameters translation for bulk catalog requests.
+Each distinct prompt is translated and serialized once; repeats (within a
+batch or across batches) are served from a bounded LRU.
+"""
+
+import io
+import json
+import os
+from functools import lru_cache
+from typing import Any, Dict, Iterator
+
+from backend.translator.translator import translate_prompt_to_json
+
+TRANSLATE_MEMO_SIZE = int(os.getenv("TRANSLATE_MEMO_SIZE", "10000"))
+
+
+@lru_cache(maxsize=TRANSLATE_MEMO_SIZE)
+def translate_to_json_text(prompt: str) -> str:
+    """Serialized translation of an already stripped prompt (memoized)."""
+    return json.dumps(translate_prompt_to_json(prompt))
+
+
+def parse_prompt(item: Any) -> str:
+    """
+    Accept a prompt as a plain string or a {"prompt": ...} object.
+
+    Raises:
+        ValueError: If item carries no prompt string
+    """
+    if isinstance(item, dict):
+        item = item.get("prompt")
+    if not isinstance(item, str):
+        raise ValueError('each item must be a prompt string or {"prompt": "..."}')
+    return item.strip()
+
+
+def translated_line(index: int, item: Any) -> str:
+    """
+    One NDJSON output line for the index-th input item.
+
+    Returns:
+        '{"index": i, "result": {...}}' or '{"index": i, "error": "..."}', newline-terminated
+    """
+    try:
+        return f'{{"index": {index}, "result": {translate_to_json_text(parse_prompt(item))}}}\n'
+    except ValueError as e:
+        return json.dumps({"index": index, "error": str(e)}) + "\n"
+
+
+def parse_ndjson_line(line: bytes) -> Any:
+    """Decode one NDJSON input line; malformed JSON is treated as a raw prompt."""
+    text = line.decode("utf-8", errors="replace").strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def iter_ndjson(body: bytes) -> Iterator[Any]:
+    """Decode an NDJSON body lazily, one line at a time; blank lines are skipped."""
+    for line in io.BytesIO(body):
+        if line.strip():
+            yield parse_ndjson_line(line)
+
+
+def memo_stats() -> Dict[str, Any]:
+    """Hit/miss counters of the translation memo."""
+    info = translate_to_json_text.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "entries": info.currsize,
+        "max_entries": info.maxsize,
+        "hit_rate": (info.hits / lookups) if lookups else 0.0,
+    }
@@ -16,94 +16,197 @@ Frontend Parameter Specifications:
 """
 
 import re
-from typing import Dict, Any
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+
+# Enhanced-prompt phrases. Each slider is bucketed by (strict, inclusive)
+# upper bounds: a value below a strict bound, or else at/below an inclusive
+# bound, picks the phrase at that bound's index; anything past the last
+# bound gets the final phrase.
+PITCH_BUCKETS = ((-60, -20), (20,))
+PITCH_PHRASES = ("top-down aerial view", "high angle view", "eye-level view", "low angle view from below")
+
+YAW_BUCKETS = ((-120, -45, -10), (10, 45, 120))
+YAW_PHRASES = (
+    "rear view", "from left side", "slight left angle", "front facing",
+    "slight right angle", "from right side", "rear view",
+)
+
+FOCAL_LENGTH_BUCKETS = ((), (24, 35, 50, 85))
+FOCAL_LENGTH_PHRASES = (
+    "ultra wide angle lens", "wide angle 35mm lens", "standard 50mm lens",
+    "portrait 85mm lens", "telephoto {}mm lens",
+)
+TELEPHOTO = len(FOCAL_LENGTH_PHRASES) - 1
+
+LIGHTING_BUCKETS = ((20, 40, 60, 80), ())
+LIGHTING_PHRASES = (
+    "low-key dramatic lighting, dark moody atmosphere", "subtle lighting with shadows",
+    "balanced natural lighting", "bright well-lit scene", "high-key bright lighting, clean and airy",
+)
+
+PALETTE_PHRASES = {
+    "warm": "warm golden tones, sunset colors, orange and amber hues",
+    "cool": "cool blue tones, crisp cold atmosphere",
+    "neutral": "balanced natural colors",
+    "cinematic": "cinematic color grading, moody film look, dramatic atmosphere",
+    "vibrant": "vibrant saturated colors, bold and colorful"
+}
+
+ENHANCED_PROMPT_MEMO_SIZE = 4096
+
+
+def bucket_index(value, buckets) -> int:
+    """Phrase index for value given (strict, inclusive) bounds, see PITCH_BUCKETS."""
+    strict, inclusive = buckets
+    index = bisect_right(strict, value)
+    if index < len(strict):
+        return index
+    return index + bisect_left(inclusive, value)
+
+
+def bucket_table(buckets, low: int, high: int) -> Dict[int, int]:
+    """Precompute bucket_index for every integer slider position in [low, high]."""
+    return {value: bucket_index(value, buckets) for value in range(low, high + 1)}
+
+
+# Slider positions are integers, so the common case is one dict lookup;
+# fractional or out-of-range values fall back to bucket_index.
+FOCAL_LENGTH_INDEX = bucket_table(FOCAL_LENGTH_BUCKETS, 12, 200)
+YAW_INDEX = bucket_table(YAW_BUCKETS, -180, 180)
+PITCH_INDEX = bucket_table(PITCH_BUCKETS, -90, 90)
+LIGHTING_INDEX = bucket_table(LIGHTING_BUCKETS, 0, 100)
+
+
+def slider_bucket(value, index: Dict[int, int], buckets) -> int:
+    """Bucket for a slider value via its precomputed table."""
+    bucket = index.get(value)
+    return bucket_index(value, buckets) if bucket is None else bucket
+
+
+def prompt_buckets(params: Dict[str, Any]) -> Tuple[Any, ...]:
+    """
+    Reduce RenderParameters to the inputs the enhanced prompt depends on.
+
+    Returns:
+        (base prompt, lens key, yaw bucket, pitch bucket, lighting bucket, palette);
+        the lens key is the focal length itself in the telephoto bucket,
+        whose phrase quotes it
+    """
+    focal_length = params.get("focalLength", 35)
+    lens = slider_bucket(focal_length, FOCAL_LENGTH_INDEX, FOCAL_LENGTH_BUCKETS)
+    return (
+        params.get("prompt", ""),
+        focal_length if lens == TELEPHOTO else lens,
+        slider_bucket(params.get("yaw", 0), YAW_INDEX, YAW_BUCKETS),
+        slider_bucket(params.get("pitch", 0), PITCH_INDEX, PITCH_BUCKETS),
+        slider_bucket(params.get("lighting", 50), LIGHTING_INDEX, LIGHTING_BUCKETS),
+        params.get("colorPalette", "neutral"),
+    )
+
+
+# typed: 90 and 90.0 quote differently in the telephoto phrase
+@lru_cache(maxsize=ENHANCED_PROMPT_MEMO_SIZE, typed=True)
+def enhanced_prompt_for(base_prompt: str, lens, yaw: int, pitch: int, lighting: int, color_palette: str) -> str:
+    """Build (and memoize) the enhanced prompt for one bucket tuple, see prompt_buckets."""
+    if lens < TELEPHOTO:
+        lens_desc = FOCAL_LENGTH_PHRASES[lens]
+    else:
+        lens_desc = FOCAL_LENGTH_PHRASES[TELEPHOTO].format(lens)
+    palette_desc = PALETTE_PHRASES.get(color_palette, "natural colors")
+
+    return (
+        f"{base_prompt}, shot with {lens_desc}, {PITCH_PHRASES[pitch]}, {YAW_PHRASES[yaw]}, "
+        f"{LIGHTING_PHRASES[lighting]}, {palette_desc}, "
+        "professional photography, high quality, detailed, photorealistic"
+    )
 
 
 def params_to_enhanced_prompt(params: Dict[str, Any]) -> str:
     """
     Convert RenderParameters JSON back to an enhanced descriptive prompt
     that incorporates all the technical parameters for better image generation.
-    
+
+    Only the bucket each slider falls into matters, so slider tweaks within a
+    bucket return the memoized string (a stable key for the embedding cache).
+
     Args:
         params: Dict containing RenderParameters (focalLength, yaw, pitch, lighting, colorPalette, etc.)
-        
+
     Returns:
         Enhanced prompt string with technical details for image generation
     """
-    base_prompt = params.get("prompt", "")
-    focal_length = params.get("focalLength", 35)
-    yaw = params.get("yaw", 0)
-    pitch = params.get("pitch", 0)
-    lighting = params.get("lighting", 50)
-    color_palette = params.get("colorPalette", "neutral")
-    
-    # Build camera angle description
-    camera_angle = ""
-    if pitch < -60:
-        camera_angle = "top-down aerial view"
-    elif pitch < -20:
-        camera_angle = "high angle view"
-    elif pitch > 20:
-        camera_angle = "low angle view from below"
-    else:
-        camera_angle = "eye-level view"
-    
-    # Build camera rotation description
-    rotation = ""
-    if yaw < -120:
-        rotation = "rear view"
-    elif yaw < -45:
-        rotation = "from left side"
-    elif yaw < -10:
-        rotation = "slight left angle"
-    elif yaw > 120:
-        rotation = "rear view"
-    elif yaw > 45:
-        rotation = "from right side"
-    elif yaw > 10:
-        rotation = "slight right angle"
-    else:
-        rotation = "front facing"
-    
-    # Build lens description
-    lens_desc = ""
-    if focal_length <= 24:
-        lens_desc = "ultra wide angle lens"
-    elif focal_length <= 35:
-        lens_desc = "wide angle 35mm lens"
-    elif focal_length <= 50:
-        lens_desc = "standard 50mm lens"
-    elif focal_length <= 85:
-        lens_desc = "portrait 85mm lens"
-    else:
-        lens_desc = f"telephoto {focal_length}mm lens"
-    
-    # Build lighting description
-    lighting_desc = ""
-    if lighting < 20:
-        lighting_desc = "low-key dramatic lighting, dark moody atmosphere"
-    elif lighting < 40:
-        lighting_desc = "subtle lighting with shadows"
-    elif lighting < 60:
-        lighting_desc = "balanced natural lighting"
-    elif lighting < 80:
-        lighting_desc = "bright well-lit scene"
-    else:
-        lighting_desc = "high-key bright lighting, clean and airy"
-    
-    # Build color palette description
-    palette_desc = {
-        "warm": "warm golden tones, sunset colors, orange and amber hues",
-        "cool": "cool blue tones, crisp cold atmosphere",
-        "neutral": "balanced natural colors",
-        "cinematic": "cinematic color grading, moody film look, dramatic atmosphere",
-        "vibrant": "vibrant saturated colors, bold and colorful"
-    }.get(color_palette, "natural colors")
-    
-    # Combine everything into an enhanced prompt
-    enhanced_prompt = f"{base_prompt}, shot with {lens_desc}, {camera_angle}, {rotation}, {lighting_desc}, {palette_desc}, professional photography, high quality, detailed, photorealistic"
-    
-    return enhanced_prompt
+    return enhanced_prompt_for(*prompt_buckets(params))
+
+
+# Keyword rules, in priority order: the first rule with any keyword present
+# in the lowercased prompt (as a substring) wins. Each table is flattened at
+# import into (keyword, value) pairs scanned with C-level substring search.
+FOCAL_LENGTH_PATTERN = re.compile(r'(\d+)\s*mm')
+
+FOCAL_LENGTH_RULES = (
+    (24, ("wide", "environment", "landscape")),
+    (85, ("portrait", "headshot", "closeup")),
+    (50, ("product",)),
+    (135, ("telephoto", "zoom")),
+)
+
+PITCH_RULES = (
+    (-45, ("high angle", "overhead", "bird's eye")),
+    (-90, ("top down", "directly above")),
+    (30, ("low angle", "from below", "worm's eye")),
+    (0, ("eye level", "straight on")),
+    (-15, ("slight tilt down",)),
+    (15, ("slight tilt up",)),
+)
+
+YAW_RULES = (
+    (-45, ("from left", "left side")),
+    (45, ("from right", "right side")),
+    (0, ("front", "straight ahead")),
+    (180, ("behind", "rear")),
+    (-30, ("quarter left", "3/4 left")),
+    (30, ("quarter right", "3/4 right")),
+)
+
+COLOR_PALETTE_RULES = (
+    ("warm", ("warm", "golden", "sunset", "orange")),
+    ("cool", ("cool", "blue", "cold", "icy")),
+    ("cinematic", ("cinematic", "moody", "dramatic", "film")),
+    ("vibrant", ("vibrant", "bright", "saturated", "colorful")),
+    ("neutral", ("neutral", "balanced", "natural")),
+)
+
+LIGHTING_RULES = (
+    (5, ("very dark", "extremely dark")),
+    (20, ("dark", "low key", "moody", "dramatic")),
+    (35, ("dim", "subtle")),
+    (85, ("bright", "high key", "well lit")),
+    (95, ("very bright", "extremely bright")),
+    (50, ("normal", "standard")),
+)
+
+
+def compile_rules(rules):
+    """Flatten (value, keywords) rules into priority-ordered (keyword, value) pairs."""
+    return tuple((keyword, value) for value, keywords in rules for keyword in keywords)
+
+
+FOCAL_LENGTH_TABLE = compile_rules(FOCAL_LENGTH_RULES)
+PITCH_TABLE = compile_rules(PITCH_RULES)
+YAW_TABLE = compile_rules(YAW_RULES)
+COLOR_PALETTE_TABLE = compile_rules(COLOR_PALETTE_RULES)
+LIGHTING_TABLE = compile_rules(LIGHTING_RULES)
+
+
+def first_match(table, prompt: str, default):
+    """Value of the highest-priority keyword present in prompt, else default."""
+    for keyword, value in table:
+        if keyword in prompt:
+            return value
+    return default
 
 
 def translate_prompt_to_json(prompt: str) -> Dict[str, Any]:
@@ -118,34 +221,14 @@ def translate_prompt_to_json(prompt: str) -> Dict[str, Any]:
     """
     prompt_lower = prompt.lower()
     
-    # Extract focal length
-    focal = extract_focal_length(prompt_lower)
-    
-    # Detect lighting mood
-    ambient = 0.1 if "moody" in prompt_lower or "dramatic" in prompt_lower else 0.2
-    if "bright" in prompt_lower or "clean" in prompt_lower:
-        ambient = 0.7
-        
-    # Detect camera angle (pitch: -90 to 90)
-    pitch = extract_camera_angle(prompt_lower)
-    
-    # Detect yaw (camera rotation: -180 to 180)
-    yaw = extract_yaw(prompt_lower)
-    
-    # Detect color palette (must match frontend options)
-    color_palette = extract_color_palette(prompt_lower)
-    
-    # Extract lighting (0-100 scale for frontend slider)
-    lighting_value = extract_lighting_value(prompt_lower)
-    
     # Frontend-compatible JSON format matching RenderParameters interface
     json_out = {
         "prompt": prompt.strip(),
-        "focalLength": focal,  # 12-200 range
-        "yaw": yaw,  # -180 to 180
-        "pitch": pitch,  # -90 to 90
-        "lighting": lighting_value,  # 0-100
-        "colorPalette": color_palette,  # warm/cool/neutral/cinematic/vibrant
+        "focalLength": extract_focal_length(prompt_lower),  # 12-200 range
+        "yaw": extract_yaw(prompt_lower),  # -180 to 180
+        "pitch": extract_camera_angle(prompt_lower),  # -90 to 90
+        "lighting": extract_lighting_value(prompt_lower),  # 0-100
+        "colorPalette": extract_color_palette(prompt_lower),  # warm/cool/neutral/cinematic/vibrant
         "controlNet": {
             "type": "none",  # none/sketch/depth/canny
             "strength": 0.75,  # 0.0-1.0
@@ -161,100 +244,64 @@ def translate_prompt_to_json(prompt: str) -> Dict[str, Any]:
 
 def extract_focal_length(prompt: str) -> int:
     """Extract focal length from prompt text. Range: 12-200mm (frontend slider)."""
-    patterns = [
-        (r'(\d+)\s*mm', 1),
-        (r'(\d+)mm', 1),
-    ]
-    
-    for pattern, group in patterns:
-        match = re.search(pattern, prompt)
-        if match:
-            focal = int(match.group(group))
-            # Clamp to frontend range (12-200)
-            return max(12, min(200, focal))
+    match = FOCAL_LENGTH_PATTERN.search(prompt)
+    if match:
+        # Clamp to frontend range (12-200)
+        return max(12, min(200, int(match.group(1))))
     
     # Defaults based on keywords (within 12-200 range)
-    if "wide" in prompt or "environment" in prompt or "landscape" in prompt:
-        return 24
-    elif "portrait" in prompt or "headshot" in prompt or "closeup" in prompt:
-        return 85
-    elif "product" in prompt:
-        return 50
-    elif "telephoto" in prompt or "zoom" in prompt:
-        return 135
-    
-    return 35  # Standard default
+    return first_match(FOCAL_LENGTH_TABLE, prompt, 35)  # 35 = standard default
 
 
 def extract_camera_angle(prompt: str) -> int:
     """Extract camera pitch angle from prompt. Range: -90 to 90 (frontend slider)."""
-    if "high angle" in prompt or "overhead" in prompt or "bird's eye" in prompt:
-        return -45
-    elif "top down" in prompt or "directly above" in prompt:
-        return -90
-    elif "low angle" in prompt or "from below" in prompt or "worm's eye" in prompt:
-        return 30
-    elif "eye level" in prompt or "straight on" in prompt:
-        return 0
-    elif "slight tilt down" in prompt:
-        return -15
-    elif "slight tilt up" in prompt:
-        return 15
-    
-    return 0  # Default (eye level)
+    return first_match(PITCH_TABLE, prompt, 0)  # Default (eye level)
 
 
 def extract_yaw(prompt: str) -> int:
     """Extract camera yaw (rotation) from prompt. Range: -180 to 180 (frontend slider)."""
-    if "from left" in prompt or "left side" in prompt:
-        return -45
-    elif "from right" in prompt or "right side" in prompt:
-        return 45
-    elif "front" in prompt or "straight ahead" in prompt:
-        return 0
-    elif "behind" in prompt or "rear" in prompt:
-        return 180
-    elif "quarter left" in prompt or "3/4 left" in prompt:
-        return -30
-    elif "quarter right" in prompt or "3/4 right" in prompt:
-        return 30
-    
-    return 0  # Default (front view)
+    return first_match(YAW_TABLE, prompt, 0)  # Default (front view)
 
 
 def extract_color_palette(prompt: str) -> str:
     """Extract color palette preference from prompt. 
     Options: warm, cool, neutral, cinematic, vibrant (frontend select).
     """
-    if "warm" in prompt or "golden" in prompt or "sunset" in prompt or "orange" in prompt:
-        return "warm"
-    elif "cool" in prompt or "blue" in prompt or "cold" in prompt or "icy" in prompt:
-        return "cool"
-    elif "cinematic" in prompt or "moody" in prompt or "dramatic" in prompt or "film" in prompt:
-        return "cinematic"
-    elif "vibrant" in prompt or "bright" in prompt or "saturated" in prompt or "colorful" in prompt:
-        return "vibrant"
-    elif "neutral" in prompt or "balanced" in prompt or "natural" in prompt:
-        return "neutral"
-    
-    return "neutral"  # Default
+    return first_match(COLOR_PALETTE_TABLE, prompt, "neutral")
 
 
 def extract_lighting_value(prompt: str) -> int:
     """Extract lighting intensity from prompt. Range: 0-100 (frontend slider).
     0 = Low Key (dark/moody), 100 = High Key (bright).
     """
-    if "very dark" in prompt or "extremely dark" in prompt:
-        return 5
-    elif "dark" in prompt or "low key" in prompt or "moody" in prompt or "dramatic" in prompt:
-        return 20
-    elif "dim" in prompt or "subtle" in prompt:
-        return 35
-    elif "bright" in prompt or "high key" in prompt or "well lit" in prompt:
-        return 85
-    elif "very bright" in prompt or "extremely bright" in prompt:
-        return 95
-    elif "normal" in prompt or "standard" in prompt:
-        return 50
+    return first_match(LIGHTING_TABLE, prompt, 50)  # Default (middle value)
+
+
+def manifest_to_render_params(manifest: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a FIBO JSON manifest (scene/camera/lighting) to frontend
+    RenderParameters so it can go through the same render path as /render.
     
-    return 50  # Default (middle value)
+    Args:
+        manifest: FIBO manifest, e.g. an expanded SKU batch template
+        
+    Returns:
+        Dict matching the RenderParameters interface
+    """
+    scene = manifest.get("scene", {})
+    camera = manifest.get("camera", {})
+    rotation = camera.get("rotation", {})
+    ambient = manifest.get("lighting", {}).get("ambient", {}).get("intensity", 0.5)
+    
+    return {
+        "prompt": scene.get("description", ""),
+        "focalLength": camera.get("lens", {}).get("focal_length_mm", 35),
+        "yaw": rotation.get("yaw", 0),
+        "pitch": rotation.get("pitch", 0),
+        "lighting": max(0, min(100, round(ambient * 100))),  # 0-1 intensity -> 0-100 slider
+        "colorPalette": scene.get("color_palette", "neutral"),
+        "controlNet": {"type": "none", "strength": 0.75, "image": None},
+        "seed": scene.get("seed"),
+        "resolution": {"width": 1024, "height": 1024},
+        "colorSpace": "sRGB"
+    }
@@ -0,0 +1,181 @@
+"""
+Batch HDR Export
+
+Fans EXR/TIFF/tone-mapped preview exports for many renders across a
+process pool. Each source is decoded once per file and shared by all of
+its outputs. Outputs are named per export (e.g. by version id), not by
+source file: deduplicated renders share one blob, so several versions can
+point at the same source.
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+from backend.utils.export_exr import (
+    STRIP_ROWS,
+    _open_rgb,
+    check_tiff_options,
+    write_exr,
+    write_tiff,
+    write_tone_mapped,
+)
+
+EXPORT_FORMATS = ("exr", "tiff", "preview")
+
+
+def export_file(
+    source_path: str,
+    output_dir: str,
+    formats: Sequence[str] = EXPORT_FORMATS,
+    options: Optional[Dict[str, Any]] = None,
+    name: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Decode one source and write each requested format from that decode.
+
+    Failures are reported per output instead of raised, so one bad file or
+    a missing OpenEXR install never aborts the rest of a batch.
+
+    Args:
+        source_path: Source render (JPEG/PNG)
+        output_dir: Directory for <name>.exr, <name>.tiff and <name>_preview.jpg
+        formats: Any of exr, tiff, preview
+        options: exr_bit_depth, tiff_bit_depth, tiff_compression,
+            tone_mapping, exposure, metadata, strip_rows
+        name: Output file stem (default: the source file's stem)
+
+    Returns:
+        Dict of source, name, outputs (format -> path), errors (format -> message)
+        and timings in seconds (decode plus one per format)
+    """
+    options = options or {}
+    stem = name or Path(source_path).stem
+    out = Path(output_dir)
+    report: Dict[str, Any] = {"source": source_path, "name": stem, "outputs": {}, "errors": {}, "timings": {}}
+
+    start = time.perf_counter()
+    try:
+        img = _open_rgb(source_path)
+    except Exception as e:
+        report["errors"]["decode"] = str(e)
+        return report
+    report["timings"]["decode"] = time.perf_counter() - start
+
+    strip_rows = options.get("strip_rows", STRIP_ROWS)
+    writers = {
+        "exr": lambda: write_exr(
+            img,
+            str(out / f"{stem}.exr"),
+            options.get("exr_bit_depth", 32),
+            {"source_file": Path(source_path).name, **options.get("metadata", {})},
+            strip_rows,
+        ),
+        "tiff": lambda: write_tiff(
+            img,
+            str(out / f"{stem}.tiff"),
+            options.get("tiff_bit_depth", 16),
+            options.get("tiff_compression", "deflate"),
+            strip_rows,
+        ),
+        "preview": lambda: write_tone_mapped(
+            img,
+            str(out / f"{stem}_preview.jpg"),
+            options.get("tone_mapping", "aces"),
+            options.get("exposure", 0.0),
+        ),
+    }
+    for fmt in formats:
+        start = time.perf_counter()
+        try:
+            report["outputs"][fmt] = writers[fmt]()
+        except ImportError as e:
+            report["errors"][fmt] = f"Missing dependency: {e.name or e}"
+        except Exception as e:
+            report["errors"][fmt] = str(e)
+        report["timings"][fmt] = time.perf_counter() - start
+    return report
+
+
+def batch_export(
+    sources: Iterable[str],
+    output_dir: str,
+    formats: Sequence[str] = EXPORT_FORMATS,
+    options: Optional[Dict[str, Any]] = None,
+    max_workers: Optional[int] = None,
+    on_file_done=None,
+    names: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Export many sources in parallel, one file per task.
+
+    Workers are spawned rather than forked, so a server process holding a
+    loaded diffusion pipeline is never duplicated into them.
+
+    Args:
+        sources: Source image paths
+        output_dir: Shared output directory
+        formats: Any of exr, tiff, preview
+        options: Export options, see export_file
+        max_workers: Worker processes (EXPORT_WORKERS, default: CPU count)
+        on_file_done: Optional callback(report) as each file finishes
+        names: Output stem per source, e.g. version ids (default: source
+            stems). Must be unique, since outputs share output_dir.
+
+    Returns:
+        Dict of files (per-file reports in source order), succeeded, failed
+        and total_seconds
+
+    Raises:
+        ValueError: On an unknown format, TIFF options the writer can't
+            honor (jpeg at 16 bits), or output names that collide
+    """
+    unknown = set(formats) - set(EXPORT_FORMATS)
+    if unknown:
+        raise ValueError(f"formats must be among: {', '.join(EXPORT_FORMATS)}")
+    options = options or {}
+    if "tiff" in formats:
+        # Fail the whole batch up front rather than once per file
+        check_tiff_options(options.get("tiff_bit_depth", 16), options.get("tiff_compression", "deflate"))
+    sources = list(sources)
+    names = list(names) if names is not None else [Path(source).stem for source in sources]
+    if len(names) != len(sources):
+        raise ValueError("names must give one output name per source")
+    if len(set(names)) != len(names):
+        raise ValueError("Output names must be unique; pass names (e.g. version ids) for sources sharing a file name")
+    os.makedirs(output_dir, exist_ok=True)
+    max_workers = max_workers or int(os.getenv("EXPORT_WORKERS", "0")) or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    reports: Dict[int, Dict[str, Any]] = {}
+    if sources:
+        with ProcessPoolExecutor(
+            max_workers=min(max_workers, len(sources)),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as pool:
+            futures = {
+                pool.submit(export_file, source, output_dir, tuple(formats), options, names[i]): i
+                for i, source in enumerate(sources)
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    report = future.result()
+                except Exception as e:
+                    # Worker crashed (e.g. killed for memory)
+                    report = {"source": sources[index], "name": names[index], "outputs": {}, "errors": {"worker": str(e)}, "timings": {}}
+                reports[index] = report
+                if on_file_done is not None:
+                    on_file_done(report)
+
+    files = [reports[i] for i in range(len(sources))]
+    failed = sum(1 for report in files if report["errors"])
+    return {
+        "files": files,
+        "succeeded": len(files) - failed,
+        "failed": failed,
+        "total_seconds": time.perf_counter() - start,
+    }
@@ -8,65 +8,87 @@ import os
 from pathlib import Path
 from typing import Optional, Literal
 
+import numpy as np
+
+from backend.utils.tonemap import tone_map
+
+
+# Rows converted per strip; peak memory is one strip of float data, not a frame
+STRIP_ROWS = 256
+
+TIFF_DESCRIPTION = "Generated by StudioFlow FIBO"
+TIFF_SOFTWARE = "StudioFlow v0.1.0"
+
+# TIFF compression codes the strip writer can produce (Deflate via zlib;
+# there is no LZW encoder in the standard library)
+TIFF_COMPRESSION = {"none": 1, "deflate": 8}
+
+# Strip-writer codecs plus Pillow's 8-bit jpeg
+TiffCompression = Literal["none", "deflate", "jpeg"]
+
+
+def check_tiff_options(bit_depth: int, compression: str) -> None:
+    """
+    Reject TIFF settings the writers can't honor.
+
+    Raises:
+        ValueError: For an unknown compression, or jpeg with 16-bit output
+    """
+    if compression not in TIFF_COMPRESSION and compression != "jpeg":
+        raise ValueError(f"Unknown TIFF compression: {compression}")
+    if compression == "jpeg" and bit_depth != 8:
+        raise ValueError("jpeg TIFF compression is 8-bit only; use bit depth 8 or another compression")
+
+
+def _open_rgb(source_image_path: str):
+    """Open and decode the source once as 8-bit RGB (no float frame is built)."""
+    from PIL import Image
+    
+    img = Image.open(source_image_path)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    img.load()
+    return img
+
+
+def _iter_strips(img, strip_rows: int):
+    """Yield (row, uint8 array of shape (rows, width, 3)) strips of a PIL image."""
+    width, height = img.size
+    for y in range(0, height, strip_rows):
+        yield y, np.asarray(img.crop((0, y, width, min(y + strip_rows, height))))
+
 
 def export_to_exr(
     source_image_path: str,
     output_path: Optional[str] = None,
     bit_depth: Literal[16, 32] = 32,
-    metadata: Optional[dict] = None
+    metadata: Optional[dict] = None,
+    strip_rows: int = STRIP_ROWS
 ) -> str:
     """
     Export image to OpenEXR format.
     
+    Scanlines are converted and written strip_rows at a time, so memory
+    stays bounded by one strip of half/float channels at any resolution.
+    
     Args:
         source_image_path: Path to source image (JPEG/PNG)
         output_path: Optional output path
-        bit_depth: 16 or 32 bit float
+        bit_depth: 16 (half) or 32 bit float
         metadata: Optional metadata dict to embed
+        strip_rows: Scanlines converted and written per call
         
     Returns:
         Path to exported EXR file
     """
     try:
-        import OpenEXR
-        import Imath
-        from PIL import Image
-        import numpy as np
-        
-        # Load source image
-        img = Image.open(source_image_path).convert('RGB')
-        img_array = np.array(img).astype(np.float32) / 255.0
+        img = _open_rgb(source_image_path)
         
         # Prepare output path
         if output_path is None:
             output_path = Path(source_image_path).with_suffix('.exr')
         
-        # Create EXR header
-        height, width = img_array.shape[:2]
-        header = OpenEXR.Header(width, height)
-        
-        # Add metadata
-        if metadata:
-            for key, value in metadata.items():
-                header[key] = str(value)
-        
-        # Set pixel type
-        if bit_depth == 16:
-            pixel_type = Imath.PixelType(Imath.PixelType.HALF)
-        else:
-            pixel_type = Imath.PixelType(Imath.PixelType.FLOAT)
-        
-        # Write EXR
-        exr = OpenEXR.OutputFile(str(output_path), header)
-        
-        r = img_array[:,:,0].tobytes()
-        g = img_array[:,:,1].tobytes()
-        b = img_array[:,:,2].tobytes()
-        
-        exr.writePixels({'R': r, 'G': g, 'B': b})
-        exr.close()
-        
-        return str(output_path)
+        return write_exr(img, str(output_path), bit_depth, metadata, strip_rows)
         
     except ImportError:
         print("Warning: OpenEXR not installed. Install with: pip install openexr")
@@ -76,51 +98,193 @@ def export_to_exr(
         return source_image_path
 
 
+def write_exr(
+    img,
+    output_path: str,
+    bit_depth: Literal[16, 32] = 32,
+    metadata: Optional[dict] = None,
+    strip_rows: int = STRIP_ROWS
+) -> str:
+    """
+    Write an already decoded RGB PIL image to OpenEXR, strip by strip.
+    
+    Raises:
+        ImportError: If OpenEXR is not installed
+    """
+    import OpenEXR
+    import Imath
+    
+    # Create EXR header
+    width, height = img.size
+    header = OpenEXR.Header(width, height)
+    
+    # Add metadata
+    if metadata:
+        for key, value in metadata.items():
+            header[key] = str(value)
+    
+    # Set pixel type
+    if bit_depth == 16:
+        pixel_type = Imath.PixelType(Imath.PixelType.HALF)
+        dtype = np.float16
+    else:
+        pixel_type = Imath.PixelType(Imath.PixelType.FLOAT)
+        dtype = np.float32
+    header['channels'] = {c: Imath.Channel(pixel_type) for c in 'RGB'}
+    
+    # 8-bit code -> linear float lookup; indexing yields each planar
+    # channel directly in the output dtype
+    lut = (np.arange(256, dtype=np.float32) / 255.0).astype(dtype)
+    
+    # Write EXR scanlines strip by strip
+    exr = OpenEXR.OutputFile(output_path, header)
+    try:
+        for _, strip in _iter_strips(img, strip_rows):
+            exr.writePixels(
+                {c: lut[strip[:, :, i]].tobytes() for i, c in enumerate('RGB')},
+                strip.shape[0]
+            )
+    finally:
+        exr.close()
+    return output_path
+
+
 def export_to_tiff(
     source_image_path: str,
     output_path: Optional[str] = None,
     bit_depth: Literal[8, 16] = 16,
-    compression: str = "lzw"
+    compression: TiffCompression = "deflate",
+    strip_rows: int = STRIP_ROWS
 ) -> str:
     """
-    Export image to TIFF format.
+    Export image to RGB TIFF format.
+    
+    none/deflate output is written one strip at a time; jpeg compression goes
+    through Pillow and is 8-bit only.
     
     Args:
         source_image_path: Path to source image
         output_path: Optional output path
-        bit_depth: 8 or 16 bit
-        compression: Compression method (lzw, none, jpeg)
+        bit_depth: 8 or 16 bit per channel
+        compression: Compression method (deflate, none, jpeg)
+        strip_rows: Rows per TIFF strip
         
     Returns:
         Path to exported TIFF file
+    
+    Raises:
+        ValueError: If compression is jpeg and bit_depth is 16
     """
+    check_tiff_options(bit_depth, compression)
     try:
-        from PIL import Image
-        
-        img = Image.open(source_image_path)
+        img = _open_rgb(source_image_path)
         
         if output_path is None:
             output_path = Path(source_image_path).with_suffix('.tiff')
         
-        # Convert to 16-bit if requested
-        if bit_depth == 16:
-            img = img.convert('I;16')
+        return write_tiff(img, str(output_path), bit_depth, compression, strip_rows)
         
+    except Exception as e:
+        print(f"TIFF export failed: {e}")
+        return source_image_path
+
+
+def write_tiff(
+    img,
+    output_path: str,
+    bit_depth: Literal[8, 16] = 16,
+    compression: TiffCompression = "deflate",
+    strip_rows: int = STRIP_ROWS
+) -> str:
+    """
+    Write an already decoded RGB PIL image to TIFF (see export_to_tiff).
+
+    Raises:
+        ValueError: If compression is jpeg and bit_depth is 16
+    """
+    check_tiff_options(bit_depth, compression)
+    if compression == "jpeg":
         img.save(
             output_path,
             'TIFF',
-            compression=compression,
+            compression="jpeg",
             tiffinfo={
-                270: "Generated by StudioFlow FIBO",  # ImageDescription
-                305: "StudioFlow v0.1.0",  # Software
+                270: TIFF_DESCRIPTION,  # ImageDescription
+                305: TIFF_SOFTWARE,  # Software
             }
         )
+    else:
+        _write_tiff_strips(img, output_path, bit_depth, TIFF_COMPRESSION[compression], strip_rows)
+    return output_path
+
+
+def _write_tiff_strips(img, output_path: str, bit_depth: int, compression: int, strip_rows: int) -> None:
+    """
+    Write a baseline little-endian RGB TIFF strip by strip.
+    
+    Strips are written as they are converted; the IFD with strip offsets
+    goes at the end of the file and the header is patched to point at it.
+    """
+    import struct
+    import zlib
+    
+    width, height = img.size
+    offsets, byte_counts = [], []
+    with open(output_path, 'wb') as f:
+        f.write(b'II*\x00\x00\x00\x00\x00')  # IFD offset patched below
+        for _, strip in _iter_strips(img, strip_rows):
+            if bit_depth == 16:
+                # Full-range 8 -> 16 bit (0xAB -> 0xABAB)
+                data = (strip.astype('<u2') * 257).tobytes()
+            else:
+                data = strip.tobytes()
+            if compression == 8:
+                data = zlib.compress(data, 6)
+            offsets.append(f.tell())
+            byte_counts.append(len(data))
+            f.write(data)
         
-        return str(output_path)
+        SHORT, LONG, ASCII, RATIONAL = 3, 4, 2, 5
+        entries = [
+            (256, LONG, [width]),  # ImageWidth
+            (257, LONG, [height]),  # ImageLength
+            (258, SHORT, [bit_depth] * 3),  # BitsPerSample
+            (259, SHORT, [compression]),  # Compression
+            (262, SHORT, [2]),  # PhotometricInterpretation: RGB
+            (270, ASCII, TIFF_DESCRIPTION),  # ImageDescription
+            (273, LONG, offsets),  # StripOffsets
+            (277, SHORT, [3]),  # SamplesPerPixel
+            (278, LONG, [strip_rows]),  # RowsPerStrip
+            (279, LONG, byte_counts),  # StripByteCounts
+            (282, RATIONAL, [72, 1]),  # XResolution
+            (283, RATIONAL, [72, 1]),  # YResolution
+            (284, SHORT, [1]),  # PlanarConfiguration: chunky
+            (296, SHORT, [2]),  # ResolutionUnit: inch
+            (305, ASCII, TIFF_SOFTWARE),  # Software
+        ]
         
-    except Exception as e:
-        print(f"TIFF export failed: {e}")
-        return source_image_path
+        if f.tell() % 2:
+            f.write(b'\x00')  # IFD must start on a word boundary
+        ifd_offset = f.tell()
+        data_offset = ifd_offset + 2 + 12 * len(entries) + 4
+        ifd = struct.pack('<H', len(entries))
+        extra = b''
+        for tag, kind, values in entries:
+            if kind == ASCII:
+                payload = values.encode('ascii') + b'\x00'
+                count = len(payload)
+            else:
+                fmt = {SHORT: 'H', LONG: 'I', RATIONAL: 'I'}[kind]
+                payload = struct.pack(f'<{len(values)}{fmt}', *values)
+                count = len(values) // 2 if kind == RATIONAL else len(values)
+            if len(payload) <= 4:
+                ifd += struct.pack('<HHI', tag, kind, count) + payload.ljust(4, b'\x00')
+            else:
+                ifd += struct.pack('<HHII', tag, kind, count, data_offset + len(extra))
+                extra += payload + b'\x00' * (len(payload) % 2)
+        f.write(ifd + struct.pack('<I', 0) + extra)
+        f.seek(4)
+        f.write(struct.pack('<I', ifd_offset))
 
 
 def apply_tone_mapping(
@@ -132,6 +296,9 @@ def apply_tone_mapping(
     """
     Apply tone mapping to HDR image.
     
+    8/16-bit inputs are normalized by their full range and mapped through a
+    lookup table; float inputs are treated as linear (see tonemap.tone_map).
+    
     Args:
         input_path: Path to HDR image (EXR/TIFF)
         output_path: Path for tone-mapped output
@@ -143,25 +310,9 @@ def apply_tone_mapping(
     """
     try:
         from PIL import Image
-        import numpy as np
         
         img = Image.open(input_path)
-        img_array = np.array(img).astype(np.float32)
-        
-        # Apply exposure
-        if exposure != 0.0:
-            img_array *= (2 ** exposure)
-        
-        # Apply tone mapping
-        if method == "aces":
-            img_array = aces_tonemap(img_array)
-        elif method == "reinhard":
-            img_array = reinhard_tonemap(img_array)
-        elif method == "exposure":
-            img_array = np.clip(img_array, 0, 1)
-        
-        # Convert to 8-bit
-        img_array = (img_array * 255).astype(np.uint8)
+        img_array = tone_map(np.asarray(img), method, exposure)
         
         output_img = Image.fromarray(img_array)
         output_img.save(output_path, quality=95)
@@ -173,8 +324,22 @@ def apply_tone_mapping(
         return input_path
 
 
+def write_tone_mapped(
+    img,
+    output_path: str,
+    method: Literal["aces", "reinhard", "exposure"] = "aces",
+    exposure: float = 0.0
+) -> str:
+    """Write an 8-bit tone-mapped preview of an already decoded RGB PIL image."""
+    from PIL import Image
+    
+    img_array = tone_map(np.asarray(img), method, exposure)
+    Image.fromarray(img_array).save(output_path, quality=95)
+    return output_path
+
+
 def aces_tonemap(hdr_image: 'np.ndarray') -> 'np.ndarray':
-    """ACES filmic tone mapping."""
+    """ACES filmic tone mapping (allocating reference; tone_map fuses it in place)."""
     a = 2.51
     b = 0.03
     c = 2.43
@@ -1,62 +1,141 @@
 """
 JSON Schema Validation Utilities
+
+The FIBO schema is parsed and compiled into a Draft7Validator once, and
+recompiled only when schemas/fibo_schema.json changes on disk.
 """
 
-from jsonschema import validate, ValidationError, Draft7Validator
-from typing import Dict, Any, Tuple
+from jsonschema import Draft7Validator
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 import json
+import os
+import threading
 from pathlib import Path
 
+SCHEMA_PATH = Path(__file__).parent.parent.parent / "schemas" / "fibo_schema.json"
+
+
+class CompiledSchema:
+    """A JSON schema file compiled once and reloaded when its mtime changes."""
+
+    def __init__(self, path: Path = SCHEMA_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._mtime: Optional[int] = None
+        self._schema: Dict[str, Any] = {}
+        self._validator: Optional[Draft7Validator] = None
+
+    def _refresh(self) -> Tuple[Dict[str, Any], Draft7Validator]:
+        # One stat per call; the file is only re-read after an edit
+        mtime = os.stat(self.path).st_mtime_ns
+        with self._lock:
+            if mtime != self._mtime:
+                with open(self.path, 'r') as f:
+                    schema = json.load(f)
+                Draft7Validator.check_schema(schema)
+                self._schema = schema
+                self._validator = Draft7Validator(schema)
+                self._mtime = mtime
+            return self._schema, self._validator
+
+    @property
+    def schema(self) -> Dict[str, Any]:
+        return self._refresh()[0]
+
+    @property
+    def validator(self) -> Draft7Validator:
+        return self._refresh()[1]
+
+    def errors(self, instance: Any) -> List[Dict[str, str]]:
+        """Collect every validation error for instance, see collect_errors."""
+        return collect_errors(self.validator, instance)
+
+
+def collect_errors(validator: Draft7Validator, instance: Any) -> List[Dict[str, str]]:
+    """
+    Collect every validation error in one pass.
+
+    Returns:
+        List of {"path", "message"} dicts ordered by path; empty if valid
+    """
+    found = sorted(validator.iter_errors(instance), key=lambda e: [str(p) for p in e.absolute_path])
+    return [
+        {"path": ".".join(str(p) for p in e.absolute_path), "message": e.message}
+        for e in found
+    ]
+
+
+fibo_schema = CompiledSchema()
+
 
 def load_schema() -> Dict[str, Any]:
-    """Load the FIBO JSON schema."""
-    schema_path = Path(__file__).parent.parent.parent / "schemas" / "fibo_schema.json"
-    with open(schema_path, 'r') as f:
-        return json.load(f)
+    """Load the FIBO JSON schema (cached until the file changes)."""
+    return fibo_schema.schema
+
+
+def validation_errors(instance: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Return all FIBO schema errors for instance as {"path", "message"} dicts."""
+    return fibo_schema.errors(instance)
 
 
 def validate_fibo_json(instance: Dict[str, Any]) -> Tuple[bool, str]:
     """
     Validate JSON instance against FIBO schema.
-    
+
     Args:
         instance: JSON object to validate
-        
+
     Returns:
-        Tuple of (is_valid, error_message)
+        Tuple of (is_valid, error_message); the message lists every error
     """
     try:
-        schema = load_schema()
-        validate(instance=instance, schema=schema)
-        return (True, "")
-    except ValidationError as e:
-        return (False, e.message)
+        errors = validation_errors(instance)
     except Exception as e:
         return (False, str(e))
+    if errors:
+        return (False, "; ".join(
+            f"{e['path']}: {e['message']}" if e['path'] else e['message'] for e in errors
+        ))
+    return (True, "")
+
+
+def validate_batch(instances: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Validate many manifests (e.g. expanded SKU rows) with one compiled validator.
+
+    Args:
+        instances: JSON objects to validate
+
+    Returns:
+        One {"index", "valid", "errors"} dict per instance, in order
+    """
+    validator = fibo_schema.validator
+    results = []
+    for index, instance in enumerate(instances):
+        errors = collect_errors(validator, instance)
+        results.append({"index": index, "valid": not errors, "errors": errors})
+    return results
 
 
 def get_schema_hints(field_path: str) -> Dict[str, Any]:
     """
     Get schema hints for autocomplete/validation.
-    
+
     Args:
         field_path: Dot-notation path (e.g., "camera.lens.focal_length_mm")
-        
+
     Returns:
         Dict with type, range, and description
     """
     schema = load_schema()
-    
+
     # Navigate schema by path
-    parts = field_path.split('.')
-    current = schema.get("properties", {})
-    
-    for part in parts:
-        if "properties" in current:
-            current = current["properties"].get(part, {})
-        else:
+    current = schema
+    for part in field_path.split('.'):
+        if part not in current.get("properties", {}):
             return {}
-    
+        current = current["properties"][part]
+
     return {
         "type": current.get("type"),
         "minimum": current.get("minimum"),
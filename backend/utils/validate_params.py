@@ -0,0 +1,122 @@
+"""
+RenderParameters Validation
+
+Table-driven validation of the frontend RenderParameters format. The rules
+are declared once and compiled at import into flat tuples of checks (sets
+for enums, (min, max) tuples for ranges), so a request only walks the
+precompiled table and every error is reported, not just the first.
+"""
+
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Matches the frontend sliders/selects. Order within each list is the
+# order errors are reported in.
+RENDER_PARAMETER_RULES: Dict[str, Any] = {
+    "required": (
+        "prompt", "focalLength", "yaw", "pitch", "lighting",
+        "colorPalette", "controlNet", "seed", "resolution", "colorSpace",
+    ),
+    "types": (
+        ("focalLength", (int, float), "a number"),
+        ("seed", int, "an integer"),
+    ),
+    "ranges": (
+        ("focalLength", 12, 200),
+        ("yaw", -180, 180),
+        ("pitch", -90, 90),
+        ("lighting", 0, 100),
+        ("controlNet.strength", 0.0, 1.0),
+    ),
+    "enums": (
+        ("colorPalette", ("warm", "cool", "neutral", "cinematic", "vibrant")),
+        ("controlNet.type", ("none", "sketch", "depth", "canny")),
+        ("colorSpace", ("sRGB", "Adobe RGB", "Display P3")),
+    ),
+}
+
+_MISSING = object()
+
+# (path, kind, argument, error message)
+Check = Tuple[Tuple[str, ...], str, Any, str]
+
+
+def compile_rules(rules: Dict[str, Any]) -> Tuple[Tuple[str, ...], Tuple[Check, ...]]:
+    """
+    Flatten a rule table into (required fields, ordered checks).
+
+    Messages are formatted here, once, rather than per request.
+    """
+    checks: List[Check] = []
+    for field, types, label in rules["types"]:
+        checks.append((tuple(field.split(".")), "type", types, f"{field} must be {label}"))
+    for field, low, high in rules["ranges"]:
+        checks.append((tuple(field.split(".")), "range", (low, high), f"{field} must be between {low} and {high}"))
+    for field, allowed in rules["enums"]:
+        checks.append((tuple(field.split(".")), "enum", frozenset(allowed), f"{field} must be one of: {', '.join(allowed)}"))
+    return tuple(rules["required"]), tuple(checks)
+
+
+REQUIRED_FIELDS, CHECKS = compile_rules(RENDER_PARAMETER_RULES)
+
+
+def _lookup(payload: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+    value: Any = payload
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return _MISSING
+        value = value[key]
+    return value
+
+
+def render_param_errors(payload: Any) -> List[str]:
+    """
+    Validate one RenderParameters payload against the compiled rules.
+
+    Checks on a field that is missing entirely are skipped (it is already
+    reported as missing), as are checks on a field that failed its type
+    check. Range checks skip absent optional nested fields such as
+    controlNet.strength; enum checks do not.
+
+    Args:
+        payload: Parsed RenderParameters JSON
+
+    Returns:
+        All error messages in rule order; empty if valid
+    """
+    if not isinstance(payload, dict):
+        return ["payload must be a JSON object"]
+
+    errors = [f"Missing required field: {field}" for field in REQUIRED_FIELDS if field not in payload]
+    mistyped = set()
+    for path, kind, arg, message in CHECKS:
+        if path[0] not in payload or path in mistyped:
+            continue
+        value = _lookup(payload, path)
+        if kind == "type":
+            if not isinstance(value, arg):
+                errors.append(message)
+                mistyped.add(path)
+        elif kind == "range":
+            if value is _MISSING:
+                continue
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                errors.append(f"{'.'.join(path)} must be a number")
+            elif not (arg[0] <= value <= arg[1]):
+                errors.append(message)
+        elif value is _MISSING or not isinstance(value, str) or value not in arg:
+            errors.append(message)
+    return errors
+
+
+def validate_render_params_batch(payloads: Iterable[Any]) -> List[Dict[str, Any]]:
+    """
+    Validate many RenderParameters payloads.
+
+    Returns:
+        One {"index", "valid", "errors"} dict per payload, in order
+    """
+    results = []
+    for index, payload in enumerate(payloads):
+        errors = render_param_errors(payload)
+        results.append({"index": index, "valid": not errors, "errors": errors})
+    return results
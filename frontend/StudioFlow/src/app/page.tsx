@@ -75,6 +75,25 @@ const mockVersions: Version[] = [
   },
 ];
 
+const JOB_POLL_INTERVAL_MS = 1000;
+
+// /render queues the job and answers 202 { job_id, status_url, ... };
+// poll the job until it finishes and return its result.
+async function waitForRender(statusUrl: string) {
+  while (true) {
+    const response = await fetch(`${API_BASE_URL}${statusUrl}`);
+    if (!response.ok) {
+      throw new Error(`Failed to fetch render status: ${response.status}`);
+    }
+    const job = await response.json();
+    if (job.status === "done") return job.result;
+    if (job.status === "failed" || job.status === "cancelled") {
+      throw new Error(job.error || `Render ${job.status}`);
+    }
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+  }
+}
+
 export default function StudioFlow() {
   const [params, setParams] = useState<RenderParameters>(initialParams);
   const [versions, setVersions] = useState<Version[]>(mockVersions);
@@ -85,8 +104,22 @@ export default function StudioFlow() {
   useEffect(() => {
     const loadVersions = async () => {
       try {
-        const data = await getVersions();
-        if (data && data.length > 0) {
+        // /versions returns one page ({ items, next_cursor }); follow the
+        // cursor until the history is exhausted.
+        const data: any[] = [];
+        let page = await getVersions();
+        while (page) {
+          data.push(...(page.items ?? []));
+          if (!page.next_cursor) break;
+          const response = await fetch(
+            `${API_BASE_URL}/versions?cursor=${encodeURIComponent(page.next_cursor)}`
+          );
+          if (!response.ok) {
+            throw new Error(`Failed to load versions: ${response.status}`);
+          }
+          page = await response.json();
+        }
+        if (data.length > 0) {
           const mappedVersions: Version[] = data.map((v: any) => ({
             id: v.id,
             timestamp: new Date(v.timestamp),
@@ -166,7 +199,9 @@ export default function StudioFlow() {
 
       // Then render with the translated JSON
       console.log("Step 2: Rendering image...");
-      const result = await renderImage(translatedJson);
+      const job = await renderImage(translatedJson);
+      console.log("Render job queued:", job.job_id);
+      const result = await waitForRender(job.status_url);
       console.log("Render result:", result);
 
       const imageUrl = `${API_BASE_URL}${result.image_url}`;
@@ -0,0 +1,191 @@
+"""
+Benchmark the NL translator's keyword matching on long, multi-sentence prompts.
+
+Compares three implementations that must agree on every prompt:
+- legacy: the original chained `in` checks per extractor
+- tables: the shipped priority tables (backend.translator.translator)
+- regex: one combined trie regex over every keyword, scanned once with
+  overlapping matches, then resolved by table priority
+
+Usage: python scripts/bench_translator.py [--sentences 12 --prompts 500]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.translator import translator as tr  # noqa: E402
+
+TABLES = {
+    "focalLength": (tr.FOCAL_LENGTH_TABLE, 35),
+    "yaw": (tr.YAW_TABLE, 0),
+    "pitch": (tr.PITCH_TABLE, 0),
+    "lighting": (tr.LIGHTING_TABLE, 50),
+    "colorPalette": (tr.COLOR_PALETTE_TABLE, "neutral"),
+}
+
+
+def legacy_extract(p):
+    m = re.search(r'(\d+)\s*mm', p) or re.search(r'(\d+)mm', p)
+    if m:
+        focal = max(12, min(200, int(m.group(1))))
+    elif "wide" in p or "environment" in p or "landscape" in p:
+        focal = 24
+    elif "portrait" in p or "headshot" in p or "closeup" in p:
+        focal = 85
+    elif "product" in p:
+        focal = 50
+    elif "telephoto" in p or "zoom" in p:
+        focal = 135
+    else:
+        focal = 35
+    if "high angle" in p or "overhead" in p or "bird's eye" in p:
+        pitch = -45
+    elif "top down" in p or "directly above" in p:
+        pitch = -90
+    elif "low angle" in p or "from below" in p or "worm's eye" in p:
+        pitch = 30
+    elif "eye level" in p or "straight on" in p:
+        pitch = 0
+    elif "slight tilt down" in p:
+        pitch = -15
+    elif "slight tilt up" in p:
+        pitch = 15
+    else:
+        pitch = 0
+    if "from left" in p or "left side" in p:
+        yaw = -45
+    elif "from right" in p or "right side" in p:
+        yaw = 45
+    elif "front" in p or "straight ahead" in p:
+        yaw = 0
+    elif "behind" in p or "rear" in p:
+        yaw = 180
+    elif "quarter left" in p or "3/4 left" in p:
+        yaw = -30
+    elif "quarter right" in p or "3/4 right" in p:
+        yaw = 30
+    else:
+        yaw = 0
+    if "warm" in p or "golden" in p or "sunset" in p or "orange" in p:
+        palette = "warm"
+    elif "cool" in p or "blue" in p or "cold" in p or "icy" in p:
+        palette = "cool"
+    elif "cinematic" in p or "moody" in p or "dramatic" in p or "film" in p:
+        palette = "cinematic"
+    elif "vibrant" in p or "bright" in p or "saturated" in p or "colorful" in p:
+        palette = "vibrant"
+    else:
+        palette = "neutral"
+    if "very dark" in p or "extremely dark" in p:
+        lighting = 5
+    elif "dark" in p or "low key" in p or "moody" in p or "dramatic" in p:
+        lighting = 20
+    elif "dim" in p or "subtle" in p:
+        lighting = 35
+    elif "bright" in p or "high key" in p or "well lit" in p:
+        lighting = 85
+    elif "very bright" in p or "extremely bright" in p:
+        lighting = 95
+    else:
+        lighting = 50
+    return {"focalLength": focal, "yaw": yaw, "pitch": pitch, "lighting": lighting, "colorPalette": palette}
+
+
+def tables_extract(p):
+    return {
+        "focalLength": tr.extract_focal_length(p),
+        "yaw": tr.extract_yaw(p),
+        "pitch": tr.extract_camera_angle(p),
+        "lighting": tr.extract_lighting_value(p),
+        "colorPalette": tr.extract_color_palette(p),
+    }
+
+
+def trie_pattern(words):
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return re.compile(build(trie))
+
+
+KEYWORDS = {kw for table, _ in TABLES.values() for kw, _ in table}
+COMBINED = trie_pattern(KEYWORDS)
+# Keywords that are prefixes of a longer keyword starting at the same position
+PREFIXES = {kw: {k for k in KEYWORDS if kw.startswith(k)} for kw in KEYWORDS}
+
+
+def regex_extract(p):
+    found, pos = set(), 0
+    while True:
+        m = COMBINED.search(p, pos)
+        if m is None:
+            break
+        found |= PREFIXES[m.group()]
+        pos = m.start() + 1
+    result = {}
+    for field, (table, default) in TABLES.items():
+        result[field] = next((value for kw, value in table if kw in found), default)
+    m = tr.FOCAL_LENGTH_PATTERN.search(p)
+    if m:
+        result["focalLength"] = max(12, min(200, int(m.group(1))))
+    return result
+
+
+def make_prompts(n, sentences, rng):
+    keywords = sorted(KEYWORDS)
+    filler = ("the product sits on a walnut table near a window with soft reflections "
+              "and a linen backdrop while pine branches frame the composition").split()
+    prompts = []
+    for _ in range(n):
+        text = []
+        for _ in range(sentences):
+            words = rng.sample(filler, 12)
+            if rng.random() < 0.3:
+                words.insert(rng.randrange(len(words)), rng.choice(keywords))
+            text.append(" ".join(words).capitalize() + ".")
+        prompts.append(" ".join(text).lower())
+    return prompts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark translator keyword matching")
+    parser.add_argument("--sentences", type=int, default=12)
+    parser.add_argument("--prompts", type=int, default=500)
+    args = parser.parse_args()
+
+    prompts = make_prompts(args.prompts, args.sentences, random.Random(0))
+    impls = {"legacy": legacy_extract, "tables": tables_extract, "regex": regex_extract}
+    for p in prompts:
+        expected = legacy_extract(p)
+        assert all(fn(p) == expected for fn in impls.values()), p
+
+    avg_len = sum(map(len, prompts)) / len(prompts)
+    print(f"{len(prompts)} prompts, {args.sentences} sentences, {avg_len:.0f} chars avg")
+    for name, fn in impls.items():
+        start = time.perf_counter()
+        for _ in range(5):
+            for p in prompts:
+                fn(p)
+        per_prompt = (time.perf_counter() - start) / (5 * len(prompts))
+        print(f"{name:<7} {per_prompt * 1e6:8.1f} us/prompt")
+
+
+if __name__ == "__main__":
+    main()
@@ -28,12 +28,19 @@ cat > /tmp/test_render.json << 'EOF'
 }
 EOF
 
-# Call API
+# Call API (returns a job ID immediately)
 echo "Sending render request..."
-curl -X POST http://localhost:8000/render \
+JOB_URL=$(curl -s -X POST http://localhost:8000/render \
   -H "Content-Type: application/json" \
   -d @/tmp/test_render.json \
-  | python3 -m json.tool
+  | python3 -c "import json, sys; print(json.load(sys.stdin)['status_url'])")
+
+# Poll the job until the render finishes
+echo "Waiting for render job ${JOB_URL}..."
+until curl -s "http://localhost:8000${JOB_URL}" | grep -q -E '"status": ?"(done|failed|cancelled)"'; do
+  sleep 2
+done
+curl -s "http://localhost:8000${JOB_URL}" | python3 -m json.tool
 
 echo ""
 echo "✅ Render complete! Check backend/samples/output/"
@@ -0,0 +1,70 @@
+"""
+Tests for parallel batch HDR export
+"""
+
+import pytest
+from PIL import Image
+from backend.utils.batch_export import batch_export, export_file
+
+
+@pytest.fixture
+def sources(tmp_path):
+    paths = []
+    for i, color in enumerate(["#ff0000", "#00ff00", "#0000ff"]):
+        path = tmp_path / f"render_{i}.png"
+        Image.new("RGB", (64, 48), color=color).save(path)
+        paths.append(str(path))
+    return paths
+
+
+def test_export_file_shares_one_decode(tmp_path, sources):
+    """Test every requested output is written and timed from one decode."""
+    report = export_file(sources[0], str(tmp_path), ["tiff", "preview"])
+
+    assert report["errors"] == {}
+    assert set(report["timings"]) == {"decode", "tiff", "preview"}
+    assert Image.open(report["outputs"]["tiff"]).size == (64, 48)
+    assert Image.open(report["outputs"]["preview"]).mode == "RGB"
+
+
+def test_export_file_reports_decode_failure(tmp_path):
+    """Test an unreadable source is reported, not raised."""
+    report = export_file(str(tmp_path / "missing.jpg"), str(tmp_path), ["tiff"])
+
+    assert "decode" in report["errors"]
+    assert report["outputs"] == {}
+
+
+def test_batch_export_keeps_source_order(tmp_path, sources):
+    """Test the process pool reports every file in source order."""
+    sources = sources + [str(tmp_path / "missing.jpg")]
+    result = batch_export(sources, str(tmp_path / "out"), ["tiff"], max_workers=2)
+
+    assert [f["source"] for f in result["files"]] == sources
+    assert result["succeeded"] == 3
+    assert result["failed"] == 1
+
+
+def test_batch_export_rejects_unknown_format(tmp_path, sources):
+    """Test an unknown output format is rejected up front."""
+    with pytest.raises(ValueError):
+        batch_export(sources, str(tmp_path), ["webp"])
+
+
+def test_batch_export_rejects_16bit_jpeg_tiff(tmp_path, sources):
+    """Test jpeg-compressed 16-bit TIFF is rejected before any file is exported."""
+    with pytest.raises(ValueError):
+        batch_export(sources, str(tmp_path / "out"), ["tiff"], {"tiff_compression": "jpeg"})
+    assert not (tmp_path / "out").exists()
+
+
+def test_batch_export_names_outputs(tmp_path, sources):
+    """Test versions sharing one source file get separate outputs under their own names."""
+    result = batch_export([sources[0], sources[0]], str(tmp_path / "out"), ["tiff"], names=["v1", "v2"], max_workers=2)
+
+    outputs = [f["outputs"]["tiff"] for f in result["files"]]
+    assert [f["name"] for f in result["files"]] == ["v1", "v2"]
+    assert outputs == [str(tmp_path / "out" / "v1.tiff"), str(tmp_path / "out" / "v2.tiff")]
+
+    with pytest.raises(ValueError):
+        batch_export([sources[0], sources[0]], str(tmp_path / "out"), ["tiff"])
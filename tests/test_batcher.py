@@ -0,0 +1,154 @@
+"""
+Tests for render micro-batching
+"""
+
+import threading
+
+import numpy as np
+import pytest
+from PIL import Image
+from backend.model_clients.batcher import MicroBatcher
+from backend.model_clients.fibo_client import FIBOClient
+from backend.model_clients.pipeline_pool import PipelinePool
+from backend.orchestrator.job_queue import JobCancelledError
+
+
+def run_concurrently(fn, inputs):
+    results = [None] * len(inputs)
+
+    def call(i):
+        results[i] = fn(inputs[i])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(inputs))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    return results
+
+
+def test_compatible_requests_share_one_call():
+    """Test concurrent requests with the same key run as one batch."""
+    calls = []
+
+    def run_batch(batch):
+        calls.append(len(batch))
+        return [args["prompt"].upper() for args in batch]
+
+    batcher = MicroBatcher(max_batch_size=4, max_wait_ms=500)
+    results = run_concurrently(
+        lambda p: batcher.submit("same", {"prompt": p}, run_batch),
+        ["a", "b", "c", "d"],
+    )
+
+    assert results == ["A", "B", "C", "D"]
+    assert calls == [4]
+    assert batcher.stats()["avg_batch_size"] == 4
+
+
+def test_incompatible_requests_not_batched():
+    """Test requests with different keys run separately."""
+    calls = []
+
+    def run_batch(batch):
+        calls.append(len(batch))
+        return [None] * len(batch)
+
+    batcher = MicroBatcher(max_batch_size=4, max_wait_ms=20)
+    run_concurrently(lambda k: batcher.submit(k, {}, run_batch), ["512", "1024"])
+
+    assert sorted(calls) == [1, 1]
+
+
+def test_batch_error_reaches_every_caller():
+    """Test a failed batch raises in each waiting caller."""
+
+    def run_batch(batch):
+        raise RuntimeError("CUDA OOM")
+
+    batcher = MicroBatcher(max_batch_size=2, max_wait_ms=500)
+
+    def submit(_):
+        with pytest.raises(RuntimeError):
+            batcher.submit("k", {}, run_batch)
+        return True
+
+    assert run_concurrently(submit, [0, 1]) == [True, True]
+
+
+def test_client_passes_prompt_list_to_pipeline(tmp_path):
+    """Test FIBOClient.generate_batch makes one pipeline call per batch."""
+    calls = []
+
+    class FakePipeline:
+        def __call__(self, **kwargs):
+            calls.append(kwargs)
+
+            class Out:
+                images = [Image.new("RGB", (8, 8)) for _ in kwargs["prompt"]]
+
+            return Out()
+
+    pool = PipelinePool(capacity=1, loader=lambda *a: FakePipeline())
+    client = FIBOClient(pool=pool, batcher=MicroBatcher(max_batch_size=1))
+    client.output_dir = tmp_path
+
+    paths = client.generate_batch(
+        [{"prompt": "mug", "seed": 1}, {"prompt": "lamp", "seed": 2}]
+    )
+
+    assert len(calls) == 1
+    assert calls[0]["prompt"] == ["mug", "lamp"]
+    assert len(paths) == 2
+
+
+class SteppingPipeline:
+    """Runs a few denoising steps, calling the step-end hook with per-batch latents."""
+
+    def __init__(self, steps=3):
+        self.steps = steps
+        self.calls = 0
+
+    def __call__(self, **kwargs):
+        self.calls += 1
+        latents = np.zeros((len(kwargs["prompt"]), 4, 8, 8), dtype=np.float32)
+        hook = kwargs.get("callback_on_step_end")
+        for step in range(self.steps):
+            if hook is not None:
+                hook(self, step, step, {"latents": latents})
+
+        class Out:
+            images = [Image.new("RGB", (8, 8)) for _ in kwargs["prompt"]]
+
+        return Out()
+
+
+def test_cancelled_render_leaves_its_batch(tmp_path):
+    """Test a render whose step callback raises drops out while its batch-mate finishes."""
+    pipeline = SteppingPipeline()
+    client = FIBOClient(
+        pool=PipelinePool(capacity=1, loader=lambda *a: pipeline),
+        batcher=MicroBatcher(max_batch_size=2, max_wait_ms=2000),
+    )
+    client.output_dir = tmp_path
+    seen = []
+
+    def keep(step, total, latents):
+        seen.append(latents.shape[0])
+
+    def cancel(step, total, latents):
+        raise JobCancelledError()
+
+    def render(callback):
+        try:
+            return client.generate({"prompt": "mug", "seed": 1}, step_callback=callback)
+        except JobCancelledError as e:
+            return e
+
+    kept, cancelled = run_concurrently(render, [keep, cancel])
+
+    assert pipeline.calls == 1
+    assert isinstance(cancelled, JobCancelledError)
+    assert Image.open(kept).size == (8, 8)
+    assert seen == [1, 1, 1]  # each render sees only its own latents
+    assert len(list(tmp_path.glob("*.jpg"))) == 1
@@ -0,0 +1,76 @@
+"""
+Tests for content-addressed local render storage
+"""
+
+import os
+import pytest
+from backend.storage import blob_store
+from backend.storage.blob_store import BlobStore, file_sha256
+
+
+@pytest.fixture
+def blobs(tmp_path):
+    return BlobStore(tmp_path / "blobs")
+
+
+def write(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_fresh_render_is_moved(blobs, tmp_path):
+    """Test a finished render is renamed into its hash-named blob, not copied."""
+    render = write(tmp_path / "render_1.jpg", b"pixels")
+    inode = os.stat(render).st_ino
+
+    blob = blobs.put(render, move=True)
+
+    assert os.path.basename(blob) == f"{file_sha256(blob)}.jpg"
+    assert os.stat(blob).st_ino == inode
+    assert not os.path.exists(render)
+
+
+def test_duplicates_stored_once(blobs, tmp_path):
+    """Test identical renders share one blob and the duplicate file is dropped."""
+    first = blobs.put(write(tmp_path / "a.jpg", b"same"), move=True)
+    second = blobs.put(write(tmp_path / "b.jpg", b"same"), move=True)
+    other = blobs.put(write(tmp_path / "c.jpg", b"different"), move=True)
+
+    assert first == second != other
+    assert not os.path.exists(tmp_path / "b.jpg")
+    assert blobs.stats()["deduplicated"] == 1
+    assert blobs.put(first, move=True) == first  # already a blob
+
+
+def test_shared_source_linked_not_copied(blobs, tmp_path):
+    """Test a file the caller keeps (e.g. the mock sample) is reflinked or hardlinked."""
+    sample = write(tmp_path / "example_render.jpg", b"sample" * 1000)
+
+    blob = blobs.put(sample)
+    assert blobs.put(sample) == blob
+
+    assert os.path.exists(sample)
+    stats = blobs.stats()
+    assert stats["reflink"] + stats["hardlink"] == 1
+    assert stats["bytes_written"] == 0
+
+
+def test_digest_memo_bounded(tmp_path):
+    """Test remembered digests are capped and dropped once a put consumes the file."""
+    blobs = BlobStore(tmp_path / "blobs", digest_memo_size=2)
+    for i in range(3):
+        blobs.put(write(tmp_path / f"shared_{i}.jpg", bytes([i])))
+    assert len(blobs._digests) == 2
+
+    blobs.put(str(tmp_path / "shared_2.jpg"), move=True)
+    assert len(blobs._digests) == 1
+
+
+def test_memoized_digest_reused_on_move(blobs, tmp_path, monkeypatch):
+    """Test a file linked in earlier is not hashed again when it is moved in."""
+    render = write(tmp_path / "render_1.jpg", b"pixels")
+    blobs.put(render)
+
+    monkeypatch.setattr(blob_store, "file_sha256", lambda path: pytest.fail("hashed twice"))
+    blobs.put(render, move=True)
+    assert not os.path.exists(render)
@@ -0,0 +1,161 @@
+"""
+Tests for the ComfyUI client against a local fake ComfyUI server
+"""
+
+import asyncio
+import json
+import queue
+import uuid
+import pytest
+from fastapi import FastAPI, File, UploadFile, WebSocket
+from fastapi.responses import Response
+from fastapi.testclient import TestClient
+from backend.model_clients.comfyui_client import ComfyUIClient, RecipeTemplate, load_recipe
+
+PNG = b"\x89PNG\r\n\x1a\nfake"
+
+
+class FakeComfyUI:
+    """Minimal ComfyUI API: /prompt, /ws, /history, /view, /upload/image."""
+
+    def __init__(self, fail_node=None):
+        self.app = FastAPI()
+        self.prompts = {}
+        self.uploads = []
+        self.events = {}
+        self.fail_node = fail_node
+        app = self.app
+
+        @app.post("/prompt")
+        def prompt(body: dict):
+            prompt_id = uuid.uuid4().hex
+            self.prompts[prompt_id] = body["prompt"]
+            events = self.events.setdefault(body["client_id"], queue.Queue())
+            events.put({"type": "status", "data": {"status": {"exec_info": {"queue_remaining": 1}}}})
+            events.put({"type": "execution_start", "data": {"prompt_id": prompt_id}})
+            for node_id in body["prompt"]:
+                if node_id == self.fail_node:
+                    events.put({"type": "execution_error", "data": {
+                        "prompt_id": prompt_id, "node_id": node_id, "exception_message": "out of memory",
+                    }})
+                    events.put(None)
+                    return {"prompt_id": prompt_id, "number": 0, "node_errors": {}}
+                events.put({"type": "executing", "data": {"node": node_id, "prompt_id": prompt_id}})
+            events.put({"type": "executing", "data": {"node": None, "prompt_id": prompt_id}})
+            events.put(None)  # one prompt per connection: close after it
+            return {"prompt_id": prompt_id, "number": 0, "node_errors": {}}
+
+        @app.websocket("/ws")
+        async def ws(websocket: WebSocket, clientId: str):
+            await websocket.accept()
+            events = self.events.setdefault(clientId, queue.Queue())
+            await websocket.send_bytes(b"\x00\x00\x00\x01preview")
+            while (event := await asyncio.to_thread(events.get, True, 5)) is not None:
+                await websocket.send_text(json.dumps(event))
+            await websocket.close()
+
+        @app.get("/history/{prompt_id}")
+        def history(prompt_id: str):
+            images = [{"filename": "studioflow_00001_.png", "subfolder": "", "type": "output"}]
+            return {prompt_id: {"outputs": {"12": {"images": images}}}}
+
+        @app.get("/view")
+        def view(filename: str, type: str, subfolder: str = ""):
+            return Response(PNG, media_type="image/png")
+
+        @app.post("/upload/image")
+        async def upload(image: UploadFile = File(...)):
+            self.uploads.append(await image.read())
+            return {"name": image.filename, "subfolder": "", "type": "input"}
+
+
+class WebSocketSession:
+    """websockets-style recv()/close() over a TestClient websocket."""
+
+    def __init__(self, session):
+        self.session = session
+
+    def __enter__(self):
+        self.session.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self.session.__exit__(*exc)
+
+    def recv(self, timeout=None):
+        message = self.session.receive()
+        return message.get("text") or message.get("bytes")
+
+
+@pytest.fixture
+def context(tmp_path):
+    sketch = tmp_path / "upload_sketch.png"
+    sketch.write_bytes(PNG)
+    return {
+        "scene": {"description": "ceramic mug", "seed": 42},
+        "camera": {"lens": {"focal_length_mm": 50}},
+        "controlnet": {"image_ref": str(sketch), "strength": 0.6},
+    }
+
+
+def make_client(server, tmp_path):
+    http = TestClient(server.app)
+    return ComfyUIClient(
+        base_url="http://testserver",
+        http=http,
+        ws_connect=lambda url, timeout: WebSocketSession(http.websocket_connect(url.split("testserver", 1)[1])),
+        output_dir=tmp_path / "out",
+        timeout=10,
+    )
+
+
+def test_recipe_compiled_slots():
+    """Test placeholders keep their value type and expressions are evaluated."""
+    template = load_recipe("product_with_sketch")
+    graph = template.instantiate({
+        "scene": {"description": "mug", "seed": 7},
+        "camera": {"lens": {"focal_length_mm": 50}},
+        "controlnet": {"image_ref": "mug.png", "strength": 0.5},
+    })
+
+    assert graph["10"]["inputs"]["seed"] == 7
+    assert graph["10"]["inputs"]["cfg"] == 5.0
+    assert graph["4"]["inputs"]["strength"] == 0.5
+    assert graph["7"]["inputs"]["text"] == "mug"
+    # The shared template is untouched
+    assert template.graph["10"]["inputs"]["seed"] == "{scene.seed}"
+    assert load_recipe("product_with_sketch") is template
+
+
+def test_embedded_placeholder_and_missing_field():
+    """Test text placeholders are formatted in and missing fields are reported."""
+    template = RecipeTemplate({"name": "t", "nodes": {"text": {
+        "id": 1, "class_type": "CLIPTextEncode", "inputs": {"text": "{scene.description}, 85mm"},
+    }}})
+    assert template.instantiate({"scene": {"description": "lamp"}})["1"]["inputs"]["text"] == "lamp, 85mm"
+    with pytest.raises(ValueError, match="scene.description"):
+        template.instantiate({"scene": {}})
+
+
+def test_render_round_trip(context, tmp_path):
+    """Test a render uploads the control image, waits on the websocket and fetches the output."""
+    server = FakeComfyUI()
+    client = make_client(server, tmp_path)
+    result = client.render("product_with_sketch", context)
+
+    with open(result["path"], "rb") as f:
+        assert f.read() == PNG
+    graph = server.prompts[result["prompt_id"]]
+    assert graph["3"]["inputs"]["image"] == "upload_sketch.png"
+    assert set(result["timings"]) == {"upload", "queue_wait", "execution", "fetch", "total"}
+
+    # The same control image is only uploaded once
+    client.render("product_with_sketch", context)
+    assert len(server.uploads) == 1
+
+
+def test_execution_error(context, tmp_path):
+    """Test a ComfyUI execution error is raised with the failing node."""
+    client = make_client(FakeComfyUI(fail_node="10"), tmp_path)
+    with pytest.raises(RuntimeError, match="node 10: out of memory"):
+        client.render("product_with_sketch", context)
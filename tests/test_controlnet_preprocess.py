@@ -0,0 +1,106 @@
+"""
+Tests for cached ControlNet preprocessing
+"""
+
+import threading
+
+import cv2
+import numpy as np
+import pytest
+from backend.orchestrator import controlnet_preprocess
+from backend.orchestrator.controlnet_preprocess import (
+    ControlMapCache,
+    canny_map,
+    resolve_params,
+    sketch_map,
+)
+
+
+@pytest.fixture
+def upload(tmp_path):
+    image = np.full((128, 160, 3), 255, dtype=np.uint8)
+    cv2.rectangle(image, (40, 30), (120, 100), (30, 60, 90), -1)
+    path = tmp_path / "upload_0123456789abcdef01234567.png"
+    cv2.imwrite(str(path), image)
+    return path
+
+
+def test_edge_maps(upload):
+    """Test canny and sketch produce single-channel maps outlining the shape."""
+    image = cv2.imread(str(upload))
+    for control in (canny_map(image), sketch_map(image)):
+        assert control.shape == (128, 160)
+        assert control.dtype == np.uint8
+        assert control[30:101, 40].any()  # rectangle's left edge
+        assert not control[:20, :].any()  # flat background
+
+
+def test_map_computed_once(upload, tmp_path, monkeypatch):
+    """Test a repeat request for the same upload and params is served from disk."""
+    cache = ControlMapCache(tmp_path / "maps")
+    first = cache.get(str(upload), "canny")
+
+    monkeypatch.setattr(controlnet_preprocess.cv2, "imread", lambda *a: pytest.fail("recomputed"))
+    assert cache.get(str(upload), "canny", {"strength": 0.8}) == first
+    assert cache.stats()["hits"] == 1
+
+
+def test_params_change_key(upload, tmp_path):
+    """Test distinct parameters and types get distinct maps."""
+    cache = ControlMapCache(tmp_path / "maps")
+    paths = {
+        cache.get(str(upload), "canny"),
+        cache.get(str(upload), "canny", {"low_threshold": 10}),
+        cache.get(str(upload), "depth"),
+    }
+    assert len(paths) == 3
+    assert cache.stats()["misses"] == 3
+
+
+def test_key_lock_kept_for_waiters(upload, tmp_path, monkeypatch):
+    """Test a waiter keeps the key lock registered after the first caller leaves."""
+    cache = ControlMapCache(tmp_path / "maps")
+    release = [threading.Event(), threading.Event()]
+    calls = []
+
+    def compute(image_path, kind, params, path):
+        calls.append(kind)
+        release[len(calls) - 1].wait(5)
+        if len(calls) == 1:
+            raise OSError("disk full")
+        path.write_bytes(b"png")
+
+    monkeypatch.setattr(cache, "_compute", compute)
+    errors = []
+
+    def request():
+        try:
+            cache.get(str(upload), "canny")
+        except OSError as e:
+            errors.append(e)
+
+    first = threading.Thread(target=request)
+    first.start()
+    while not calls:
+        pass
+    second = threading.Thread(target=request)
+    second.start()
+    while next(iter(cache._key_locks.values())).users < 2:
+        pass
+
+    release[0].set()  # first caller fails; the waiter takes over
+    first.join(5)
+    while len(calls) < 2:
+        pass
+    assert len(cache._key_locks) == 1
+
+    release[1].set()
+    second.join(5)
+    assert len(errors) == 1
+    assert cache._key_locks == {}
+
+
+def test_unknown_type():
+    """Test unregistered ControlNet types are rejected."""
+    with pytest.raises(ValueError):
+        resolve_params("normal")
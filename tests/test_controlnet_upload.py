@@ -0,0 +1,67 @@
+"""
+Tests for hash-deduplicated ControlNet upload ingestion
+"""
+
+import io
+import os
+import pytest
+from PIL import Image
+from backend.orchestrator import controlnet_adapter
+from backend.orchestrator.controlnet_adapter import ingest_upload, normalize_image
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(controlnet_adapter, "UPLOAD_DIR", str(tmp_path))
+    return tmp_path
+
+
+def jpeg_bytes(size):
+    buf = io.BytesIO()
+    Image.new("RGB", size, (200, 40, 40)).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+def test_upload_normalized(upload_dir):
+    """Test a large upload is stored as an RGB image fitting the ControlNet box."""
+    saved = ingest_upload(io.BytesIO(jpeg_bytes((2048, 1024))), "sketch.JPG")
+
+    files = os.listdir(upload_dir)
+    assert files == [f"upload_{saved['sha256'][:24]}.jpg"]
+    with Image.open(upload_dir / files[0]) as im:
+        assert im.size == (512, 256)
+        assert im.mode == "RGB"
+    assert not saved["deduplicated"]
+
+
+def test_repeat_upload_deduplicated(upload_dir, monkeypatch):
+    """Test identical content is neither decoded nor stored twice."""
+    data = jpeg_bytes((640, 480))
+    first = ingest_upload(io.BytesIO(data), "a.jpg")
+
+    def fail(*args):
+        raise AssertionError("duplicate upload was re-processed")
+
+    monkeypatch.setattr(controlnet_adapter, "normalize_image", fail)
+    second = ingest_upload(io.BytesIO(data), "a.jpg")
+
+    assert second == {**first, "deduplicated": True}
+    assert len(os.listdir(upload_dir)) == 1
+
+
+def test_unreadable_upload_kept(upload_dir):
+    """Test a file PIL cannot open is stored as-is, without temp leftovers."""
+    saved = ingest_upload(io.BytesIO(b"not an image"), "notes.png")
+
+    assert saved["path"].endswith(".png")
+    assert [p.read_bytes() for p in upload_dir.iterdir()] == [b"not an image"]
+
+
+def test_jpeg_draft_decode(tmp_path):
+    """Test normalize_image works from a path and preserves aspect ratio."""
+    src = tmp_path / "big.jpg"
+    src.write_bytes(jpeg_bytes((4000, 3000)))
+    normalize_image(src, tmp_path / "small.png")
+
+    with Image.open(tmp_path / "small.png") as im:
+        assert im.size == (512, 384)
@@ -0,0 +1,52 @@
+"""
+Tests for the prompt embedding cache
+"""
+
+import numpy as np
+import pytest
+from backend.model_clients.embedding_cache import PromptEmbeddingCache
+
+
+def embeddings(n_bytes):
+    return (np.zeros(n_bytes, dtype=np.uint8), None, np.zeros(0, dtype=np.uint8), None)
+
+
+def test_repeated_prompt_skips_encoder():
+    """Test the encoder runs once per distinct prompt."""
+    calls = []
+    cache = PromptEmbeddingCache(max_bytes=1000)
+
+    def compute():
+        calls.append(1)
+        return embeddings(10)
+
+    first = cache.get_or_compute("mug, professional photography", compute)
+    second = cache.get_or_compute("mug, professional photography", compute)
+
+    assert first is second
+    assert len(calls) == 1
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_memory_bound_evicts_lru():
+    """Test total tensor bytes stay under max_bytes."""
+    cache = PromptEmbeddingCache(max_bytes=250)
+
+    cache.get_or_compute("a", lambda: embeddings(100))
+    cache.get_or_compute("b", lambda: embeddings(100))
+    cache.get_or_compute("a", lambda: embeddings(100))
+    cache.get_or_compute("c", lambda: embeddings(100))  # evicts b
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 250
+    assert stats["evictions"] == 1
+    cache.get_or_compute("a", lambda: pytest.fail("a should be cached"))
+
+
+def test_oversized_entry_not_cached():
+    """Test embeddings larger than the whole budget are returned but not kept."""
+    cache = PromptEmbeddingCache(max_bytes=50)
+
+    cache.get_or_compute("huge", lambda: embeddings(100))
+
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,65 @@
+"""
+Tests for the EXR/TIFF exporter
+"""
+
+import numpy as np
+import pytest
+from PIL import Image
+from backend.utils.export_exr import TIFF_COMPRESSION, export_to_exr, export_to_tiff
+
+
+@pytest.fixture
+def source_image(tmp_path):
+    """A synthetic 8-bit RGB gradient saved as PNG (lossless)."""
+    rows = np.arange(70, dtype=np.uint8)[:, None, None]
+    cols = np.arange(90, dtype=np.uint8)[None, :, None]
+    pixels = np.concatenate([np.broadcast_to(rows * 3, (70, 90, 1)),
+                             np.broadcast_to(cols * 2, (70, 90, 1)),
+                             np.full((70, 90, 1), 200, dtype=np.uint8)], axis=2)
+    path = tmp_path / "source.png"
+    Image.fromarray(np.ascontiguousarray(pixels)).save(path)
+    return path, pixels
+
+
+@pytest.mark.parametrize("compression", ["none", "deflate"])
+def test_tiff_strips_round_trip(tmp_path, source_image, compression):
+    """Test a strip-written 8-bit TIFF decodes back to the source pixels."""
+    path, pixels = source_image
+    out = export_to_tiff(str(path), str(tmp_path / "out.tiff"), bit_depth=8,
+                         compression=compression, strip_rows=16)
+
+    tiff = Image.open(out)
+    assert len(tiff.tag_v2[273]) == 5  # 70 rows in 16-row strips
+    assert tiff.tag_v2[259] == TIFF_COMPRESSION[compression]
+    assert np.array_equal(np.asarray(tiff), pixels)
+
+
+def test_tiff_16bit_keeps_color(tmp_path, source_image):
+    """Test 16-bit export is RGB at 16 bits per channel."""
+    path, pixels = source_image
+    out = export_to_tiff(str(path), str(tmp_path / "out.tiff"), bit_depth=16, strip_rows=32)
+
+    tiff = Image.open(out)
+    assert tiff.tag_v2[258] == (16, 16, 16)
+    assert tiff.tag_v2[277] == 3
+    assert np.array_equal(np.asarray(tiff.convert("RGB")), pixels)
+
+
+def test_tiff_jpeg_is_8bit_only(tmp_path, source_image):
+    """Test jpeg compression at 16 bits is rejected instead of silently writing 8-bit."""
+    path, _ = source_image
+    with pytest.raises(ValueError):
+        export_to_tiff(str(path), str(tmp_path / "out.tiff"), bit_depth=16, compression="jpeg")
+    assert not (tmp_path / "out.tiff").exists()
+
+
+def test_exr_scanlines_round_trip(tmp_path, source_image):
+    """Test half-float EXR channels match the normalized source."""
+    OpenEXR = pytest.importorskip("OpenEXR")
+    Imath = pytest.importorskip("Imath")
+    path, pixels = source_image
+    out = export_to_exr(str(path), str(tmp_path / "out.exr"), bit_depth=16, strip_rows=16)
+
+    exr = OpenEXR.InputFile(out)
+    red = np.frombuffer(exr.channel("R", Imath.PixelType(Imath.PixelType.HALF)), dtype=np.float16).reshape(70, 90)
+    assert np.allclose(red, pixels[:, :, 0] / 255.0, atol=1e-3)
@@ -0,0 +1,157 @@
+"""
+Tests for the render job queue
+"""
+
+import threading
+
+import pytest
+from backend.orchestrator.job_queue import (
+    RenderJobQueue,
+    QueueFullError,
+    JobCancelledError,
+)
+
+
+def test_job_runs_and_reports_result():
+    """Test a submitted job finishes with the handler's result."""
+    jobs = RenderJobQueue(lambda job: {"echo": job.payload["n"]}, max_workers=1)
+
+    job = jobs.submit({"n": 7})
+    assert job.done.wait(5)
+
+    status = jobs.get(job.id).to_dict()
+    assert status["status"] == "done"
+    assert status["result"] == {"echo": 7}
+    jobs.shutdown()
+
+
+def test_failed_job_records_error():
+    """Test handler exceptions mark the job failed."""
+
+    def explode(job):
+        raise RuntimeError("out of VRAM")
+
+    jobs = RenderJobQueue(explode, max_workers=1)
+    job = jobs.submit({})
+    assert job.done.wait(5)
+
+    assert job.status == "failed"
+    assert "out of VRAM" in job.error
+    jobs.shutdown()
+
+
+def test_queue_full_rejects():
+    """Test admission control once max_queue jobs are waiting."""
+    release = threading.Event()
+    started = threading.Event()
+
+    def block(job):
+        started.set()
+        release.wait(5)
+        return {}
+
+    jobs = RenderJobQueue(block, max_workers=1, max_queue=1)
+    jobs.submit({})
+    assert started.wait(5)
+    jobs.submit({})  # fills the single queue slot
+
+    with pytest.raises(QueueFullError):
+        jobs.submit({})
+
+    release.set()
+    jobs.shutdown()
+
+
+def test_cancel_queued_and_running():
+    """Test queued jobs cancel immediately and running jobs at a checkpoint."""
+    release = threading.Event()
+    started = threading.Event()
+
+    def cooperative(job):
+        started.set()
+        release.wait(5)
+        if job.cancel_requested.is_set():
+            raise JobCancelledError()
+        return {}
+
+    jobs = RenderJobQueue(cooperative, max_workers=1, max_queue=4)
+    running = jobs.submit({})
+    assert started.wait(5)
+    waiting = jobs.submit({})
+
+    assert jobs.cancel(waiting.id).status == "cancelled"
+    jobs.cancel(running.id)
+    release.set()
+    assert running.done.wait(5)
+    assert running.status == "cancelled"
+    jobs.shutdown()
+
+
+def test_events_stream_previews_then_final_status():
+    """Test subscribers see the latest preview and the terminal status."""
+
+    def handler(job):
+        job.publish("preview", {"step": 5})
+        job.publish("preview", {"step": 10})
+        return {"image_url": "/samples/output/r.jpg"}
+
+    jobs = RenderJobQueue(handler, max_workers=1)
+    job = jobs.submit({})
+    assert job.done.wait(5)
+
+    events = job.events_after(0, timeout=0)
+    previews = [e for e in events if e["event"] == "preview"]
+    assert [p["data"]["step"] for p in previews] == [10]
+    assert events[-1]["event"] == "status"
+    assert events[-1]["data"]["status"] == "done"
+    jobs.shutdown()
+
+
+def test_cancel_frees_queue_slot():
+    """Test a cancelled queued job no longer counts against max_queue."""
+    release = threading.Event()
+    started = threading.Event()
+
+    def block(job):
+        started.set()
+        release.wait(5)
+        return {}
+
+    jobs = RenderJobQueue(block, max_workers=1, max_queue=1)
+    jobs.submit({})
+    assert started.wait(5)
+    waiting = jobs.submit({})
+    jobs.cancel(waiting.id)
+
+    replacement = jobs.submit({})
+    assert jobs.stats()["queued"] == 1
+    release.set()
+    assert replacement.done.wait(5)
+    assert replacement.status == "done"
+    assert waiting.started_at is None
+    jobs.shutdown()
+
+
+def test_shutdown_with_full_queue_does_not_block():
+    """Test shutdown(wait=False) returns while the queue is full, and queued jobs still drain."""
+    release = threading.Event()
+    started = threading.Event()
+
+    def block(job):
+        started.set()
+        release.wait(5)
+        return {}
+
+    jobs = RenderJobQueue(block, max_workers=1, max_queue=1)
+    jobs.submit({})
+    assert started.wait(5)
+    queued = jobs.submit({})
+
+    stopper = threading.Thread(target=jobs.shutdown, kwargs={"wait": False})
+    stopper.start()
+    stopper.join(2)
+    assert not stopper.is_alive()
+
+    release.set()
+    assert queued.done.wait(5)
+    assert queued.status == "done"
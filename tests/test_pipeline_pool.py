@@ -0,0 +1,112 @@
+"""
+Tests for the resident pipeline pool
+"""
+
+import pytest
+from backend.model_clients.pipeline_pool import PipelinePool
+
+
+class FakeLoader:
+    """Records every load and returns a distinct object per model."""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def __call__(self, model_id, dtype, device, hf_token=None):
+        self.calls.append((model_id, dtype, device))
+        if self.fail:
+            raise RuntimeError("no weights")
+        return object()
+
+
+def test_pipeline_loaded_once():
+    """Test repeated requests reuse the resident pipeline."""
+    loader = FakeLoader()
+    pool = PipelinePool(capacity=2, loader=loader)
+
+    first = pool.get("model-a", device="cpu")
+    second = pool.get("model-a", device="cpu")
+
+    assert first is second
+    assert len(loader.calls) == 1
+    assert pool.stats()["loads"] == 1
+    assert pool.stats()["hits"] == 1
+
+
+def test_lru_eviction():
+    """Test least recently used model is evicted at capacity."""
+    loader = FakeLoader()
+    pool = PipelinePool(capacity=2, loader=loader)
+
+    pool.get("model-a", device="cpu")
+    pool.get("model-b", device="cpu")
+    pool.get("model-a", device="cpu")  # a is now most recent
+    pool.get("model-c", device="cpu")  # evicts b
+
+    resident = [r["model_id"] for r in pool.stats()["resident"]]
+    assert resident == ["model-a", "model-c"]
+    assert pool.stats()["evictions"] == 1
+
+    pool.get("model-b", device="cpu")
+    assert loader.calls.count(("model-b", "float16", "cpu")) == 2
+
+
+def test_dtype_and_device_are_separate_entries():
+    """Test each model/dtype/device combination gets its own pipeline."""
+    pool = PipelinePool(capacity=4, loader=FakeLoader())
+
+    assert pool.get("model-a", "float16", "cpu") is not pool.get(
+        "model-a", "float32", "cpu"
+    )
+
+
+def test_load_failure_returns_none():
+    """Test failed loads return None and leave nothing resident."""
+    loader = FakeLoader(fail=True)
+    pool = PipelinePool(capacity=1, loader=loader)
+
+    with pool.lease("model-a", device="cpu") as pipeline:
+        assert pipeline is None
+
+    assert pool.stats()["load_failures"] == 1
+    assert pool.stats()["resident"] == []
+
+
+def test_load_failure_backs_off():
+    """Test a failed model is not reloaded until its backoff expires."""
+    now = [0.0]
+    loader = FakeLoader(fail=True)
+    pool = PipelinePool(
+        capacity=1, loader=loader, retry_s=10, retry_max_s=15, clock=lambda: now[0]
+    )
+
+    assert pool.get("model-a", device="cpu") is None
+    assert pool.get("model-a", device="cpu") is None
+    assert len(loader.calls) == 1
+    assert pool.stats()["load_backoffs"] == 1
+
+    now[0] = 10.0
+    assert pool.get("model-a", device="cpu") is None
+    assert len(loader.calls) == 2
+
+    # The second failure doubles the delay, capped at retry_max_s
+    now[0] = 24.0
+    pool.get("model-a", device="cpu")
+    assert len(loader.calls) == 2
+
+    loader.fail = False
+    now[0] = 25.0
+    assert pool.get("model-a", device="cpu") is not None
+    assert pool.stats()["load_failures"] == 2
+    assert pool._failures == {}
+
+
+def test_load_locks_released_after_load():
+    """Test per-model load locks are dropped once their load finishes."""
+    pool = PipelinePool(capacity=1, loader=FakeLoader())
+
+    for model_id in ("model-a", "model-b", "model-c"):
+        pool.get(model_id, device="cpu")
+
+    assert pool._load_locks == {}
@@ -0,0 +1,29 @@
+"""
+Tests for progressive latent previews
+"""
+
+import io
+
+import numpy as np
+from PIL import Image
+from backend.model_clients.previews import latents_to_preview, latents_to_preview_jpeg
+
+
+def test_preview_is_latent_resolution():
+    """Test previews are 1/8 scale RGB images of one batch sample."""
+    latents = np.zeros((2, 4, 128, 96), dtype=np.float32)
+
+    preview = latents_to_preview(latents, index=1)
+
+    assert preview.mode == "RGB"
+    assert preview.size == (96, 128)
+
+
+def test_preview_jpeg_decodes():
+    """Test preview JPEG bytes are a valid image."""
+    latents = np.random.default_rng(0).normal(size=(1, 4, 32, 32)).astype(np.float32)
+
+    image = Image.open(io.BytesIO(latents_to_preview_jpeg(latents)))
+
+    assert image.format == "JPEG"
+    assert image.size == (32, 32)
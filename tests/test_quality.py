@@ -0,0 +1,60 @@
+"""
+Tests for render quality tiers
+"""
+
+import pytest
+from backend.model_clients.quality import tier_render_args, QUALITY_TIERS
+
+
+def test_final_matches_original_settings():
+    """Test the final tier keeps the original 1024x1024/50-step render."""
+    args = tier_render_args("final")
+
+    assert (args["width"], args["height"]) == (1024, 1024)
+    assert args["num_inference_steps"] == 50
+    assert args["scheduler"] == "default"
+    assert "noise_size" not in args
+
+
+def test_draft_is_cheaper_and_shares_final_noise():
+    """Test draft renders fewer pixels/steps and draws noise at final size."""
+    draft = tier_render_args("draft")
+    final = QUALITY_TIERS["final"]
+
+    assert draft["width"] * draft["height"] < final["width"] * final["height"]
+    assert draft["num_inference_steps"] < final["num_inference_steps"]
+    assert draft["noise_size"] == [final["width"], final["height"]]
+
+
+def test_render_settings_override_tier():
+    """Test render_settings.num_inference_steps is honored."""
+    args = tier_render_args(
+        "standard", {"num_inference_steps": 10, "width": 256, "height": 256}
+    )
+
+    assert args["num_inference_steps"] == 10
+    assert args["width"] == 256
+    assert args["noise_size"] == [1024, 1024]
+
+
+def test_unknown_tier_or_scheduler_rejected():
+    """Test invalid quality and scheduler names raise ValueError."""
+    with pytest.raises(ValueError):
+        tier_render_args("ultra")
+    with pytest.raises(ValueError):
+        tier_render_args("draft", {"scheduler": "nope"})
+
+
+@pytest.mark.parametrize("settings", [
+    {"width": 0},
+    {"width": "512"},
+    {"height": 500},
+    {"width": 4096},
+    {"num_inference_steps": -5},
+    {"num_inference_steps": 2.5},
+    {"guidance_scale": "high"},
+])
+def test_invalid_render_settings_rejected(settings):
+    """Test malformed size/steps/guidance overrides raise ValueError instead of crashing later."""
+    with pytest.raises(ValueError):
+        tier_render_args("draft", settings)
@@ -0,0 +1,88 @@
+"""
+Tests for the content-addressed render cache
+"""
+
+import os
+
+import pytest
+from backend.storage.blob_store import BlobStore
+from backend.storage.render_cache import RenderCache, render_cache_key
+
+
+@pytest.fixture
+def blobs(tmp_path):
+    return BlobStore(tmp_path / "blobs")
+
+
+@pytest.fixture
+def cache(tmp_path, blobs):
+    return RenderCache(
+        cache_dir=tmp_path / "cache", output_dir=tmp_path / "out", max_bytes=1000, blobs=blobs
+    )
+
+
+def make_render(tmp_path, name, size, fill=None):
+    path = tmp_path / name
+    path.write_bytes((fill or name[0].encode()) * size)
+    return str(path)
+
+
+def test_key_is_deterministic():
+    """Test same settings hash the same and any change alters the key."""
+    args = {"prompt": "mug, shot with 50mm lens", "seed": 42, "width": 1024}
+
+    assert render_cache_key(args, "sdxl") == render_cache_key(dict(args), "sdxl")
+    assert render_cache_key(args, "sdxl") != render_cache_key(args, "other-model")
+    assert render_cache_key(args, "sdxl") != render_cache_key(
+        {**args, "seed": 43}, "sdxl"
+    )
+
+
+def test_hit_links_existing_image(cache, tmp_path):
+    """Test a hit returns a new output file sharing the cached bytes."""
+    render = make_render(tmp_path, "render.jpg", 100)
+    assert cache.fetch("k1") is None
+
+    cache.store("k1", render)
+    hit = cache.fetch("k1")
+
+    assert hit is not None
+    assert os.path.dirname(hit) == str(tmp_path / "out")
+    assert open(hit, "rb").read() == open(render, "rb").read()
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_eviction_by_size(cache, tmp_path):
+    """Test least recently used entries are evicted past max_bytes."""
+    cache.store("a", make_render(tmp_path, "a.jpg", 400))
+    cache.store("b", make_render(tmp_path, "b.jpg", 400))
+    cache.fetch("a")
+    cache.store("c", make_render(tmp_path, "c.jpg", 400))
+
+    assert cache.fetch("b") is None
+    assert cache.fetch("a") is not None
+    assert cache.stats()["bytes"] <= 1000
+
+
+def test_entries_share_blob_bytes(cache, blobs, tmp_path):
+    """Test entries link the render's blob, and keys sharing a blob count its bytes once."""
+    first = make_render(tmp_path, "first.jpg", 400, fill=b"z")
+    cache.store("a", first)
+    cache.store("b", make_render(tmp_path, "second.jpg", 400, fill=b"z"))
+
+    blob = blobs.put(first)
+    assert os.path.samefile(cache.fetch("a"), blob)
+    assert os.path.samefile(cache.fetch("b"), blob)
+    assert cache.stats()["bytes"] == 400
+
+
+def test_index_survives_restart(cache, blobs, tmp_path):
+    """Test the cache is rebuilt from disk."""
+    cache.store("a", make_render(tmp_path, "a.jpg", 10))
+
+    reopened = RenderCache(
+        cache_dir=tmp_path / "cache", output_dir=tmp_path / "out", max_bytes=1000, blobs=blobs
+    )
+    assert reopened.fetch("a") is not None
+    assert reopened.stats()["bytes"] == 10
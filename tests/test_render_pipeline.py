@@ -0,0 +1,219 @@
+"""
+Tests for the shared render pipeline in RenderOrchestrator
+"""
+
+import threading
+
+import cv2
+import numpy as np
+import pytest
+from backend.orchestrator.controlnet_preprocess import ControlMapCache
+from backend.orchestrator.job_queue import JobCancelledError
+from backend.orchestrator.render_orchestrator import RenderOrchestrator
+from backend.orchestrator.render_router import RenderRouter, UnsupportedRenderError
+from backend.storage.blob_store import BlobStore
+from backend.storage.render_cache import RenderCache
+from backend.storage.version_store import VersionStore
+
+
+class FakeBackend:
+    """Writes a tiny image per job and records the args it was given."""
+
+    def __init__(self, output_dir, cacheable=True, fail=False, namespace="fake:model"):
+        self.name = "fake"
+        self.namespace = namespace
+        self.output_dir = output_dir
+        self._cacheable = cacheable
+        self.fail = fail
+        self.jobs = []
+
+    def render(self, args, step_callback=None):
+        self.jobs.append(args)
+        if self.fail:
+            raise RuntimeError("backend down")
+        path = self.output_dir / f"fake_{len(self.jobs)}.jpg"
+        path.write_bytes(b"jpeg")
+        return str(path)
+
+    def supports(self, args, streaming=False):
+        return True
+
+    def cache_namespace(self):
+        return self.namespace
+
+    def cacheable(self):
+        return self._cacheable
+
+
+@pytest.fixture
+def make_orchestrator(tmp_path):
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+
+    def make(**backend_options):
+        backend = FakeBackend(output_dir, **backend_options)
+        orchestrator = RenderOrchestrator(
+            router=RenderRouter([backend], failure_threshold=1),
+            render_cache=RenderCache(cache_dir=tmp_path / "cache", output_dir=output_dir, blobs=BlobStore(tmp_path / "blobs")),
+            control_maps=ControlMapCache(tmp_path / "maps"),
+            version_store=VersionStore(str(tmp_path / "versions.sqlite")),
+            blobs=BlobStore(tmp_path / "blobs"),
+        )
+        return orchestrator, backend
+
+    return make
+
+
+PARAMS = {"prompt": "ceramic mug", "focalLength": 50, "lighting": 60, "seed": 42, "quality": "draft"}
+
+
+def test_cache_hit_skips_backend(make_orchestrator):
+    """Test a repeated seeded render is served from the render cache."""
+    orchestrator, backend = make_orchestrator()
+    first = orchestrator.run(dict(PARAMS))
+    second = orchestrator.run(dict(PARAMS))
+
+    assert len(backend.jobs) == 1
+    assert "ceramic mug" in backend.jobs[0]["prompt"]
+    assert first["seed"] == second["seed"] == 42
+    assert first["version_id"] != second["version_id"]
+    assert orchestrator.version_store.get(second["version_id"])["image_url"] == second["image_url"]
+
+
+def test_uncacheable_backend_not_stored(make_orchestrator):
+    """Test output from a backend that is not reproducible is never cached."""
+    orchestrator, backend = make_orchestrator(cacheable=False)
+    orchestrator.run(dict(PARAMS))
+    orchestrator.run(dict(PARAMS))
+
+    assert len(backend.jobs) == 2
+    assert orchestrator.render_cache.stats()["stores"] == 0
+
+
+def test_cache_keyed_on_rendering_model(make_orchestrator):
+    """Test a cached render is not served once the backend runs another model."""
+    orchestrator, backend = make_orchestrator()
+    orchestrator.run(dict(PARAMS))
+    backend.namespace = "fake:other-model"
+    orchestrator.run(dict(PARAMS))
+
+    assert len(backend.jobs) == 2
+    assert orchestrator.render_cache.stats()["stores"] == 2
+
+
+def test_manifest_with_controlnet(make_orchestrator, tmp_path, monkeypatch):
+    """Test a manifest gets its control map prepared and passed to the backend."""
+    image = np.full((64, 64, 3), 255, dtype=np.uint8)
+    cv2.rectangle(image, (16, 16), (48, 48), (0, 0, 0), -1)
+    upload = tmp_path / "upload_0123456789abcdef01234567.png"
+    cv2.imwrite(str(upload), image)
+    monkeypatch.setattr(
+        "backend.orchestrator.render_orchestrator.upload_path_for",
+        lambda ref: str(upload) if ref else None,
+    )
+
+    orchestrator, backend = make_orchestrator()
+    manifest = {
+        "scene": {"description": "lamp", "seed": 7},
+        "controlnet": {"enabled": True, "type": "canny", "image_ref": f"/uploads/{upload.name}"},
+    }
+    result = orchestrator.run(manifest)
+
+    control_map = manifest["controlnet"]["control_map"]
+    assert control_map.startswith("/control_maps/")
+    assert backend.jobs[0]["controlnet_map"] == control_map
+    assert result["seed"] == 7
+    assert orchestrator.version_store.get(result["version_id"])["json"]["controlnet"]["control_map"] == control_map
+
+
+def test_fresh_render_hashed_once(make_orchestrator, monkeypatch):
+    """Test a cached fresh render ends up as its blob, so storage need not hash it again."""
+    orchestrator, backend = make_orchestrator()
+    out_path, _ = orchestrator.render(dict(PARAMS))
+
+    assert out_path.startswith(str(orchestrator.blobs.root))
+    assert not list(backend.output_dir.glob("fake_*.jpg"))
+    monkeypatch.setattr(
+        "backend.storage.blob_store.file_sha256", lambda path: pytest.fail("hashed twice")
+    )
+    assert orchestrator.blobs.put(out_path, move=True) == out_path
+
+
+def test_backend_failure_falls_back_to_mock(make_orchestrator):
+    """Test a failed dispatch still produces an image, shared between fallbacks and never cached."""
+    orchestrator, backend = make_orchestrator(fail=True)
+    out_path, args = orchestrator.render(dict(PARAMS))
+
+    assert out_path.startswith(str(orchestrator.blobs.root))
+    assert orchestrator.render({**PARAMS, "seed": 43})[0] == out_path
+    assert args["seed"] == 42
+    assert orchestrator.render_cache.stats()["stores"] == 0
+
+
+def test_unsupported_job_rejected(make_orchestrator):
+    """Test a job no backend can render raises instead of falling back to the mock image."""
+    orchestrator, backend = make_orchestrator()
+    backend.supports = lambda args, streaming=False: False
+
+    with pytest.raises(UnsupportedRenderError):
+        orchestrator.check_supported(dict(PARAMS))
+    with pytest.raises(UnsupportedRenderError):
+        orchestrator.render(dict(PARAMS))
+    assert backend.jobs == []
+
+
+class FakeStorage:
+    """Keeps the local path as the URL and hands out the upload callback."""
+
+    def __init__(self, upload_inline=False):
+        self.upload_inline = upload_inline
+        self.callbacks = []
+
+    def save_file(self, source_path, move=False, on_uploaded=None):
+        if self.upload_inline:
+            on_uploaded("https://bucket/inline.jpg")
+        else:
+            self.callbacks.append(on_uploaded)
+        return source_path
+
+
+@pytest.mark.parametrize("upload_inline", [False, True])
+def test_version_points_at_s3_only_after_upload(make_orchestrator, upload_inline):
+    """Test a version keeps its local URL until the upload succeeds, whenever that happens."""
+    orchestrator, backend = make_orchestrator()
+    orchestrator.storage = FakeStorage(upload_inline)
+    result = orchestrator.run(dict(PARAMS))
+    stored = orchestrator.version_store.get(result["version_id"])
+
+    if upload_inline:
+        assert result["image_url"] == stored["image_url"] == "https://bucket/inline.jpg"
+    else:
+        assert stored["image_url"] == result["image_url"]
+        assert not result["image_url"].startswith("https://")
+        orchestrator.storage.callbacks[0]("https://bucket/later.jpg")
+        assert orchestrator.version_store.get(result["version_id"])["image_url"] == "https://bucket/later.jpg"
+
+
+def test_cancelled_job_not_dispatched_or_recorded(make_orchestrator):
+    """Test a cancelled job never reaches a backend, and one cancelled mid-render records no version."""
+    orchestrator, backend = make_orchestrator()
+    cancelled = threading.Event()
+    cancelled.set()
+    with pytest.raises(JobCancelledError):
+        orchestrator.run(dict(PARAMS), cancelled=cancelled)
+    assert backend.jobs == []
+
+    cancelled.clear()
+    render = backend.render
+
+    def render_then_cancel(args, step_callback=None):
+        path = render(args, step_callback)
+        cancelled.set()
+        return path
+
+    backend.render = render_then_cancel
+    with pytest.raises(JobCancelledError):
+        orchestrator.run({**PARAMS, "seed": 9}, cancelled=cancelled)
+    assert len(backend.jobs) == 1
+    assert orchestrator.version_store.list()["items"] == []
+    assert not any(backend.output_dir.glob("fake_*.jpg"))
@@ -0,0 +1,216 @@
+"""
+Tests for least-loaded render routing with circuit breaking
+"""
+
+import json
+import threading
+import pytest
+from backend.model_clients.comfyui_client import RecipeInputError, load_recipe
+from backend.orchestrator.render_router import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    ComfyUIBackend,
+    DiffusersBackend,
+    NoBackendAvailableError,
+    RenderRouter,
+    UnsupportedRenderError,
+    backends_from_env,
+    comfyui_context,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeBackend:
+    """Local stand-in for a render host: fixed latency on a fake clock, optional failures."""
+
+    def __init__(self, name, clock, latency=1.0, fail=False, controlnet=None):
+        self.name = name
+        self.clock = clock
+        self.latency = latency
+        self.fail = fail
+        self.controlnet = controlnet  # None: any job, True/False: only (non-)ControlNet jobs
+        self.jobs = []
+
+    def supports(self, args, streaming=False):
+        return self.controlnet is None or self.controlnet == bool(args.get("controlnet_image"))
+
+    def render(self, args, step_callback=None):
+        self.jobs.append(args)
+        self.clock.now += self.latency
+        if self.fail:
+            raise RuntimeError(f"{self.name} is down")
+        return f"{self.name}.jpg"
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_prefers_faster_backend(clock):
+    """Test dispatch favors the backend with the lower rolling latency."""
+    slow = FakeBackend("slow", clock, latency=4.0)
+    fast = FakeBackend("fast", clock, latency=1.0)
+    router = RenderRouter([slow, fast], clock=clock)
+
+    # Cold start: one job each to learn latencies, then the fast host wins
+    paths = [router.dispatch({"i": i}) for i in range(5)]
+
+    assert paths[:2] == ["slow.jpg", "fast.jpg"]
+    assert paths[2:] == ["fast.jpg"] * 3
+
+
+def test_in_flight_spreads_load(clock):
+    """Test a busy backend is skipped while an idle one is available."""
+    release = threading.Event()
+    started = threading.Event()
+
+    class Blocking(FakeBackend):
+        def render(self, args, step_callback=None):
+            started.set()
+            release.wait(5)
+            return super().render(args)
+
+    a, b = Blocking("a", clock), FakeBackend("b", clock)
+    router = RenderRouter([a, b], clock=clock)
+    worker = threading.Thread(target=router.dispatch, args=({},))
+    worker.start()
+    started.wait(5)
+
+    assert router.dispatch({}) == "b.jpg"
+    assert [s["in_flight"] for s in router.stats()] == [1, 0]
+    release.set()
+    worker.join(5)
+
+
+def test_failover_and_circuit_breaker(clock):
+    """Test failures fail over, eject the backend, and a trial job closes it again."""
+    flaky = FakeBackend("flaky", clock, latency=0.0, fail=True)
+    steady = FakeBackend("steady", clock, latency=1.0)
+    router = RenderRouter([flaky, steady], failure_threshold=2, reset_timeout=30, clock=clock)
+
+    assert router.dispatch({}) == "steady.jpg"  # flaky failed once, job retried
+    router.dispatch({})
+    assert router.stats()[0]["state"] == OPEN
+    assert len(flaky.jobs) == 2
+
+    router.dispatch({})
+    assert len(flaky.jobs) == 2  # ejected while open
+
+    clock.now += 30
+    flaky.fail = False
+    assert router._available(router._states[0], clock.now)
+    assert router.stats()[0]["state"] == HALF_OPEN
+    router._states[1].in_flight = 5  # push the trial to the recovering host
+    assert router.dispatch({}) == "flaky.jpg"
+    assert router.stats()[0]["state"] == CLOSED
+
+
+def test_all_backends_down(clock):
+    """Test the last error is reported when no backend can take the job."""
+    router = RenderRouter([FakeBackend("a", clock, fail=True)], failure_threshold=1, clock=clock)
+    with pytest.raises(NoBackendAvailableError, match="a is down"):
+        router.dispatch({})
+    with pytest.raises(NoBackendAvailableError):
+        router.dispatch({})
+
+
+def test_caller_errors_not_counted(clock):
+    """Test bad-input errors propagate without tripping the breaker or failing over."""
+    class BadInput(FakeBackend):
+        def render(self, args, step_callback=None):
+            raise RecipeInputError("Recipe needs scene.seed")
+
+    other = FakeBackend("other", clock)
+    router = RenderRouter([BadInput("a", clock), other], failure_threshold=1, clock=clock)
+    with pytest.raises(RecipeInputError):
+        router.dispatch({})
+    assert router.stats()[0]["state"] == CLOSED
+    assert other.jobs == []
+
+
+def test_bad_responses_counted(clock):
+    """Test other ValueErrors (e.g. an unparseable response) fail over and trip the breaker."""
+    class Garbage(FakeBackend):
+        def render(self, args, step_callback=None):
+            self.jobs.append(args)
+            raise json.JSONDecodeError("Expecting value", "<html>", 0)
+
+    bad, good = Garbage("bad", clock, latency=0.0), FakeBackend("good", clock)
+    router = RenderRouter([bad, good], failure_threshold=2, clock=clock)
+    assert [router.dispatch({}) for _ in range(6)] == ["good.jpg"] * 6
+    assert router.stats()[0]["state"] == OPEN
+    assert len(bad.jobs) == 2
+
+
+def test_backends_from_env():
+    """Test RENDER_BACKENDS parsing."""
+    backends = backends_from_env("local, http://gpu1:8188,http://gpu2:8188")
+    assert [b.name for b in backends] == ["local", "comfyui:http://gpu1:8188", "comfyui:http://gpu2:8188"]
+    with pytest.raises(ValueError):
+        backends_from_env("gpu3")
+
+
+def test_jobs_only_go_to_capable_backends(clock):
+    """Test ControlNet and text jobs are routed by capability, however idle the other backend is."""
+    text = FakeBackend("text", clock, latency=0.0, controlnet=False)
+    comfy = FakeBackend("comfy", clock, latency=5.0, controlnet=True)
+    router = RenderRouter([text, comfy], clock=clock)
+
+    assert router.dispatch({"controlnet_image": "/uploads/a.png"}) == "comfy.jpg"
+    assert router.dispatch({"controlnet_image": "/uploads/a.png"}) == "comfy.jpg"
+    assert router.dispatch({"prompt": "mug"}) == "text.jpg"
+
+    only_text = RenderRouter([FakeBackend("text", clock, controlnet=False)], clock=clock)
+    with pytest.raises(UnsupportedRenderError, match="ControlNet"):
+        only_text.dispatch({"controlnet_image": "/uploads/a.png"})
+
+
+def test_builtin_backend_capabilities():
+    """Test both backends share text jobs, ComfyUI takes un-tiered ControlNet jobs, and only diffusers streams."""
+    local = DiffusersBackend(client=object())
+    comfy = ComfyUIBackend(base_url="http://gpu1:8188")
+    text = {"prompt": "mug", "scheduler": "dpmpp_2m_karras"}
+    controlnet = {"prompt": "mug", "controlnet_image": "/uploads/a.png"}
+
+    assert local.supports(text) and local.supports(text, streaming=True)
+    assert not local.supports(controlnet)
+    assert comfy.supports(text) and comfy.supports({"prompt": "mug"})
+    assert not comfy.supports(text, streaming=True)
+    assert comfy.supports(controlnet)
+    assert not comfy.supports(controlnet, streaming=True)
+    assert not comfy.supports({**controlnet, "scheduler": "default"})
+
+
+def test_local_only_setup_falls_back_for_controlnet():
+    """Test the default local-only setup renders ControlNet jobs instead of rejecting them."""
+    controlnet = {"prompt": "mug", "controlnet_image": "/uploads/a.png"}
+
+    (local,) = backends_from_env("local")
+    assert local.supports(controlnet)
+
+    local, _ = backends_from_env("local,http://gpu1:8188")
+    assert not local.supports(controlnet)
+
+
+def test_text_recipe_takes_tier_settings():
+    """Test the text-to-image recipe is filled from the job's size, steps, CFG and scheduler."""
+    args = {
+        "prompt": "ceramic mug", "seed": 7, "width": 512, "height": 512,
+        "num_inference_steps": 15, "guidance_scale": 9.0, "scheduler": "dpmpp_2m_karras",
+    }
+    graph = load_recipe("text_to_image").instantiate(comfyui_context(args))
+
+    assert graph["9"]["inputs"]["width"] == 512
+    assert graph["10"]["inputs"]["steps"] == 15
+    assert graph["10"]["inputs"]["cfg"] == 9.0
+    assert (graph["10"]["inputs"]["sampler_name"], graph["10"]["inputs"]["scheduler"]) == ("dpmpp_2m", "karras")
+    assert graph["10"]["inputs"]["seed"] == 7
@@ -2,8 +2,16 @@
 Tests for JSON schema validation
 """
 
+import json
+import os
 import pytest
-from backend.utils.validate_json import validate_fibo_json, get_schema_hints
+from backend.utils.validate_json import (
+    CompiledSchema,
+    get_schema_hints,
+    validate_batch,
+    validate_fibo_json,
+    validation_errors,
+)
 
 
 def test_valid_minimal_json():
@@ -63,3 +71,38 @@ def test_controlnet_optional():
     
     is_valid, error = validate_fibo_json(json_data)
     assert is_valid
+
+
+def test_all_errors_reported_in_one_pass():
+    """Test every error is returned, not just the first."""
+    errors = validation_errors({"scene": "not an object"})
+
+    messages = " ".join(e["message"] for e in errors)
+    assert "camera" in messages
+    assert any(e["path"] == "scene" for e in errors)
+
+
+def test_validate_batch():
+    """Test bulk validation reports per-manifest results in order."""
+    good = {"scene": {"description": "Test"}, "camera": {}}
+    results = validate_batch([good, {"camera": {}}, good])
+
+    assert [r["valid"] for r in results] == [True, False, True]
+    assert results[1]["index"] == 1
+
+
+def test_schema_recompiled_when_file_changes(tmp_path):
+    """Test the compiled validator is reused until the schema file changes."""
+    path = tmp_path / "schema.json"
+    path.write_text(json.dumps({"type": "object", "required": ["a"]}))
+    compiled = CompiledSchema(path)
+    first = compiled.validator
+
+    assert compiled.validator is first
+    assert compiled.errors({})
+
+    path.write_text(json.dumps({"type": "object"}))
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000))
+
+    assert compiled.validator is not first
+    assert compiled.errors({}) == []
@@ -0,0 +1,94 @@
+"""
+Tests for the SKU batch runner
+"""
+
+import json
+import time
+import pytest
+from backend.orchestrator.sku_batch import SkuBatchRunner, expand_template
+
+TEMPLATE = {
+    "batch_config": {"output_format": "jpg"},
+    "scene_template": {"description": "Product shot of {product_name}", "seed": None},
+    "camera": {"lens": {"focal_length_mm": 50}},
+    "post_process": {"export": {"format": "{output_format}"}},
+    "variable_mappings": {
+        "product_name": "csv:product_name",
+        "seed": "csv:seed",
+        "output_format": "config:output_format",
+    },
+}
+
+
+@pytest.fixture
+def batch_inputs(tmp_path):
+    template_path = tmp_path / "template.json"
+    template_path.write_text(json.dumps(TEMPLATE))
+    csv_path = tmp_path / "skus.csv"
+    csv_path.write_text(
+        "sku,product_name,seed\n"
+        "SKU-1,Mug,101\n"
+        "SKU-2,Lamp,102\n"
+        "SKU-3,Vase,103\n"
+    )
+    return template_path, csv_path
+
+
+def wait_for(runner, batch_id):
+    for _ in range(200):
+        batch = runner.get(batch_id)
+        if batch.status != "running":
+            return batch
+        time.sleep(0.01)
+    raise AssertionError("batch did not finish")
+
+
+def test_expand_template_fills_row_values():
+    """Test placeholders and null scene fields are filled from the row."""
+    manifest = expand_template(TEMPLATE, {"product_name": "Mug", "seed": "101"})
+
+    assert manifest["scene"] == {"description": "Product shot of Mug", "seed": 101}
+    assert manifest["post_process"]["export"]["format"] == "jpg"
+    assert "variable_mappings" not in manifest
+
+
+def test_batch_renders_every_row(tmp_path, batch_inputs):
+    """Test each CSV row is rendered and written to the manifest."""
+    rendered = []
+
+    def render(manifest):
+        rendered.append(manifest["scene"]["description"])
+        return {"version_id": "v", "image_url": "/x.jpg", "seed": manifest["scene"]["seed"]}
+
+    runner = SkuBatchRunner(render, tmp_path / "batches", max_workers=2)
+    batch = wait_for(runner, runner.start(*batch_inputs).id)
+
+    assert batch.status == "completed"
+    assert batch.counts == {"rows": 3, "done": 3, "failed": 0, "skipped": 0}
+    assert sorted(rendered) == ["Product shot of Lamp", "Product shot of Mug", "Product shot of Vase"]
+    lines = batch.manifest_path.read_text().splitlines()
+    assert sorted(json.loads(line)["sku"] for line in lines) == ["SKU-1", "SKU-2", "SKU-3"]
+
+
+def test_resume_skips_rendered_rows(tmp_path, batch_inputs):
+    """Test a resumed batch only re-renders rows that failed."""
+    attempts = []
+
+    def flaky_render(manifest):
+        attempts.append(manifest["scene"]["seed"])
+        if manifest["scene"]["seed"] == 102 and attempts.count(102) == 1:
+            raise RuntimeError("GPU out of memory")
+        return {"version_id": "v", "image_url": "/x.jpg", "seed": manifest["scene"]["seed"]}
+
+    runner = SkuBatchRunner(flaky_render, tmp_path / "batches", max_workers=1)
+    batch = wait_for(runner, runner.start(*batch_inputs).id)
+    assert batch.status == "completed_with_errors"
+
+    # A fresh runner only has the files on disk to go on
+    runner = SkuBatchRunner(flaky_render, tmp_path / "batches", max_workers=1)
+    runner.resume(batch.id)
+    batch = wait_for(runner, batch.id)
+
+    assert batch.status == "completed"
+    assert batch.counts == {"rows": 3, "done": 1, "failed": 0, "skipped": 2}
+    assert sorted(attempts) == [101, 102, 102, 103]
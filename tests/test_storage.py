@@ -0,0 +1,136 @@
+"""
+Tests for background and multipart S3 uploads against moto's S3
+"""
+
+import os
+
+import pytest
+
+pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+from backend.storage.blob_store import BlobStore  # noqa: E402
+from backend.storage.store import MB, S3Uploader, StorageManager, create_s3_client  # noqa: E402
+
+BUCKET = "studioflow-test"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+    monkeypatch.delenv("S3_ENDPOINT_URL", raising=False)
+    with moto.mock_aws():
+        client = create_s3_client()
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+class FlakyClient:
+    """Delegates to a real client after failing the first `failures` uploads."""
+
+    def __init__(self, client, failures):
+        self.client = client
+        self.failures = failures
+
+    def upload_file(self, *args, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("connection reset")
+        return self.client.upload_file(*args, **kwargs)
+
+
+def make_uploader(client, **options):
+    return S3Uploader(bucket=BUCKET, client=client, prefix="renders", sleep=lambda s: None, **options)
+
+
+def make_storage(uploader, tmp_path, monkeypatch):
+    monkeypatch.setenv("STORAGE_TYPE", "s3")
+    base = tmp_path / "backend"
+    return StorageManager(uploader=uploader, blobs=BlobStore(base / "samples" / "output" / "blobs"), base_dir=base)
+
+
+def test_multipart_upload(s3, tmp_path):
+    """Test a large EXR goes up in concurrent parts with its content type."""
+    exr = tmp_path / "hero.exr"
+    exr.write_bytes(b"\x76\x2f\x31\x01" * (11 * MB // 4))
+    uploader = make_uploader(s3, multipart_threshold=5 * MB, multipart_chunksize=5 * MB, max_concurrency=4)
+
+    url = uploader.upload(str(exr), "renders/hero.exr")
+
+    head = s3.head_object(Bucket=BUCKET, Key="renders/hero.exr")
+    assert head["ETag"].strip('"').endswith("-3")  # three parts
+    assert head["ContentType"] == "image/x-exr"
+    assert head["ContentLength"] == exr.stat().st_size
+    assert url == f"https://{BUCKET}.s3.amazonaws.com/renders/hero.exr"
+
+
+def test_background_save(s3, tmp_path, monkeypatch):
+    """Test save_file returns the local URL at once and reports the S3 URL once uploaded."""
+    render = tmp_path / "render_abc.jpg"
+    render.write_bytes(b"jpeg")
+    storage = make_storage(make_uploader(s3), tmp_path, monkeypatch)
+    uploaded = []
+
+    url = storage.save_file(str(render), move=True, on_uploaded=uploaded.append)
+    assert url.startswith("/samples/output/blobs/")
+    assert storage.uploader.flush(timeout=10)
+
+    key = f"renders/{os.path.basename(url)}"
+    assert uploaded == [storage.uploader.url_for(key)]
+    assert s3.get_object(Bucket=BUCKET, Key=key)["Body"].read() == b"jpeg"
+    assert storage.stats()["uploaded"] == 1
+    storage.shutdown()
+
+
+def test_failed_upload_keeps_local_url(s3, tmp_path, monkeypatch):
+    """Test a render whose upload fails for good stays served from its local copy."""
+    render = tmp_path / "render.jpg"
+    render.write_bytes(b"jpeg")
+    storage = make_storage(make_uploader(FlakyClient(s3, failures=5), attempts=2), tmp_path, monkeypatch)
+    uploaded = []
+
+    url = storage.save_file(str(render), move=True, on_uploaded=uploaded.append)
+    assert storage.uploader.flush(timeout=10)
+
+    assert uploaded == []
+    assert open(storage.local_path_for(url), "rb").read() == b"jpeg"
+    storage.shutdown()
+
+
+def test_s3_url_resolves_to_local_file(s3, tmp_path, monkeypatch):
+    """Test an S3 image URL maps to its blob, and is downloaded again once that is gone."""
+    render = tmp_path / "render.jpg"
+    render.write_bytes(b"jpeg")
+    storage = make_storage(make_uploader(s3), tmp_path, monkeypatch)
+
+    local_url = storage.save_file(str(render), wait=False)
+    assert storage.uploader.flush(timeout=10)
+    s3_url = storage.uploader.url_for(f"renders/{os.path.basename(local_url)}")
+    blob = storage.local_path_for(local_url)
+    assert storage.local_path_for(s3_url) == blob
+
+    os.remove(blob)
+    assert storage.local_path_for(s3_url) == blob
+    assert open(blob, "rb").read() == b"jpeg"
+    assert storage.local_path_for("https://elsewhere.example.com/x.jpg") is None
+    storage.shutdown()
+
+
+def test_bounded_retries(s3, tmp_path):
+    """Test transient failures are retried and persistent ones surface as errors."""
+    render = tmp_path / "render.jpg"
+    render.write_bytes(b"jpeg")
+
+    uploader = make_uploader(FlakyClient(s3, failures=2), attempts=3)
+    uploader.upload(str(render), "renders/render.jpg")
+    assert uploader.stats()["retries"] == 2
+    assert uploader.stats()["uploaded"] == 1
+
+    uploader = make_uploader(FlakyClient(s3, failures=5), attempts=3)
+    job = uploader.enqueue(str(render), "renders/other.jpg")
+    assert uploader.flush(timeout=10)
+    assert job.status == "failed"
+    assert "connection reset" in job.error
+    assert uploader.stats()["failed"] == 1
@@ -0,0 +1,46 @@
+"""
+Tests for the fused tone-mapping engine
+"""
+
+import numpy as np
+import pytest
+from backend.utils.export_exr import aces_tonemap, reinhard_tonemap
+from backend.utils.tonemap import tone_map
+
+REFERENCE = {"aces": aces_tonemap, "reinhard": reinhard_tonemap}
+
+
+def reference(image, method, exposure):
+    """Allocating exposure -> curve -> quantize, as apply_tone_mapping used to."""
+    x = image.astype(np.float32) * (2 ** exposure)
+    return (np.clip(REFERENCE[method](x), 0, 1) * 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize("method", ["aces", "reinhard"])
+def test_float_chunks_match_reference(method):
+    """Test the chunked in-place float path matches the allocating one."""
+    image = np.random.default_rng(0).random((37, 20, 3), dtype=np.float32) * 3
+    original = image.copy()
+
+    result = tone_map(image, method, exposure=0.5, chunk_rows=8)
+
+    assert np.array_equal(image, original)
+    assert np.abs(result.astype(int) - reference(image, method, 0.5)).max() <= 1
+    assert np.array_equal(result, tone_map(image, method, exposure=0.5, chunk_rows=None))
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16])
+def test_integer_lut_matches_normalized_float(dtype):
+    """Test LUT output equals the float path on full-range-normalized input."""
+    top = np.iinfo(dtype).max
+    image = np.random.default_rng(1).integers(0, top + 1, (16, 16, 3), dtype=dtype)
+
+    result = tone_map(image, "aces", exposure=-1.0, chunk_rows=5)
+
+    assert np.abs(result.astype(int) - reference(image / top, "aces", -1.0)).max() <= 1
+
+
+def test_unknown_method_rejected():
+    """Test an unknown curve name raises ValueError."""
+    with pytest.raises(ValueError):
+        tone_map(np.zeros((2, 2), dtype=np.uint8), "filmic")
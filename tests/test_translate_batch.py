@@ -0,0 +1,57 @@
+"""
+Tests for memoized batch translation
+"""
+
+import json
+import pytest
+from backend.translator.batch import (
+    iter_ndjson,
+    memo_stats,
+    parse_ndjson_line,
+    translate_to_json_text,
+    translated_line,
+)
+from backend.translator.translator import translate_prompt_to_json
+
+
+@pytest.fixture(autouse=True)
+def clear_memo():
+    translate_to_json_text.cache_clear()
+
+
+def test_line_matches_single_translation():
+    """Test a batch line carries the same result as /translate."""
+    line = json.loads(translated_line(3, "  moody portrait at 85mm "))
+    assert line == {"index": 3, "result": translate_prompt_to_json("moody portrait at 85mm")}
+
+
+def test_repeated_prompts_hit_memo():
+    """Test duplicate prompts are translated once."""
+    for index, item in enumerate(["red mug", {"prompt": "red mug"}, "blue mug"]):
+        translated_line(index, item)
+
+    stats = memo_stats()
+    assert stats["misses"] == 2
+    assert stats["hits"] == 1
+
+
+def test_bad_item_reports_error():
+    """Test an invalid item yields an error line instead of failing the batch."""
+    line = json.loads(translated_line(0, {"text": "no prompt key"}))
+    assert line["index"] == 0
+    assert "error" in line
+
+
+def test_ndjson_line_parsing():
+    """Test NDJSON lines decode as JSON, falling back to a raw prompt."""
+    assert parse_ndjson_line(b'{"prompt": "red mug"}\n') == {"prompt": "red mug"}
+    assert parse_ndjson_line(b'"red mug"') == "red mug"
+    assert parse_ndjson_line(b"red mug\r\n") == "red mug"
+
+
+def test_ndjson_body_decoded_lazily():
+    """Test an NDJSON body is decoded one line at a time, skipping blank lines."""
+    items = iter_ndjson(b'{"prompt": "red mug"}\n\n  \nblue mug\r\n"green mug"')
+
+    assert next(items) == {"prompt": "red mug"}
+    assert list(items) == ["blue mug", "green mug"]
@@ -6,7 +6,12 @@ import pytest
 from backend.translator.translator import (
     translate_prompt_to_json,
     extract_focal_length,
-    extract_camera_angle
+    extract_camera_angle,
+    extract_color_palette,
+    extract_lighting_value,
+    extract_yaw,
+    enhanced_prompt_for,
+    params_to_enhanced_prompt,
 )
 
 
@@ -52,3 +57,40 @@ def test_portrait_aperture():
     """Test that portraits get shallow aperture."""
     result = translate_prompt_to_json("portrait headshot")
     assert result["camera"]["lens"]["aperture"] == 2.2
+
+
+def test_first_rule_wins():
+    """Test keyword rules keep their first-match priority."""
+    # "bright" (85) is listed before "very bright" (95)
+    assert extract_lighting_value("very bright studio") == 85
+    assert extract_color_palette("warm tones with cool shadows") == "warm"
+    assert extract_yaw("3/4 left, from behind") == 180
+
+
+def test_mm_pattern_precedes_keywords():
+    """Test an explicit focal length beats lens keywords."""
+    assert extract_focal_length("wide landscape at 200 mm") == 200
+    assert extract_focal_length("10mm fisheye") == 12
+
+
+def test_enhanced_prompt_phrases():
+    """Test bucket boundaries pick the same phrases as the slider ranges."""
+    prompt = params_to_enhanced_prompt({
+        "prompt": "ceramic mug", "focalLength": 24, "yaw": 10,
+        "pitch": -60, "lighting": 80, "colorPalette": "cool",
+    })
+    assert prompt.startswith(
+        "ceramic mug, shot with ultra wide angle lens, high angle view, front facing, "
+        "high-key bright lighting, clean and airy, cool blue tones"
+    )
+    assert "telephoto 135mm lens" in params_to_enhanced_prompt({"focalLength": 135})
+
+
+def test_enhanced_prompt_memoized_per_bucket():
+    """Test slider tweaks within one bucket reuse the memoized prompt."""
+    enhanced_prompt_for.cache_clear()
+    first = params_to_enhanced_prompt({"prompt": "lamp", "yaw": 50, "lighting": 62})
+    second = params_to_enhanced_prompt({"prompt": "lamp", "yaw": 70, "lighting": 75})
+
+    assert second is first
+    assert enhanced_prompt_for.cache_info().hits == 1
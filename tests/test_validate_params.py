@@ -0,0 +1,58 @@
+"""
+Tests for table-driven RenderParameters validation
+"""
+
+import pytest
+from backend.utils.validate_params import render_param_errors, validate_render_params_batch
+
+
+@pytest.fixture
+def params():
+    return {
+        "prompt": "ceramic mug on a table",
+        "focalLength": 50,
+        "yaw": 0,
+        "pitch": -10,
+        "lighting": 60,
+        "colorPalette": "warm",
+        "controlNet": {"type": "none", "strength": 0.5},
+        "seed": 42,
+        "resolution": "1024x1024",
+        "colorSpace": "sRGB",
+    }
+
+
+def test_valid_params(params):
+    """Test a complete, in-range payload has no errors."""
+    assert render_param_errors(params) == []
+
+
+def test_all_errors_reported(params):
+    """Test every failing rule is reported, in rule order."""
+    del params["seed"]
+    params.update(yaw=200, colorPalette="pastel", controlNet={"strength": 0.5})
+
+    assert render_param_errors(params) == [
+        "Missing required field: seed",
+        "yaw must be between -180 and 180",
+        "colorPalette must be one of: warm, cool, neutral, cinematic, vibrant",
+        "controlNet.type must be one of: none, sketch, depth, canny",
+    ]
+
+
+def test_wrong_types(params):
+    """Test non-numeric values fail with a type error instead of raising."""
+    params.update(focalLength="50mm", lighting=None)
+
+    errors = render_param_errors(params)
+
+    assert errors.count("focalLength must be a number") == 1
+    assert "lighting must be a number" in errors
+
+
+def test_batch_results_in_order(params):
+    """Test batch validation returns one result per payload."""
+    results = validate_render_params_batch([params, {}, params])
+
+    assert [r["valid"] for r in results] == [True, False, True]
+    assert len(results[1]["errors"]) == 10
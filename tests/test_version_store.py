@@ -0,0 +1,57 @@
+"""
+Tests for the pooled SQLite version store
+"""
+
+import pytest
+from backend.storage.version_store import VersionStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = VersionStore(str(tmp_path / "versions.sqlite"), pool_size=2)
+    for i in range(7):
+        store.insert(
+            seed=i % 2, image_url=f"/samples/output/r{i}.jpg", scene_json={"i": i}
+        )
+    return store
+
+
+def test_keyset_pagination_covers_all_rows(store):
+    """Test following next_cursor visits every version exactly once, newest first."""
+    seen = []
+    cursor = None
+    while True:
+        page = store.list(limit=3, cursor=cursor)
+        seen.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == 7
+    assert len({v["id"] for v in seen}) == 7
+    keys = [(v["timestamp"], v["id"]) for v in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_listing_skips_json_blob(store):
+    """Test list items omit the manifest while get() returns it."""
+    item = store.list(limit=1)["items"][0]
+
+    assert "json" not in item
+    assert "i" in store.get(item["id"])["json"]
+
+
+def test_seed_and_time_filters(store):
+    """Test filtering by seed and timestamp range."""
+    assert {v["seed"] for v in store.list(seed=1)["items"]} == {1}
+    assert len(store.list(seed=1)["items"]) == 3
+
+    newest = store.list(limit=1)["items"][0]["timestamp"]
+    assert store.list(until="0000")["items"] == []
+    assert len(store.list(since=newest)["items"]) >= 1
+
+
+def test_invalid_cursor(store):
+    """Test malformed cursors are rejected."""
+    with pytest.raises(ValueError):
+        store.list(cursor="not-a-cursor")
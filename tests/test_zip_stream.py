@@ -0,0 +1,32 @@
+"""
+Tests for the streaming ZIP writer
+"""
+
+import io
+import zipfile
+from backend.storage.zip_stream import stream_zip
+
+
+def test_archive_round_trips_files_and_sidecars(tmp_path):
+    """Test files and in-memory sidecars are stored byte for byte."""
+    image = tmp_path / "render.jpg"
+    image.write_bytes(b"\xff\xd8" + bytes(range(256)) * 40)
+
+    data = b"".join(stream_zip([("render.jpg", image), ("render.json", b'{"seed": 1}')], chunk_size=1000))
+
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    assert archive.testzip() is None
+    assert archive.read("render.jpg") == image.read_bytes()
+    assert archive.read("render.json") == b'{"seed": 1}'
+    assert all(info.compress_type == zipfile.ZIP_STORED for info in archive.infolist())
+
+
+def test_file_is_streamed_in_chunks(tmp_path):
+    """Test no single yielded chunk holds a whole large file."""
+    image = tmp_path / "big.jpg"
+    image.write_bytes(b"x" * 50_000)
+
+    chunks = [c for c in stream_zip([("big.jpg", image)], chunk_size=4096) if c]
+
+    assert max(len(c) for c in chunks) < 8192
+    assert len(chunks) > 10